@@ -7,59 +7,55 @@ Using Hailo-8 AI accelerator with YOLOv8
 import cv2
 import numpy as np
 from datetime import datetime
-from typing import Dict, List, Any, Tuple
+from typing import Dict, List, Any, Optional, Tuple
 import time
 from collections import defaultdict, deque
+from itertools import islice
 import logging
-
-try:
-    from hailo_platform import (HEF, VDevice, HailoStreamInterface, 
-                                 InferVStreams, ConfigureParams,
-                                 InputVStreamParams, OutputVStreamParams,
-                                 FormatType)
-except ImportError:
-    HEF = None
+import threading
 
 import sys
 sys.path.insert(0, '/opt/camera-agent')
 from plugins.base_detector import BaseDetector
+from hailo_session import HAILO_AVAILABLE, HailoDevice, HailoInferenceSession
+from postprocess import (class_filter_mask, decode_yolo_objectness, scale_boxes,
+                         build_detections, non_max_suppression)
+from tracker import (SCIPY_AVAILABLE, ConstantVelocityFilter, association_cost, linear_assignment,
+                     segment_crossings)
 
 logger = logging.getLogger(__name__)
 
 
 class LineCrossing:
-    """Tracks objects crossing a virtual line."""
+    """
+    Counts objects crossing a virtual line segment, per class and direction.
+    
+    Side A is on the left of the line going from its first to its second
+    point as seen in the image, side B on the right; crossings are counted
+    as 'A->B' or 'B->A'. Detector checks all tracks against all lines at
+    once (segment_crossings); which lines a track has already crossed is
+    kept on the track itself (track['crossed_lines']), so it is dropped
+    together with the track.
+    """
+    
+    DIRECTIONS = ('A->B', 'B->A')
     
     def __init__(self, line_coords: List[Tuple[int, int]], name: str = "line"):
-        self.p1 = np.array(line_coords[0])
-        self.p2 = np.array(line_coords[1])
+        self.p1 = np.array(line_coords[0], dtype=np.float64)
+        self.p2 = np.array(line_coords[1], dtype=np.float64)
         self.name = name
-        self.crossed_ids = set()
         self.counts = defaultdict(int)
-        
-    def check_crossing(self, track_id: int, prev_pos: np.ndarray, 
-                      curr_pos: np.ndarray, obj_class: str) -> bool:
-        if track_id in self.crossed_ids:
-            return False
-            
-        line_vec = self.p2 - self.p1
-        prev_vec = prev_pos - self.p1
-        curr_vec = curr_pos - self.p1
-        
-        prev_cross = np.cross(line_vec, prev_vec)
-        curr_cross = np.cross(line_vec, curr_vec)
-        
-        if prev_cross * curr_cross < 0:
-            self.crossed_ids.add(track_id)
-            self.counts[obj_class] += 1
-            logger.debug(f"{obj_class} crossed {self.name} (ID: {track_id})")
-            return True
-            
-        return False
+        self.direction_counts = {direction: defaultdict(int) for direction in self.DIRECTIONS}
+    
+    def record(self, track_id: int, obj_class: str, direction: str):
+        self.counts[obj_class] += 1
+        self.direction_counts[direction][obj_class] += 1
+        logger.debug(f"{obj_class} crossed {self.name} {direction} (ID: {track_id})")
     
     def reset(self):
-        self.crossed_ids.clear()
         self.counts.clear()
+        for counts in self.direction_counts.values():
+            counts.clear()
 
 
 class Detector(BaseDetector):
@@ -96,8 +92,8 @@ class Detector(BaseDetector):
     
     def __init__(self):
         self.camera = None
-        self.vdevice = None
-        self.infer_pipeline = None
+        self.hailo_device = None
+        self.session = None
         self.hef = None
         self.config = None
         
@@ -109,11 +105,29 @@ class Detector(BaseDetector):
         self.tracks = {}
         self.next_track_id = 0
         self.max_track_age = 2.0
+        self.max_track_distance = 100
+        self.min_track_iou = 0.3
+        self.class_index = {name: i for i, name in enumerate(self.COCO_CLASSES)}
+        
+        # Kalman state of each track, rows in self.tracks order
+        self.motion = ConstantVelocityFilter()
+        self.last_tracking_time = None
+        
+        # Tracking time budget: over it, assignment switches from Hungarian to greedy
+        self.tracking_budget_ms = 20.0
+        self.greedy_assignment = False
+        self.tracking_ms = 0.0
         
         # Counting
         self.lines = []
+        self.line_starts = np.empty((0, 2))
+        self.line_ends = np.empty((0, 2))
         self.total_counts = defaultdict(int)
-        self.detections_log = []
+        
+        # Crossing events: ring buffer, each event numbered for get_detections_log(since=...)
+        self.detections_log = deque(maxlen=1000)
+        self.detections_log_lock = threading.Lock()
+        self.log_sequence = 0
         
         # Performance
         self.frame_count = 0
@@ -132,7 +146,7 @@ class Detector(BaseDetector):
             self.config = config
             logger.info("Initializing Hailo Traffic Monitor Plugin...")
             
-            if HEF is None:
+            if not HAILO_AVAILABLE:
                 logger.error("hailo_platform not installed. Run: pip install hailo-platform")
                 return False
             
@@ -157,33 +171,33 @@ class Detector(BaseDetector):
             model_path = config.get('model_path', '/opt/hailo-models/yolov8n.hef')
             logger.info(f"Loading Hailo model: {model_path}")
             
-            self.hef = HEF(model_path)
-            
-            # Create Hailo device
-            self.vdevice = VDevice()
+            # Create Hailo device and configure network
+            self.hailo_device = HailoDevice(model_path)
+            self.hef = self.hailo_device.hef
             logger.info(f"✓ Hailo device created")
             
-            # Configure network
-            network_groups = self.vdevice.configure(self.hef)
-            network_group = network_groups[0]
-            
-            # Get input/output streams
-            input_vstreams_params = InputVStreamParams.make_from_network_group(
-                network_group, quantized=False, format_type=FormatType.UINT8
-            )
-            output_vstreams_params = OutputVStreamParams.make_from_network_group(
-                network_group, quantized=False, format_type=FormatType.FLOAT32
-            )
-            
-            # Create inference pipeline
-            self.infer_pipeline = InferVStreams(self.vdevice, input_vstreams_params, 
-                                               output_vstreams_params)
+            # Long-lived session: network group activated once, vstreams
+            # reused for every frame and rebuilt only after a device error
+            self.session = HailoInferenceSession(self.hailo_device)
+            self.session.start()
             
             logger.info("✓ Hailo model loaded and configured")
             
             # Set confidence threshold
             self.confidence_threshold = config.get('confidence_threshold', 0.5)
             
+            # Non-maximum suppression
+            self.nms_iou_threshold = config.get('nms_iou_threshold', 0.45)
+            self.max_detections = config.get('max_detections', 100)
+            
+            # Crossing events kept for get_detections_log
+            self.detections_log = deque(maxlen=config.get('detections_log_size', 1000))
+            
+            # Tracking
+            self.max_track_distance = config.get('max_track_distance', 100)
+            self.min_track_iou = config.get('min_track_iou', 0.3)
+            self.tracking_budget_ms = config.get('tracking_budget_ms', 20.0)
+            
             # Setup counting lines
             counting_lines = config.get('counting_lines', [])
             if not counting_lines:
@@ -199,6 +213,8 @@ class Detector(BaseDetector):
                 )
                 self.lines.append(line)
                 logger.info(f"✓ Counting line added: {line.name}")
+            self.line_starts = np.array([line.p1 for line in self.lines]).reshape(-1, 2)
+            self.line_ends = np.array([line.p2 for line in self.lines]).reshape(-1, 2)
             
             # Target classes
             self.target_classes = config.get('detection_classes', 
@@ -226,57 +242,28 @@ class Detector(BaseDetector):
     
     def postprocess_detections(self, outputs: List[np.ndarray], 
                                orig_width: int, orig_height: int) -> List[Dict]:
-        """Post-process Hailo output to get detections."""
-        detections = []
-        
+        """Post-process Hailo output to get detections (vectorized over all rows)."""
         # YOLOv8 output format: [batch, num_detections, 85]
         # 85 = [x, y, w, h, confidence, class_0, class_1, ..., class_79]
         output = outputs[0][0]  # Get first batch
         
-        for detection in output:
-            # Extract bbox and confidence
-            x_center, y_center, w, h = detection[:4]
-            obj_conf = detection[4]
-            class_scores = detection[5:]
-            
-            # Get best class
-            class_id = np.argmax(class_scores)
-            class_conf = class_scores[class_id]
-            
-            # Total confidence
-            confidence = obj_conf * class_conf
-            
-            if confidence < self.confidence_threshold:
-                continue
-            
-            # Filter for target classes
-            if class_id not in self.CLASS_MAPPING:
-                continue
-            
-            obj_class = self.CLASS_MAPPING[class_id]
-            if obj_class not in self.target_classes:
-                continue
-            
-            # Convert from normalized to pixel coordinates
-            x1 = int((x_center - w/2) * orig_width / self.input_width)
-            y1 = int((y_center - h/2) * orig_height / self.input_height)
-            x2 = int((x_center + w/2) * orig_width / self.input_width)
-            y2 = int((y_center + h/2) * orig_height / self.input_height)
-            
-            # Clamp to frame bounds
-            x1 = max(0, min(x1, orig_width))
-            y1 = max(0, min(y1, orig_height))
-            x2 = max(0, min(x2, orig_width))
-            y2 = max(0, min(y2, orig_height))
-            
-            detections.append({
-                'class': obj_class,
-                'confidence': float(confidence),
-                'bbox': [x1, y1, x2, y2],
-                'center': [int((x1 + x2) / 2), int((y1 + y2) / 2)]
-            })
+        # Only target classes from CLASS_MAPPING survive the class mask
+        class_mask = class_filter_mask(output.shape[1] - 5, self.CLASS_MAPPING,
+                                       self.target_classes)
+        boxes, confidences, class_ids = decode_yolo_objectness(
+            output, self.confidence_threshold, class_mask
+        )
+        
+        # Drop overlapping duplicates before tracking and counting
+        keep = non_max_suppression(boxes, confidences, class_ids,
+                                   self.nms_iou_threshold, self.max_detections)
+        boxes, confidences, class_ids = boxes[keep], confidences[keep], class_ids[keep]
+        
+        # Convert from model input to frame pixel coordinates, clamped to bounds
+        boxes = scale_boxes(boxes, (self.input_width, self.input_height),
+                            (orig_width, orig_height))
         
-        return detections
+        return build_detections(boxes, confidences, class_ids, self.CLASS_MAPPING)
     
     def detect_frame(self) -> Dict[str, Any]:
         """Process one frame with Hailo acceleration."""
@@ -296,43 +283,15 @@ class Detector(BaseDetector):
             input_data = self.preprocess_frame(frame)
             
             # Run Hailo inference
-            with self.infer_pipeline as pipeline:
-                input_dict = {pipeline.input_vstream_infos[0].name: input_data}
-                output_dict = pipeline.infer(input_dict)
-                outputs = list(output_dict.values())
+            outputs = self.session.infer(input_data[np.newaxis])
             
             # Post-process
             detections = self.postprocess_detections(outputs, orig_width, orig_height)
             
             # Update tracking and counting
             current_time = time.time()
-            for detection in detections:
-                center = np.array(detection['center'])
-                obj_class = detection['class']
-                
-                # Track object
-                track_id = self._update_tracking(center, obj_class, current_time)
-                detection['track_id'] = track_id
-                
-                # Check line crossings
-                if track_id in self.tracks:
-                    positions = self.tracks[track_id]['positions']
-                    if len(positions) >= 2:
-                        prev_pos = positions[-2]
-                        curr_pos = positions[-1]
-                        
-                        for line in self.lines:
-                            if line.check_crossing(track_id, prev_pos, curr_pos, obj_class):
-                                self.total_counts[obj_class] += 1
-                                self.detections_log.append({
-                                    'timestamp': datetime.utcnow().isoformat() + 'Z',
-                                    'class': obj_class,
-                                    'confidence': detection['confidence'],
-                                    'line': line.name,
-                                    'track_id': track_id,
-                                    'position': detection['center']
-                                })
-                                self.last_detection_time = datetime.utcnow().isoformat() + 'Z'
+            self._update_tracking(detections, current_time)
+            self._count_crossings(detections)
             
             # Cleanup old tracks
             self._cleanup_tracks(current_time)
@@ -354,47 +313,133 @@ class Detector(BaseDetector):
             return {'detections': [], 'frame_number': self.frame_count,
                    'timestamp': datetime.utcnow().isoformat() + 'Z', 'fps': self.fps}
     
-    def _update_tracking(self, center: np.ndarray, obj_class: str, 
-                        current_time: float) -> int:
-        """Simple centroid-based tracking."""
-        max_distance = 100
+    def _update_tracking(self, detections: List[Dict], current_time: float):
+        """
+        Associate one frame's detections with tracks in a single step and set
+        each detection's track_id.
         
-        best_track_id = None
-        best_distance = max_distance
+        Tracks are matched at their Kalman-predicted box for current_time, so
+        IDs hold when inference runs well below the camera frame rate.
+        One cost matrix covers all tracks x detections (1 - IoU for overlapping
+        boxes, centroid distance up to max_track_distance otherwise, no match
+        across classes) and is solved globally, so two detections never claim
+        the same track. Unmatched detections start tracks in bulk. Every
+        detection is tracked; the cost matrix only holds nearby same-class pairs
+        (sparse sweep), and while this step runs over tracking_budget_ms the
+        assignment is solved greedily instead of with the Hungarian method.
+        """
+        start = time.perf_counter()
         
-        for track_id, track in self.tracks.items():
-            if track['class'] != obj_class:
-                continue
-            if len(track['positions']) == 0:
-                continue
-                
-            last_pos = track['positions'][-1]
-            distance = np.linalg.norm(center - last_pos)
-            
-            if distance < best_distance:
-                best_distance = distance
-                best_track_id = track_id
+        det_boxes = np.array([d['bbox'] for d in detections], dtype=np.float64).reshape(-1, 4)
+        det_classes = np.array([self.class_index.get(d['class'], -1) for d in detections], dtype=np.int64)
+        track_ids = list(self.tracks)
+        if self.last_tracking_time is not None:
+            self.motion.predict(max(0.0, current_time - self.last_tracking_time))
+        self.last_tracking_time = current_time
+        track_boxes = self.motion.boxes()
+        track_classes = np.array([track['class_id'] for track in self.tracks.values()], dtype=np.int64)
         
-        if best_track_id is not None:
-            self.tracks[best_track_id]['positions'].append(center)
-            self.tracks[best_track_id]['last_seen'] = current_time
-            return best_track_id
-        else:
-            track_id = self.next_track_id
-            self.next_track_id += 1
-            self.tracks[track_id] = {
-                'class': obj_class,
-                'positions': deque([center], maxlen=10),
+        cost = association_cost(track_boxes, track_classes, det_boxes, det_classes,
+                                self.min_track_iou, self.max_track_distance)
+        track_rows, det_rows = linear_assignment(cost, greedy=self.greedy_assignment)
+        self.motion.update(track_rows, det_boxes[det_rows])
+        
+        for track_row, det_row in zip(track_rows.tolist(), det_rows.tolist()):
+            detection = detections[det_row]
+            track_id = track_ids[track_row]
+            track = self.tracks[track_id]
+            track['positions'].append(np.array(detection['center']))
+            track['last_seen'] = current_time
+            detection['track_id'] = track_id
+        
+        # Unmatched detections start new tracks
+        unmatched = np.ones(len(detections), dtype=bool)
+        unmatched[det_rows] = False
+        new_rows = np.flatnonzero(unmatched).tolist()
+        new_ids = range(self.next_track_id, self.next_track_id + len(new_rows))
+        self.next_track_id += len(new_rows)
+        self.tracks.update({
+            track_id: {
+                'class': detections[row]['class'],
+                'class_id': self.class_index.get(detections[row]['class'], -1),
+                'positions': deque([np.array(detections[row]['center'])], maxlen=10),
+                'crossed_lines': set(),
                 'last_seen': current_time
             }
-            return track_id
+            for track_id, row in zip(new_ids, new_rows)
+        })
+        for track_id, row in zip(new_ids, new_rows):
+            detections[row]['track_id'] = track_id
+        self.motion.add(det_boxes[unmatched])
+        
+        self._adapt_assignment((time.perf_counter() - start) * 1000)
+    
+    def _count_crossings(self, detections: List[Dict]):
+        """
+        Check the last move of every track matched this frame against every
+        counting line in one vectorized segment-intersection pass; moves that
+        pass beyond a line's end points do not count. Each track counts once
+        per line.
+        """
+        # New tracks have not moved
+        moved = [detection for detection in detections
+                 if len(self.tracks[detection['track_id']]['positions']) >= 2]
+        if not moved or not self.lines:
+            return
+        
+        positions = [self.tracks[detection['track_id']]['positions'] for detection in moved]
+        sides = segment_crossings(np.array([p[-2] for p in positions]), np.array([p[-1] for p in positions]),
+                                  self.line_starts, self.line_ends)
+        
+        for row, line_index in zip(*np.nonzero(sides)):
+            detection, line = moved[row], self.lines[line_index]
+            track_id = detection['track_id']
+            crossed_lines = self.tracks[track_id]['crossed_lines']
+            if line.name in crossed_lines:
+                continue
+            crossed_lines.add(line.name)
+            
+            # segment_crossings: +1 from the right (B) to the left (A) of p1 -> p2
+            direction = 'B->A' if sides[row, line_index] > 0 else 'A->B'
+            obj_class = detection['class']
+            line.record(track_id, obj_class, direction)
+            self.total_counts[obj_class] += 1
+            self._log_crossing({
+                'timestamp': datetime.utcnow().isoformat() + 'Z',
+                'class': obj_class,
+                'confidence': detection['confidence'],
+                'line': line.name,
+                'direction': direction,
+                'track_id': track_id,
+                'position': detection['center']
+            })
+            self.last_detection_time = datetime.utcnow().isoformat() + 'Z'
+    
+    def _adapt_assignment(self, elapsed_ms: float):
+        """
+        Solve greedily while the average tracking time is over budget, with the
+        Hungarian method again once it is well under. The average, not one frame, decides, so a
+        single slow frame changes nothing; no detection is ever left untracked.
+        """
+        self.tracking_ms = 0.9 * self.tracking_ms + 0.1 * elapsed_ms if self.tracking_ms else elapsed_ms
+        
+        if not self.greedy_assignment and self.tracking_ms > self.tracking_budget_ms:
+            self.greedy_assignment = True
+            logger.warning(f"Tracking takes {self.tracking_ms:.1f} ms (budget {self.tracking_budget_ms} ms), "
+                           f"switching to greedy assignment")
+        elif self.greedy_assignment and self.tracking_ms < self.tracking_budget_ms / 3:
+            self.greedy_assignment = False
+            logger.info(f"Tracking takes {self.tracking_ms:.1f} ms, back to Hungarian assignment")
     
     def _cleanup_tracks(self, current_time: float):
-        """Remove old tracks."""
-        to_remove = [tid for tid, track in self.tracks.items() 
-                    if current_time - track['last_seen'] > self.max_track_age]
-        for tid in to_remove:
+        """Remove old tracks, with their Kalman rows and line crossing state."""
+        expired = np.array([current_time - track['last_seen'] > self.max_track_age
+                            for track in self.tracks.values()], dtype=bool)
+        if not expired.any():
+            return
+        for tid in [tid for tid, old in zip(list(self.tracks), expired) if old]:
             del self.tracks[tid]
+        self.motion.keep(~expired)
     
     def _update_fps(self):
         """Calculate FPS."""
@@ -408,25 +453,48 @@ class Detector(BaseDetector):
         """Get accumulated counts."""
         counts = dict(self.total_counts)
         line_counts = {line.name: dict(line.counts) for line in self.lines}
+        line_directions = {
+            line.name: {direction: dict(counts) for direction, counts in line.direction_counts.items()}
+            for line in self.lines
+        }
         
         return {
             'timestamp': datetime.utcnow().isoformat() + 'Z',
             'interval_seconds': 120,
             'counts': counts,
             'total': sum(counts.values()),
-            'lines': line_counts
+            'lines': line_counts,
+            'line_directions': line_directions
         }
     
-    def get_detections_log(self) -> List[Dict[str, Any]]:
-        """Get individual detection events."""
-        return self.detections_log.copy()
+    def _log_crossing(self, event: Dict[str, Any]):
+        """Append a crossing event to the ring buffer with the next sequence number."""
+        with self.detections_log_lock:
+            self.log_sequence += 1
+            event['sequence'] = self.log_sequence
+            self.detections_log.append(event)
+    
+    def get_detections_log(self, since: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Get crossing events newer than the `since` cursor (all buffered events
+        if None). Pass the last event's 'sequence' as the next cursor; events
+        that fell out of the ring buffer in between are lost.
+        """
+        with self.detections_log_lock:
+            if not self.detections_log:
+                return []
+            skip = 0 if since is None else since - self.detections_log[0]['sequence'] + 1
+            return list(islice(self.detections_log, max(0, skip), None))
     
     def reset_counts(self):
         """Reset counters."""
         self.total_counts.clear()
-        self.detections_log.clear()
+        with self.detections_log_lock:
+            self.detections_log.clear()
         for line in self.lines:
             line.reset()
+        for track in self.tracks.values():
+            track['crossed_lines'].clear()
         logger.info("Counts reset")
     
     def cleanup(self):
@@ -437,12 +505,12 @@ class Detector(BaseDetector):
             self.camera.release()
             logger.info("✓ Camera released")
         
-        if self.infer_pipeline:
-            del self.infer_pipeline
+        if self.session:
+            self.session.stop()
             logger.info("✓ Pipeline released")
         
-        if self.vdevice:
-            del self.vdevice
+        if self.hailo_device:
+            self.hailo_device.release()
             logger.info("✓ Hailo device released")
         
         logger.info("✓ Cleanup complete")
@@ -452,11 +520,13 @@ class Detector(BaseDetector):
         return {
             'camera_active': self.camera is not None and self.camera.isOpened(),
             'model_loaded': self.hef is not None,
-            'hailo_active': self.vdevice is not None,
+            'hailo_active': self.session is not None and self.session.ready.is_set(),
             'fps': round(self.fps, 2),
             'last_detection': self.last_detection_time,
             'total_frames_processed': self.frame_count,
             'active_tracks': len(self.tracks),
+            'tracking_ms': round(self.tracking_ms, 2),
+            'tracking_assignment': 'hungarian' if SCIPY_AVAILABLE and not self.greedy_assignment else 'greedy',
             'error_count': self.error_count,
             'uptime_seconds': int(time.time() - self.start_time),
             'total_counted': sum(self.total_counts.values())
@@ -469,6 +539,18 @@ class Detector(BaseDetector):
                 self.confidence_threshold = config['confidence_threshold']
                 logger.info(f"Updated confidence: {self.confidence_threshold}")
             
+            if 'nms_iou_threshold' in config:
+                self.nms_iou_threshold = config['nms_iou_threshold']
+                logger.info(f"Updated NMS IoU: {self.nms_iou_threshold}")
+            
+            if 'max_detections' in config:
+                self.max_detections = config['max_detections']
+                logger.info(f"Updated max detections: {self.max_detections}")
+            
+            if 'tracking_budget_ms' in config:
+                self.tracking_budget_ms = config['tracking_budget_ms']
+                logger.info(f"Updated tracking budget: {self.tracking_budget_ms} ms")
+            
             if 'detection_classes' in config:
                 self.target_classes = config['detection_classes']
                 logger.info(f"Updated classes: {self.target_classes}")
@@ -0,0 +1,67 @@
+"""
+Line-crossing regressions for the Hailo detector's tracking and counting.
+
+Needs the camera-system modules (installed to /opt/camera-agent on the device).
+Run from the repository root:
+    python3 -m pytest Hailo/tests
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np  # type: ignore
+
+REPO = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(REPO / 'camera-system'))
+sys.path.insert(0, str(REPO / 'Hailo'))
+import detector  # noqa: E402
+
+
+class CountingDetector(detector.Detector):
+    """Detector with tracking and counting only (no model or camera)"""
+
+    def detect(self, frame):
+        return []
+
+    def load_model(self, model_path):
+        pass
+
+
+def make_detector(line):
+    counter = CountingDetector()
+    counter.lines = [detector.LineCrossing(line, 'gate')]
+    counter.line_starts = np.array([l.p1 for l in counter.lines]).reshape(-1, 2)
+    counter.line_ends = np.array([l.p2 for l in counter.lines]).reshape(-1, 2)
+    return counter
+
+
+def run_track(counter, xs, y=500):
+    for frame, x in enumerate(xs):
+        detections = [{'class': 'car', 'confidence': 0.9, 'bbox': [x - 20, y - 20, x + 20, y + 20],
+                       'center': [x, y]}]
+        current_time = 1000.0 + frame / 30
+        counter._update_tracking(detections, current_time)
+        counter._count_crossings(detections)
+        counter._cleanup_tracks(current_time)
+
+
+def test_track_stepping_exactly_onto_the_line_is_counted():
+    # x = 100, 110, ..., 490: one frame lands exactly on x = 300
+    counter = make_detector([[300, 0], [300, 1080]])
+    run_track(counter, range(100, 500, 10))
+    assert dict(counter.lines[0].counts) == {'car': 1}
+    assert sum(counter.total_counts.values()) == 1
+
+
+def test_track_stepping_over_the_line_is_counted():
+    counter = make_detector([[300, 0], [300, 1080]])
+    run_track(counter, range(105, 505, 10))
+    assert dict(counter.lines[0].counts) == {'car': 1}
+
+
+def test_direction_through_the_line():
+    # Left to right across a downward line: from side B (its right) to side A
+    counter = make_detector([[300, 0], [300, 1080]])
+    run_track(counter, range(100, 500, 10))
+    assert dict(counter.lines[0].direction_counts['B->A']) == {'car': 1}
+    assert not counter.lines[0].direction_counts['A->B']
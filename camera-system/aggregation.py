@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Count Aggregation
+Accumulates a stream's count events in NumPy arrays indexed
+[region, class, direction], one per wall-clock-aligned bucket (a 300 s
+interval gives buckets starting at :00, :05, ...). Events go to the bucket of
+their frame's capture time, added per frame with one np.add.at call.
+
+AggregationEngine closes buckets on its own timer, `allowedLateness` seconds
+after each boundary, however busy the counting threads are. A closed bucket
+is taken out under a lock, so it never mixes two intervals, and only then
+serialized to the upload format.
+
+Closed buckets also add to hourly and daily rollups (UTC periods), kept by
+the agent so a chart over days reads one document per period.
+"""
+
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np  # type: ignore
+
+from tracker import TrackEvent
+
+logger = logging.getLogger(__name__)
+
+DIRECTIONS = ('in', 'out')
+
+# Capture timestamps are naive UTC datetimes
+_EPOCH = datetime(1970, 1, 1)
+
+# Rollups kept next to the per-interval buckets
+ROLLUP_PERIODS = {
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1),
+}
+
+
+def period_start(timestamp: datetime, period: str) -> datetime:
+    """Start of the UTC rollup period holding `timestamp`"""
+    length = ROLLUP_PERIODS[period]
+    return _EPOCH + ((timestamp - _EPOCH) // length) * length
+
+
+def merge_counts(counts: Dict[str, Dict[str, int]], delta: Dict[str, Dict[str, int]],
+                 sign: int = 1) -> Dict[str, Dict[str, int]]:
+    """`counts + sign * delta` for two upload-format count dicts, dropping all-zero entries"""
+    merged = {key: dict(values) for key, values in counts.items()}
+    for key, values in delta.items():
+        entry = merged.setdefault(key, dict.fromkeys(DIRECTIONS, 0))
+        for direction, n in values.items():
+            entry[direction] = entry.get(direction, 0) + sign * n
+    return {key: values for key, values in merged.items() if any(values.values())}
+
+
+class CountSnapshot(NamedTuple):
+    """One bucket's counts: `counts[region, class, direction]` for [start, end)"""
+    counts: np.ndarray
+    regions: List[str]
+    classes: List[str]
+    start: datetime
+    end: datetime
+
+    @property
+    def total(self) -> int:
+        return int(self.counts.sum())
+
+    def to_wire(self) -> Dict[str, Dict[str, int]]:
+        """Flattened upload format: {'{region}_{class}': {'in': n, 'out': n}}, non-zero only"""
+        flattened = {}
+        for region, class_index in zip(*np.nonzero(self.counts.any(axis=2))):
+            values = self.counts[region, class_index].tolist()
+            flattened[f"{self.regions[region]}_{self.classes[class_index]}"] = dict(zip(DIRECTIONS, values))
+        return flattened
+
+
+class CountAccumulator:
+    """
+    Per-stream [region, class, direction] counters per aligned bucket of
+    `interval` seconds. Regions and classes not known up front (zones
+    recompiled, an unexpected class name) add a row. Events for a bucket
+    that was already closed are counted in the oldest open one (`late_events`).
+    """
+
+    def __init__(self, regions: Iterable[str], classes: Iterable[str], interval: float):
+        self.interval = float(interval)
+        self.regions: List[str] = []
+        self.classes: List[str] = []
+        self._region_index: Dict[str, int] = {}
+        self._class_index: Dict[str, int] = {}
+        for region in regions:
+            self._index(self._region_index, self.regions, region)
+        for object_class in classes:
+            self._index(self._class_index, self.classes, object_class)
+
+        self._lock = threading.Lock()
+        self._buckets: Dict[int, np.ndarray] = {}  # bucket number (start / interval) -> counts
+        self._open_from = -math.inf  # buckets before this one are closed
+        self.late_events = 0
+
+    def add(self, events: Iterable[TrackEvent], captured: datetime) -> int:
+        """Count one frame's track events in the bucket of its capture time; returns how many"""
+        events = list(events)
+        if not events:
+            return 0
+        bucket = int((captured - _EPOCH).total_seconds() // self.interval)
+        with self._lock:
+            if bucket < self._open_from:
+                self.late_events += len(events)
+                bucket = int(self._open_from)
+            regions = [self._index(self._region_index, self.regions, e.region) for e in events]
+            classes = [self._index(self._class_index, self.classes, e.object_class) for e in events]
+            directions = [DIRECTIONS.index(e.direction) for e in events]
+            np.add.at(self._counts(bucket), (regions, classes, directions), 1)
+        return len(events)
+
+    def close(self, before: float) -> List[CountSnapshot]:
+        """Take out every bucket ending at or before `before` (epoch seconds), oldest first"""
+        first_open = math.floor(before / self.interval)
+        with self._lock:
+            self._open_from = max(self._open_from, first_open)
+            return self._take([bucket for bucket in self._buckets if bucket < first_open])
+
+    def flush(self) -> List[CountSnapshot]:
+        """Take out all buckets, including the current one (shutdown)"""
+        with self._lock:
+            return self._take(list(self._buckets))
+
+    def _take(self, buckets: List[int]) -> List[CountSnapshot]:
+        snapshots = []
+        for bucket in sorted(buckets):
+            start = _EPOCH + timedelta(seconds=bucket * self.interval)
+            snapshots.append(CountSnapshot(self._counts(bucket), list(self.regions), list(self.classes),
+                                           start, start + timedelta(seconds=self.interval)))
+            del self._buckets[bucket]
+        return snapshots
+
+    def _counts(self, bucket: int) -> np.ndarray:
+        """The bucket's array, created or grown to the current regions x classes"""
+        shape = (len(self.regions), len(self.classes), len(DIRECTIONS))
+        counts = self._buckets.get(bucket)
+        if counts is None:
+            counts = self._buckets[bucket] = np.zeros(shape, dtype=np.int64)
+        elif counts.shape != shape:
+            counts = self._buckets[bucket] = np.pad(
+                counts, ((0, shape[0] - counts.shape[0]), (0, shape[1] - counts.shape[1]), (0, 0)))
+        return counts
+
+    @staticmethod
+    def _index(index: Dict[str, int], names: List[str], name: str) -> int:
+        position = index.get(name)
+        if position is None:
+            position = index[name] = len(names)
+            names.append(name)
+        return position
+
+
+class AggregationEngine:
+    """
+    One timer thread closing the buckets of every registered accumulator at
+    wall-clock boundaries plus `allowed_lateness`. The next deadline is taken
+    from the wall clock after every close (so clock steps are followed) and
+    waited for on the monotonic clock. `on_round` runs after each close that
+    handed out buckets, so their storage can be committed together.
+    """
+
+    def __init__(self, interval: float, allowed_lateness: float = 5.0,
+                 on_round: Optional[Callable[[], None]] = None):
+        self.interval = float(interval)
+        self.allowed_lateness = max(0.0, float(allowed_lateness))
+        self.on_round = on_round
+        self._targets: List[Tuple[CountAccumulator, Callable[[CountSnapshot], None]]] = []
+        self._stop = threading.Event()
+        self._thread = None
+
+        # Stats
+        self.buckets_closed = 0
+        self.last_close_lag = 0.0  # seconds past the deadline
+
+    def register(self, accumulator: CountAccumulator, on_bucket: Callable[[CountSnapshot], None]):
+        """`on_bucket` receives each closed bucket on the engine's thread"""
+        self._targets.append((accumulator, on_bucket))
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='aggregation', daemon=True)
+        self._thread.start()
+        logger.info(f"✓ Aggregation every {self.interval:.0f}s on wall-clock boundaries "
+                    f"(allowed lateness {self.allowed_lateness:.0f}s)")
+
+    def stop(self, flush: bool = True):
+        """Stop the timer; with `flush`, hand out the open buckets too"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        if flush:
+            self._end_round(sum(self._deliver(accumulator.flush(), on_bucket)
+                                for accumulator, on_bucket in self._targets))
+
+    def next_deadline(self, now: float) -> float:
+        """Epoch time at which the bucket holding `now - allowed_lateness` can close"""
+        boundary = (math.floor((now - self.allowed_lateness) / self.interval) + 1) * self.interval
+        return boundary + self.allowed_lateness
+
+    def close_buckets(self, now: float):
+        """Close every bucket that ended at least allowed_lateness before `now`"""
+        self._end_round(sum(self._deliver(accumulator.close(now - self.allowed_lateness), on_bucket)
+                            for accumulator, on_bucket in self._targets))
+
+    def get_stats(self) -> Dict:
+        return {
+            'interval_seconds': self.interval,
+            'allowed_lateness_seconds': self.allowed_lateness,
+            'buckets_closed': self.buckets_closed,
+            'last_close_lag_ms': round(self.last_close_lag * 1000, 1),
+            'late_events': sum(accumulator.late_events for accumulator, _ in self._targets),
+        }
+
+    def _run(self):
+        while not self._stop.is_set():
+            deadline = self.next_deadline(time.time())
+            # Event.wait times out on the monotonic clock
+            if self._stop.wait(max(0.0, deadline - time.time())):
+                break
+            self.last_close_lag = max(0.0, time.time() - deadline)
+            self.close_buckets(time.time())
+
+    def _deliver(self, snapshots: List[CountSnapshot], on_bucket: Callable[[CountSnapshot], None]) -> int:
+        for snapshot in snapshots:
+            self.buckets_closed += 1
+            try:
+                on_bucket(snapshot)
+            except Exception as e:
+                logger.error(f"Failed to hand over count bucket {snapshot.start.isoformat()}: {e}", exc_info=True)
+        return len(snapshots)
+
+    def _end_round(self, delivered: int):
+        if delivered and self.on_round is not None:
+            try:
+                self.on_round()
+            except Exception as e:
+                logger.error(f"Failed to finish count bucket round: {e}", exc_info=True)
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Inference Backend Latency and Throughput
+Loads a model through the agent's backend registry (the backend is picked
+from the file type unless --backend is given), warms it up and times
+batches of random frames. Run it with the same model exported to .hef,
+.tflite and .onnx to compare engines on one device.
+
+Usage:
+    python3 benchmarks/bench_backends.py --model models/yolov8n.onnx [--backend onnx] [--batch 1 4] [--iterations 50]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from inference_backends import available_backends, create_backend  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--model', required=True)
+    parser.add_argument('--backend', help='Force a backend (default: by model file type)')
+    parser.add_argument('--batch', type=int, nargs='+', default=[1])
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--threads', type=int, help='CPU threads for ONNX Runtime')
+    args = parser.parse_args()
+
+    config = {}
+    if args.backend:
+        config['backend'] = args.backend
+    if args.threads:
+        config['numThreads'] = args.threads
+
+    print(f"Installed backends: {', '.join(available_backends()) or 'none'}")
+    backend = create_backend(args.model, config)
+    backend.load()
+    backend.warmup()
+    print(f"{backend.name}: {args.model}, input {backend.input_shape}, "
+          f"warm-up {backend.warmup_ms:.1f} ms")
+    try:
+        for batch_size in args.batch:
+            result = backend.benchmark(batch_size, args.iterations)
+            print(f"  batch {batch_size:2d}: mean {result['latency_ms_mean']:7.2f} ms, "
+                  f"p50 {result['latency_ms_p50']:7.2f} ms, p95 {result['latency_ms_p95']:7.2f} ms, "
+                  f"{result['frames_per_second']:6.1f} fps")
+    finally:
+        backend.close()
+
+
+if __name__ == '__main__':
+    main()
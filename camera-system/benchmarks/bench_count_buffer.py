@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Count Buffer Writes and Backlog Queries
+Runs the agent's bucket buffering both ways on the same disk: the previous
+store (one ORM add + commit per bucket and per upload mark, rollback journal,
+no index) and count_buffer.CountBuffer (WAL, synchronous=NORMAL, Core
+statements, one transaction per aggregation round and per upload batch;
+it also keeps the hourly / daily rollups). Reports bytes and write calls
+per bucket from /proc/self/io and time per round. Then fills both databases
+with a backlog of not-yet-uploaded buckets and times the upload thread's
+pending query and marking uploads.
+
+Run it from a directory on the SD card (the default is the current
+directory) - /tmp is often RAM.
+
+Usage:
+    python3 benchmarks/bench_count_buffer.py [--cameras 4] [--rounds 300] [--backlog 100000] [--dir .]
+"""
+
+import argparse
+import json
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from sqlalchemy import create_engine, Column, Integer, String, DateTime, JSON  # type: ignore  # noqa: E402
+from sqlalchemy.orm import declarative_base, sessionmaker  # type: ignore  # noqa: E402
+from count_buffer import BufferedCount, CountBuffer  # noqa: E402
+
+INTERVAL = timedelta(minutes=5)
+START = datetime(2026, 1, 1)
+
+LegacyBase = declarative_base()
+
+
+class LegacyBufferedCount(LegacyBase):
+    """buffered_counts as it was: no index"""
+    __tablename__ = 'buffered_counts'
+
+    id = Column(Integer, primary_key=True)
+    timestamp = Column(DateTime, nullable=False)
+    camera_id = Column(String(50), nullable=False)
+    counts_json = Column(JSON, nullable=False)
+    metadata_json = Column(JSON)
+    uploaded = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class LegacyStore:
+    """Per-row ORM writes on the default rollback journal, as camera_agent did"""
+
+    def __init__(self, db_path: str):
+        self.engine = create_engine(f'sqlite:///{db_path}')
+        LegacyBase.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+
+    def add_buckets(self, rows):
+        buffered = []
+        for row in rows:
+            record = LegacyBufferedCount(**row)
+            self.session.add(record)
+            self.session.commit()
+            buffered.append(dict(row, id=record.id))
+        return buffered
+
+    def mark_uploaded(self, ids):
+        for row_id in ids:
+            self.session.query(LegacyBufferedCount).filter(LegacyBufferedCount.id == row_id).update({'uploaded': 1})
+            self.session.commit()
+
+    def pending_uploads(self, limit: int = 10):
+        return (self.session.query(LegacyBufferedCount)
+                .filter(LegacyBufferedCount.uploaded == 0)
+                .order_by(LegacyBufferedCount.timestamp)
+                .limit(limit)
+                .all())
+
+    def close(self):
+        self.session.close()
+        self.engine.dispose()
+
+
+def bucket_row(camera: int, index: int) -> dict:
+    """A closed bucket as _aggregate_and_queue buffers it: 4 zones x 3 classes"""
+    timestamp = START + index * INTERVAL
+    counts = {f'zone{zone}_{object_class}': {'in': (index + zone) % 7, 'out': (index + camera) % 5}
+              for zone in range(4) for object_class in ('person', 'car', 'bicycle')}
+    document = {'timestamp': timestamp.isoformat(), 'cameraId': f'cam{camera}', 'siteId': 'site',
+                'orgId': 'org', 'aggregationInterval': 300, 'bucketStart': timestamp.isoformat(),
+                'bucketEnd': (timestamp + INTERVAL).isoformat(), 'counts': counts,
+                'metadata': {'version': '1.0', 'processingTime': 0}}
+    return {'timestamp': timestamp, 'camera_id': f'cam{camera}', 'counts_json': document,
+            'metadata_json': {'retry_count': 0, 'backend_data': {'camera_id': f'cam{camera}', 'counts': counts}}}
+
+
+def io_counters() -> dict:
+    with open('/proc/self/io') as f:
+        return {key: int(value) for key, value in (line.split(': ') for line in f)}
+
+
+def steady_state(store, cameras: int, rounds: int):
+    """Each round closes one bucket per camera, then uploads and marks them"""
+    before = io_counters()
+    start = time.perf_counter()
+    for index in range(rounds):
+        rows = store.add_buckets([bucket_row(camera, index) for camera in range(cameras)])
+        store.mark_uploaded([row['id'] for row in rows])
+    elapsed = time.perf_counter() - start
+    after = io_counters()
+    return elapsed, {key: after[key] - before[key] for key in after}
+
+
+def fill_backlog(engine, rows: int, cameras: int):
+    """Bulk-load a backlog of pending buckets (not timed)"""
+    template = bucket_row(0, 0)
+    with engine.begin() as conn:
+        for first in range(0, rows, 5000):
+            conn.execute(BufferedCount.__table__.insert(), [
+                {**template, 'camera_id': f'cam{index % cameras}', 'uploaded': 0,
+                 'timestamp': START + (index // cameras) * INTERVAL, 'created_at': START}
+                for index in range(first, min(rows, first + 5000))
+            ])
+
+
+def timed(function, repeats: int = 20) -> float:
+    """Median milliseconds per call"""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--cameras', type=int, default=4)
+    parser.add_argument('--rounds', type=int, default=300)
+    parser.add_argument('--backlog', type=int, default=100000)
+    parser.add_argument('--dir', default='.', help='Directory for the test databases (on the SD card)')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench_count_buffer_', dir=args.dir)
+    try:
+        payload = sum(len(json.dumps(bucket_row(camera, 0)['counts_json'])) for camera in range(args.cameras))
+        buckets = args.cameras * args.rounds
+        print(f"{args.cameras} cameras x {args.rounds} rounds ({buckets} buckets, "
+              f"~{payload // args.cameras} B of JSON each), databases in {workdir}")
+
+        stores = {'per-row ORM, rollback journal': LegacyStore(f'{workdir}/legacy.db'),
+                  'CountBuffer, WAL + batches': CountBuffer(f'{workdir}/buffer.db')}
+        for name, store in stores.items():
+            elapsed, io = steady_state(store, args.cameras, args.rounds)
+            print(f"  {name:31}: {elapsed * 1000 / args.rounds:7.2f} ms/round, "
+                  f"{io['wchar'] / buckets / 1024:6.1f} KiB written/bucket "
+                  f"({io['wchar'] / payload * args.cameras / buckets:5.1f}x the JSON), "
+                  f"{io['syscw'] / buckets:5.1f} writes/bucket, "
+                  f"{io['write_bytes'] / buckets / 1024:6.1f} KiB/bucket reached the device")
+
+        print(f"Backlog of {args.backlog} pending buckets:")
+        legacy, buffer = stores.values()
+        fill_backlog(legacy.engine, args.backlog, args.cameras)
+        fill_backlog(buffer.engine, args.backlog, args.cameras)
+        for name, store in stores.items():
+            # Mark the oldest pending buckets, as the upload thread does after a pass
+            # (the backlog was inserted oldest first, so their ids are consecutive)
+            marks = iter(range(store.pending_uploads(1)[0].id, 1 << 62, args.cameras))
+
+            def mark_ids():
+                first = next(marks)
+                return list(range(first, first + args.cameras))
+
+            pending_ms = timed(lambda: store.pending_uploads(10))
+            mark_ms = timed(lambda: store.mark_uploaded(mark_ids()))
+            print(f"  {name:31}: pending query {pending_ms:8.3f} ms, "
+                  f"marking {args.cameras} uploaded {mark_ms:8.3f} ms")
+        for store in stores.values():
+            store.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
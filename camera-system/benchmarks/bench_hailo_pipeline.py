@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Synchronous vs Pipelined Hailo Inference
+Drives HailoInferenceSession against FakeHailoDevice (fixed accelerator
+latency) with the agent's three stages: preprocess + send, recv, post-process.
+Reports single-camera throughput for each pipeline depth.
+
+Usage:
+    python3 benchmarks/bench_hailo_pipeline.py [--latency-ms 15] [--post-ms 5] [--frames 200]
+"""
+
+import argparse
+import queue
+import sys
+import threading
+import time
+from pathlib import Path
+
+import cv2  # type: ignore
+import numpy as np  # type: ignore
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from hailo_session import FakeHailoDevice, HailoInferenceSession  # noqa: E402
+
+
+def run_sync(frames: int, latency_ms: float, post_ms: float) -> float:
+    """Baseline: preprocess, infer and parse one frame at a time."""
+    device = FakeHailoDevice(latency=latency_ms / 1000.0)
+    session = HailoInferenceSession(device)
+    session.start()
+    session.ready.wait(timeout=5)
+
+    frame = np.random.randint(0, 255, (1080, 1920, 3), dtype=np.uint8)
+    start = time.perf_counter()
+    for _ in range(frames):
+        input_data = cv2.resize(frame, (640, 640))[np.newaxis]
+        session.infer(input_data)
+        time.sleep(post_ms / 1000.0)
+    elapsed = time.perf_counter() - start
+
+    session.stop()
+    return frames / elapsed
+
+
+def run(depth: int, frames: int, latency_ms: float, post_ms: float) -> float:
+    device = FakeHailoDevice(latency=latency_ms / 1000.0)
+    session = HailoInferenceSession(device, depth=depth)
+    session.start()
+    session.ready.wait(timeout=5)
+
+    frame = np.random.randint(0, 255, (1080, 1920, 3), dtype=np.uint8)
+    pending: queue.Queue = queue.Queue(maxsize=depth)
+    done = threading.Event()
+
+    def postprocess():
+        for _ in range(frames):
+            future = pending.get()
+            future.result(timeout=10)
+            time.sleep(post_ms / 1000.0)  # stand-in for YOLO parsing
+        done.set()
+
+    consumer = threading.Thread(target=postprocess, daemon=True)
+    start = time.perf_counter()
+    consumer.start()
+    for _ in range(frames):
+        input_data = cv2.resize(frame, (640, 640))[np.newaxis]
+        pending.put(session.submit(input_data))
+    done.wait()
+    elapsed = time.perf_counter() - start
+
+    session.stop()
+    return frames / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--latency-ms', type=float, default=15.0, help='Fake accelerator latency per frame')
+    parser.add_argument('--post-ms', type=float, default=5.0, help='Simulated post-processing time per frame')
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--depths', type=int, nargs='+', default=[2, 3, 4])
+    args = parser.parse_args()
+
+    print(f"Accelerator limit: {1000.0 / args.latency_ms:.1f} fps")
+    print(f"  synchronous: {run_sync(args.frames, args.latency_ms, args.post_ms):6.1f} fps")
+    for depth in args.depths:
+        fps = run(depth, args.frames, args.latency_ms, args.post_ms)
+        print(f"  pipelined depth={depth}: {fps:6.1f} fps")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Line Crossing, Per-call Checks vs One Vectorized Pass
+Moves N tracks one step and checks them against L counting lines, once with
+a per-track, per-line np.cross check (how LineCrossing.check_crossing worked)
+and once with tracker.segment_crossings over all tracks and lines at once.
+Also reports how many crossings the per-call check counted beyond a line's
+end points, which the segment test rejects.
+
+Usage:
+    python3 benchmarks/bench_line_crossing.py [--tracks 200] [--lines 8] [--iterations 200]
+"""
+
+import argparse
+import sys
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np  # type: ignore
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from tracker import segment_crossings  # noqa: E402
+
+FRAME_SIZE = (1920, 1080)
+
+
+def per_call_crossings(prev: np.ndarray, curr: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> int:
+    """Side-of-infinite-line test, one track and one line per call"""
+    crossed = 0
+    for prev_pos, curr_pos in zip(prev, curr):
+        for p1, p2 in zip(starts, ends):
+            line_vec = p2 - p1
+            if np.cross(line_vec, prev_pos - p1) * np.cross(line_vec, curr_pos - p1) < 0:
+                crossed += 1
+    return crossed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tracks', type=int, default=200)
+    parser.add_argument('--lines', type=int, default=8)
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    size = np.array(FRAME_SIZE, dtype=np.float64)
+    # Short lines scattered over the frame, tracks moving up to 40 px per frame
+    starts = rng.uniform(0, 1, (args.lines, 2)) * size
+    ends = np.clip(starts + rng.uniform(-300, 300, (args.lines, 2)), 0, size)
+    prev = [rng.uniform(0, 1, (args.tracks, 2)) * size for _ in range(args.iterations)]
+    curr = [p + rng.uniform(-40, 40, p.shape) for p in prev]
+
+    # 2-element np.cross is deprecated in NumPy 2; it is what the old check used
+    warnings.simplefilter('ignore', DeprecationWarning)
+    start = time.perf_counter()
+    per_call = sum(per_call_crossings(p, c, starts, ends) for p, c in zip(prev, curr))
+    per_call_ms = (time.perf_counter() - start) * 1000 / args.iterations
+
+    start = time.perf_counter()
+    vectorized = sum(int(np.count_nonzero(segment_crossings(p, c, starts, ends))) for p, c in zip(prev, curr))
+    vectorized_ms = (time.perf_counter() - start) * 1000 / args.iterations
+
+    print(f"{args.tracks} tracks x {args.lines} lines, {args.iterations} frames")
+    print(f"  per-call np.cross:   {per_call_ms:8.3f} ms/frame, {per_call} crossings")
+    print(f"  segment_crossings:   {vectorized_ms:8.3f} ms/frame, {vectorized} crossings "
+          f"({per_call_ms / vectorized_ms:.0f}x faster, {per_call - vectorized} beyond end points rejected)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Class-aware Non-Maximum Suppression
+Times postprocess.non_max_suppression on scenes with 10, 100 and 1000 raw
+candidates (clusters of overlapping duplicates around each object) and checks
+the result against a plain Python greedy NMS.
+
+Usage:
+    python3 benchmarks/bench_nms.py [--sizes 10 100 1000] [--iou 0.45]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np  # type: ignore
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from postprocess import non_max_suppression  # noqa: E402
+
+
+def synthetic_candidates(count: int, duplicates: int = 5, num_classes: int = 5, seed: int = 0):
+    """`count` boxes: jittered duplicates around count/duplicates objects in a 1080p frame."""
+    rng = np.random.default_rng(seed)
+    objects = max(1, count // duplicates)
+    centers = rng.uniform([0, 0], [1920, 1080], (objects, 2))
+    sizes = rng.uniform(20, 200, (objects, 2))
+    classes = rng.integers(0, num_classes, objects)
+
+    idx = rng.integers(0, objects, count)
+    jitter = rng.normal(0, 4, (count, 4))
+    boxes = np.hstack([centers[idx] - sizes[idx] / 2, centers[idx] + sizes[idx] / 2]) + jitter
+    scores = rng.uniform(0.5, 1.0, count)
+    return boxes, scores, classes[idx]
+
+
+def python_nms(boxes, scores, class_ids, iou_threshold, max_detections):
+    """Reference: pairwise greedy NMS in pure Python."""
+    def iou(a, b):
+        w = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+        h = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+        inter = w * h
+        union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+        return inter / union if union > 0 else 0.0
+
+    order = sorted(range(len(scores)), key=lambda i: -scores[i])
+    keep = []
+    for i in order:
+        if len(keep) >= max_detections:
+            break
+        if all(class_ids[i] != class_ids[k] or iou(boxes[i], boxes[k]) <= iou_threshold for k in keep):
+            keep.append(i)
+    return keep
+
+
+def timeit(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--iou', type=float, default=0.45)
+    parser.add_argument('--max-detections', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        boxes, scores, class_ids = synthetic_candidates(size)
+        keep = non_max_suppression(boxes, scores, class_ids, args.iou, args.max_detections)
+        reference = python_nms(boxes.tolist(), scores.tolist(), class_ids.tolist(),
+                               args.iou, args.max_detections)
+        match = '✓' if keep.tolist() == reference else '✗ differs from reference'
+
+        vectorized_ms = timeit(lambda: non_max_suppression(boxes, scores, class_ids,
+                                                           args.iou, args.max_detections),
+                               args.repeat)
+        python_ms = timeit(lambda: python_nms(boxes.tolist(), scores.tolist(), class_ids.tolist(),
+                                              args.iou, args.max_detections),
+                           max(1, args.repeat // 10))
+        print(f"{size:5d} candidates -> {len(keep):3d} kept {match}  "
+              f"vectorized {vectorized_ms:7.3f} ms  python {python_ms:8.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
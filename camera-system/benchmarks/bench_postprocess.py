@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Benchmark: YOLO Post-processing (Python loop vs vectorized)
+Compares the original per-row loop from Hailo Detector.postprocess_detections
+with the vectorized decoder in postprocess.py on recorded output tensors, and
+checks that both produce the same detections.
+
+Record tensors on a device with `np.save('outputs.npy', outputs[0])` inside
+Detector.detect_frame, then:
+    python3 benchmarks/bench_postprocess.py --outputs outputs.npy [outputs2.npy ...]
+
+Without --outputs a synthetic YOLOv8 tensor (8400 x 85) is used.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np  # type: ignore
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from postprocess import (class_filter_mask, decode_yolo_objectness, scale_boxes,  # noqa: E402
+                         build_detections)
+
+CLASS_MAPPING = {0: 'person', 2: 'car', 3: 'motorcycle', 5: 'bus', 7: 'truck'}
+TARGET_CLASSES = ['person', 'car', 'motorcycle', 'bus', 'truck']
+INPUT_SIZE = (640, 640)
+FRAME_SIZE = (1920, 1080)
+CONFIDENCE = 0.5
+
+
+def legacy_postprocess(output: np.ndarray):
+    """Original Detector.postprocess_detections loop."""
+    detections = []
+    orig_width, orig_height = FRAME_SIZE
+    input_width, input_height = INPUT_SIZE
+    for detection in output:
+        x_center, y_center, w, h = detection[:4]
+        obj_conf = detection[4]
+        class_scores = detection[5:]
+        class_id = np.argmax(class_scores)
+        class_conf = class_scores[class_id]
+        confidence = obj_conf * class_conf
+        if confidence < CONFIDENCE:
+            continue
+        if class_id not in CLASS_MAPPING:
+            continue
+        obj_class = CLASS_MAPPING[class_id]
+        if obj_class not in TARGET_CLASSES:
+            continue
+        x1 = int((x_center - w/2) * orig_width / input_width)
+        y1 = int((y_center - h/2) * orig_height / input_height)
+        x2 = int((x_center + w/2) * orig_width / input_width)
+        y2 = int((y_center + h/2) * orig_height / input_height)
+        x1 = max(0, min(x1, orig_width))
+        y1 = max(0, min(y1, orig_height))
+        x2 = max(0, min(x2, orig_width))
+        y2 = max(0, min(y2, orig_height))
+        detections.append({
+            'class': obj_class,
+            'confidence': float(confidence),
+            'bbox': [x1, y1, x2, y2],
+            'center': [int((x1 + x2) / 2), int((y1 + y2) / 2)]
+        })
+    return detections
+
+
+def vectorized_postprocess(output: np.ndarray):
+    class_mask = class_filter_mask(output.shape[1] - 5, CLASS_MAPPING, TARGET_CLASSES)
+    boxes, confidences, class_ids = decode_yolo_objectness(output, CONFIDENCE, class_mask)
+    boxes = scale_boxes(boxes, INPUT_SIZE, FRAME_SIZE)
+    return build_detections(boxes, confidences, class_ids, CLASS_MAPPING)
+
+
+def synthetic_output(rows: int = 8400, objects: int = 20, seed: int = 0) -> np.ndarray:
+    """YOLOv8-like tensor: mostly background rows plus a few confident objects."""
+    rng = np.random.default_rng(seed)
+    output = np.zeros((rows, 85), dtype=np.float32)
+    output[:, 0:2] = rng.uniform(0, 640, (rows, 2))
+    output[:, 2:4] = rng.uniform(8, 200, (rows, 2))
+    output[:, 4] = rng.uniform(0, 0.3, rows)
+    output[:, 5:] = rng.uniform(0, 0.3, (rows, 80))
+    hits = rng.choice(rows, objects, replace=False)
+    output[hits, 4] = rng.uniform(0.6, 1.0, objects)
+    output[hits, 5 + rng.choice([0, 2, 3, 5, 7, 1], objects)] = rng.uniform(0.8, 1.0, objects)
+    return output
+
+
+def load_outputs(paths):
+    tensors = []
+    for path in paths:
+        data = np.load(path)
+        # Accept [batch, rows, 85] or [rows, 85]
+        tensors.append(data[0] if data.ndim == 3 else data)
+    return tensors
+
+
+def timeit(fn, tensors, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for tensor in tensors:
+            fn(tensor)
+    return (time.perf_counter() - start) * 1000 / (repeat * len(tensors))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--outputs', nargs='+', help='Recorded output tensors (.npy)')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    tensors = load_outputs(args.outputs) if args.outputs else [synthetic_output()]
+
+    for tensor in tensors:
+        if legacy_postprocess(tensor) != vectorized_postprocess(tensor):
+            print("✗ Vectorized output differs from the legacy loop")
+            sys.exit(1)
+    print(f"✓ Outputs match on {len(tensors)} tensor(s) of shape {tensors[0].shape}")
+
+    legacy_ms = timeit(legacy_postprocess, tensors, max(1, args.repeat // 10))
+    vectorized_ms = timeit(vectorized_postprocess, tensors, args.repeat)
+    print(f"  legacy loop: {legacy_ms:8.2f} ms/frame")
+    print(f"  vectorized:  {vectorized_ms:8.2f} ms/frame ({legacy_ms / vectorized_ms:.0f}x)")
+
+
+if __name__ == '__main__':
+    main()
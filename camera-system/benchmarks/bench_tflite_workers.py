@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Benchmark: TFLite Throughput, In-process vs Worker Processes
+Runs a .tflite model in the agent's process (TFLiteBackend) and on
+TFLiteWorkerPool with 1..N worker processes, keeping one batch per worker
+in flight and collecting results in submission order as the agent does.
+`--busy-threads` adds pure-Python threads to the main process to stand in
+for capture, counting, upload and the API holding the GIL.
+
+Usage:
+    python3 benchmarks/bench_tflite_workers.py --model models/detect.tflite [--workers 1 2 3 4] [--frames 200] [--busy-threads 2]
+"""
+
+import argparse
+import collections
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np  # type: ignore
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from inference_backends import TFLiteBackend, TFLiteWorkerPool  # noqa: E402
+
+
+def busy(stop: threading.Event):
+    """Pure-Python work that holds the GIL"""
+    while not stop.is_set():
+        sum(i * i for i in range(1000))
+
+
+def run(backend, frames: int, batch_size: int) -> float:
+    batch = np.random.randint(0, 255, (batch_size,) + tuple(backend.input_shape), dtype=np.uint8)
+    in_flight = collections.deque()
+    start = time.perf_counter()
+    for _ in range(frames // batch_size):
+        if len(in_flight) >= backend.concurrency:
+            in_flight.popleft().result()
+        in_flight.append(backend.submit(batch))
+    while in_flight:
+        in_flight.popleft().result()
+    return (frames // batch_size) * batch_size / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--model', required=True)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 3, 4])
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--batch', type=int, default=1)
+    parser.add_argument('--threads', type=int, help='Interpreter threads per worker (default: cores / workers)')
+    parser.add_argument('--busy-threads', type=int, default=0)
+    args = parser.parse_args()
+
+    stop = threading.Event()
+    for _ in range(args.busy_threads):
+        threading.Thread(target=busy, args=(stop,), daemon=True).start()
+
+    config = {'numThreads': args.threads} if args.threads else {}
+    print(f"{args.model}: {args.frames} frames, batch {args.batch}, {args.busy_threads} busy thread(s)")
+    try:
+        backend = TFLiteBackend(args.model, config)
+        backend.load()
+        backend.warmup()
+        baseline = run(backend, args.frames, args.batch)
+        print(f"  in-process ({backend.num_threads} threads): {baseline:7.1f} fps")
+
+        for workers in args.workers:
+            pool = TFLiteWorkerPool(args.model, dict(config, workers=workers))
+            pool.load()
+            try:
+                fps = run(pool, args.frames, args.batch)
+            finally:
+                pool.close()
+            print(f"  {workers} worker(s) x {pool.worker_config['numThreads']} threads: "
+                  f"{fps:7.1f} fps ({fps / baseline:4.2f}x)")
+    finally:
+        stop.set()
+
+
+if __name__ == '__main__':
+    main()
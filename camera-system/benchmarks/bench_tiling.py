@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Tiled Inference Cost per Layout
+Builds the agent's tile layout for a 1080p frame at several tile sizes and
+runs each frame's tiles as one batch through HailoInferenceSession on
+FakeHailoDevice (fixed per-tile accelerator latency). Reports tiles per
+frame, throughput and per-tile latency, i.e. the accuracy/throughput
+trade-off to pick a `tiling.tileSize` for a site.
+
+Usage:
+    python3 benchmarks/bench_tiling.py [--latency-ms 15] [--frames 50] [--tile-sizes 640 960 1280]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np  # type: ignore
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from hailo_session import FakeHailoDevice, HailoInferenceSession  # noqa: E402
+from preprocess import FrameTiler, ZoneCrop  # noqa: E402
+
+FRAME_SIZE = (1920, 1080)
+INPUT_SIZE = (640, 640)
+
+
+def run(tiling: dict, frames: int, latency_ms: float):
+    tiler = FrameTiler(tiling, ZoneCrop({}))
+    layout = tiler.layout(FRAME_SIZE, INPUT_SIZE)
+
+    device = FakeHailoDevice(latency=latency_ms / 1000.0)
+    session = HailoInferenceSession(device)
+    session.start()
+    session.ready.wait(timeout=5)
+
+    frame = np.random.randint(0, 255, (FRAME_SIZE[1], FRAME_SIZE[0], 3), dtype=np.uint8)
+    batch = np.empty((len(layout), INPUT_SIZE[1], INPUT_SIZE[0], 3), dtype=np.uint8)
+    start = time.perf_counter()
+    for _ in range(frames):
+        frame_start = time.perf_counter()
+        layout.warp(frame, batch)
+        session.infer(batch)
+        tiler.record((time.perf_counter() - frame_start) * 1000, len(layout))
+    elapsed = time.perf_counter() - start
+
+    session.stop()
+    return tiler.get_stats(), frames / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--latency-ms', type=float, default=15.0, help='Fake accelerator latency per tile')
+    parser.add_argument('--frames', type=int, default=50)
+    parser.add_argument('--overlap', type=float, default=0.2)
+    parser.add_argument('--tile-sizes', type=int, nargs='+', default=[640, 960, 1280])
+    args = parser.parse_args()
+
+    configs = [('full frame', {})]
+    configs += [(f"tiles {size}px", {'enabled': True, 'tileSize': size, 'overlap': args.overlap})
+                for size in args.tile_sizes]
+
+    print(f"{FRAME_SIZE[0]}x{FRAME_SIZE[1]} -> {INPUT_SIZE[0]}x{INPUT_SIZE[1]}, "
+          f"{args.latency_ms:.0f} ms per tile on the accelerator")
+    for name, tiling in configs:
+        stats, fps = run(tiling, args.frames, args.latency_ms)
+        scale = INPUT_SIZE[0] / (tiling.get('tileSize') or FRAME_SIZE[0])
+        print(f"  {name:>12}: {stats['tiles_per_frame']:2d} tiles, scale {scale:4.2f}, "
+              f"{fps:5.1f} fps, {stats['per_tile_latency_ms']:5.1f} ms/tile")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Tracker Update Cost and Count Accuracy
+Simulates N objects moving across a 1080p frame (jittered boxes, a few
+missed detections) through the agent's ObjectTracker with a counting line
+down the middle. Reports per-frame update time and compares counted line
+crossings and ID switches (a simulated object's detections changing track)
+with the simulated ground truth, with the
+Kalman motion model and with last-position matching. `--stride 4` infers
+every 4th frame of the 15 fps camera (3.75 fps), as the motion gate or an
+overloaded accelerator would.
+
+Usage:
+    python3 benchmarks/bench_tracker.py [--objects 10 100 500] [--frames 300] [--miss-rate 0.05] [--stride 1 3 5]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np  # type: ignore
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from tracker import ObjectTracker, SCIPY_AVAILABLE  # noqa: E402
+
+FRAME_SIZE = (1920, 1080)
+LINE_X = FRAME_SIZE[0] / 2
+CAMERA_FPS = 15
+
+
+class Scene:
+    """Objects on straight paths; one leaving the frame is replaced by a new one"""
+
+    def __init__(self, objects: int, rng: np.random.Generator):
+        self.rng = rng
+        self.positions = np.column_stack([rng.uniform(0, FRAME_SIZE[0], objects),
+                                          rng.uniform(0, FRAME_SIZE[1], objects)])
+        self.velocities = np.zeros((objects, 2))
+        self.sizes = np.zeros(objects)
+        self.identities = np.arange(objects)
+        self.objects_seen = objects
+        self.crossings = 0
+        for index in range(objects):
+            self._respawn(index, keep_position=True)
+
+    def _respawn(self, index: int, keep_position: bool = False):
+        speed = self.rng.uniform(2, 12)  # pixels per frame
+        angle = self.rng.uniform(0, 2 * np.pi)
+        self.velocities[index] = speed * np.cos(angle), speed * np.sin(angle)
+        self.sizes[index] = self.rng.uniform(30, 80)
+        if not keep_position:
+            self.positions[index] = self.rng.uniform(0, FRAME_SIZE[0]), self.rng.uniform(0, FRAME_SIZE[1])
+            self.identities[index] = self.objects_seen
+            self.objects_seen += 1
+
+    def step(self):
+        previous = self.positions.copy()
+        self.positions += self.velocities
+        self.crossings += int(np.count_nonzero((previous[:, 0] - LINE_X) * (self.positions[:, 0] - LINE_X) < 0))
+        for index in np.flatnonzero((self.positions < 0).any(axis=1) |
+                                    (self.positions[:, 0] > FRAME_SIZE[0]) |
+                                    (self.positions[:, 1] > FRAME_SIZE[1])):
+            self._respawn(index)
+
+    def detect(self, miss_rate: float):
+        visible = self.rng.random(len(self.positions)) >= miss_rate
+        centers = self.positions[visible] + self.rng.normal(0, 1.5, (np.count_nonzero(visible), 2))
+        half = self.sizes[visible, None] / 2
+        boxes = np.hstack([centers - half, centers + half])
+        return [{'class': 'car', 'confidence': 0.9, 'bbox': box.tolist(), 'center': center.tolist(),
+                 'object': int(identity)}
+                for box, center, identity in zip(boxes, centers, self.identities[visible])]
+
+
+def run(objects: int, frames: int, miss_rate: float, stride: int, kalman: bool, seed: int = 0):
+    scene = Scene(objects, np.random.default_rng(seed))
+    line = {'name': 'middle', 'line': [[LINE_X, 0], [LINE_X, FRAME_SIZE[1]]]}
+    tracker = ObjectTracker({'kalman': kalman}, lines=[line])
+
+    times = []
+    crossings = 0
+    id_switches = 0
+    last_track = {}
+    for frame in range(frames * stride):
+        scene.step()
+        if frame % stride:
+            continue
+        detections = scene.detect(miss_rate)
+        start = time.perf_counter()
+        events = tracker.update(detections, timestamp=frame / CAMERA_FPS)
+        times.append((time.perf_counter() - start) * 1000)
+        crossings += sum(1 for event in events if event.kind == 'crossed')
+        for detection in detections:
+            previous = last_track.get(detection['object'])
+            id_switches += previous is not None and previous != detection['track_id']
+            last_track[detection['object']] = detection['track_id']
+    return np.array(times), crossings, id_switches, scene, tracker
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--objects', type=int, nargs='+', default=[10, 100, 500])
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--miss-rate', type=float, default=0.05)
+    parser.add_argument('--stride', type=int, nargs='+', default=[1],
+                        help=f'Camera frames per inferred frame ({CAMERA_FPS} fps camera)')
+    args = parser.parse_args()
+
+    print(f"Assignment: {'Hungarian (SciPy)' if SCIPY_AVAILABLE else 'greedy (SciPy not installed)'}, "
+          f"{args.frames} inferred frames, {args.miss_rate:.0%} missed detections")
+    for stride in args.stride:
+        print(f"Inference at {CAMERA_FPS / stride:.1f} fps:")
+        for objects in args.objects:
+            for kalman in (True, False):
+                times, crossings, id_switches, scene, tracker = run(objects, args.frames, args.miss_rate, stride, kalman)
+                stats = tracker.get_stats()
+                print(f"  {objects:4d} objects, {stats['motion_model']:>13}: "
+                      f"{times.mean():6.2f} ms/frame (p95 {np.percentile(times, 95):6.2f}), "
+                      f"line crossings {crossings}/{scene.crossings}, "
+                      f"ID switches {id_switches} ({scene.objects_seen} objects)")
+
+
+if __name__ == '__main__':
+    main()
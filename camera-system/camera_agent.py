@@ -3,13 +3,14 @@
 Camera Edge Agent for Multi-Tier Object Detection Counter
 Production-ready implementation with Firebase integration
 
-Supports:
+Supports (see inference_backends.py):
 - Hailo-8 AI Accelerator (Raspberry Pi 5 + Hailo-8 HAT+)
 - TensorFlow Lite (fallback)
+- ONNX Runtime on the CPU (x86 hosts, CI)
 
 Requirements:
 - Python 3.8+
-- HailoRT (for Hailo-8) OR TensorFlow Lite 2.x (fallback)
+- HailoRT (for Hailo-8), TensorFlow Lite 2.x or ONNX Runtime
 - OpenCV 4.x
 - Firebase Admin SDK
 - SQLAlchemy
@@ -21,64 +22,23 @@ import time
 import threading
 import queue
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional
 import firebase_admin  # type: ignore[import-untyped]  # Installed via requirements.txt
 from firebase_admin import credentials, firestore, auth  # type: ignore[import-untyped]  # Installed via requirements.txt
-# Import SQLAlchemy with error handling
-try:
-    from sqlalchemy import create_engine, Column, Integer, String, DateTime, JSON  # type: ignore[import-untyped]
-    # SQLAlchemy 2.0+ uses sqlalchemy.orm for declarative_base
-    try:
-        from sqlalchemy.orm import declarative_base, sessionmaker  # type: ignore[import-untyped]
-    except ImportError:
-        # Fallback for SQLAlchemy < 2.0
-        from sqlalchemy.ext.declarative import declarative_base  # type: ignore[import-untyped]
-        from sqlalchemy.orm import sessionmaker  # type: ignore[import-untyped]
-except ImportError:
-    raise ImportError(
-        "SQLAlchemy is required but not installed.\n"
-        "Please install it using: pip install sqlalchemy>=1.4.0\n"
-        "Or on Raspberry Pi: pip3 install sqlalchemy"
-    )
-
 import hashlib
 import requests  # type: ignore[import-untyped]  # type: ignore[import-untyped]
 
-# Import OpenCV with error handling
-try:
-    import cv2  # type: ignore
-except ImportError:
-    raise ImportError(
-        "OpenCV (cv2) is required but not installed.\n"
-        "Please install it using: pip install opencv-python>=4.5.0\n"
-        "Or on Raspberry Pi: sudo apt-get install -y python3-opencv"
-    )
-
-# Try to import Hailo first (preferred for RPi 5 + Hailo-8)
-HAILO_AVAILABLE = False
-try:
-    from hailo_platform import HEF, VDevice, InferVStreams  # type: ignore[import-untyped]
-    HAILO_AVAILABLE = True
-    logger_detect = logging.getLogger(__name__)
-    logger_detect.info("Hailo-8 AI accelerator detected")
-except ImportError:
-    pass
-
-# Fallback to TensorFlow Lite if Hailo not available
-TFLITE_AVAILABLE = False
-tflite = None  # Will be set if import succeeds
-
-if not HAILO_AVAILABLE:
-    try:
-        import tflite_runtime.interpreter as tflite  # type: ignore
-        TFLITE_AVAILABLE = True
-        logger_detect = logging.getLogger(__name__)
-        logger_detect.info("Using TensorFlow Lite (Hailo-8 not available)")
-    except ImportError:
-        TFLITE_AVAILABLE = False
-        raise ImportError("Neither Hailo-8 nor TensorFlow Lite available. Please install one of them.")
+# Inference engines (Hailo-8, TensorFlow Lite, ONNX Runtime) are optional; the
+# backend for the configured model is checked when the detector is initialized
+from inference_backends import available_backends, create_backend
+from postprocess import OUTPUT_DECODERS, build_detections, non_max_suppression
+from frame_buffers import BufferPool, PooledBuffer
+from preprocess import TileLayout
+from camera_streams import CameraStream, ScheduledFrame, StreamScheduler, camera_configs
+from aggregation import ROLLUP_PERIODS, AggregationEngine, CountAccumulator, CountSnapshot
+from count_buffer import CountBuffer
 
 # Configure logging
 logging.basicConfig(
@@ -91,19 +51,8 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Database models for local buffering
-Base = declarative_base()
-
-class BufferedCount(Base):
-    __tablename__ = 'buffered_counts'
-    
-    id = Column(Integer, primary_key=True)
-    timestamp = Column(DateTime, nullable=False)
-    camera_id = Column(String(50), nullable=False)
-    counts_json = Column(JSON, nullable=False)
-    metadata_json = Column(JSON)
-    uploaded = Column(Integer, default=0)
-    created_at = Column(DateTime, default=datetime.utcnow)
+# Firestore collection per rollup period, under /cameras/{cameraId}/
+ROLLUP_COLLECTIONS = {'hour': 'hourlyCounts', 'day': 'dailyCounts'}
 
 class CameraEdgeAgent:
     """Main camera edge agent class"""
@@ -114,29 +63,38 @@ class CameraEdgeAgent:
         self.running = False
         self.detection_active = False  # Controlled via API
         
+        # One stream per camera (capture source, zones, counting state, metrics);
+        # a config without `cameras` is a single stream for the top-level cameraId
+        frames_ready = threading.Condition()
+        self.streams = [CameraStream(camera, self.config, frames_ready)
+                        for camera in camera_configs(self.config)]
+        
+        # All streams share one detector; the scheduler batches their latest frames
+        self.stream_scheduler = StreamScheduler(self.streams, frames_ready,
+                                                self.config['detectionConfig'].get('maxBatchFrames'))
+        
         # Queues for inter-thread communication
-        self.frame_queue = queue.Queue(maxsize=30)
-        self.detection_queue = queue.Queue(maxsize=100)
         self.upload_queue = queue.Queue(maxsize=1000)
         
         # Backend API configuration (set via API calls)
         self.backend_url = None
         self.backend_api_key = None
         self.backend_report_interval = 5
-        self.last_backend_report = None
+        self.last_backend_report = {}  # cameraId -> last successful report
         
         # Initialize components
         self._init_database()
         self._init_firebase()
         self._init_detector()
-        self._init_tracker()
+        self._init_aggregation()
         
         # Initialize API server if enabled
         self.api_server = None
         if self.config.get('apiConfig', {}).get('enabled', True):
             self._init_api_server()
         
-        logger.info(f"Camera agent initialized: {self.config['cameraId']}")
+        logger.info(f"Camera agent initialized: {self.config['cameraId']} "
+                    f"(cameras: {', '.join(stream.camera_id for stream in self.streams)})")
     
     def _load_config(self, config_path: str) -> Dict:
         """Load configuration from JSON file"""
@@ -154,12 +112,9 @@ class CameraEdgeAgent:
     def _init_database(self):
         """Initialize local SQLite database for buffering"""
         db_path = f"/var/lib/camera_agent/{self.config['cameraId']}.db"
-        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
-        
-        self.engine = create_engine(f'sqlite:///{db_path}')
-        Base.metadata.create_all(self.engine)
-        Session = sessionmaker(bind=self.engine)
-        self.db_session = Session()
+        self.buffer = CountBuffer(db_path)
+        # Buckets closed in one aggregation round, written in one transaction
+        self.closed_buckets = []
         
         logger.info(f"Local database initialized: {db_path}")
     
@@ -179,182 +134,107 @@ class CameraEdgeAgent:
             # Agent can still run without Firebase (will buffer locally)
     
     def _init_detector(self):
-        """Initialize object detection model (Hailo-8 or TensorFlow Lite)"""
-        model_path = self.config['detectionConfig']['modelPath']
+        """Initialize the object detection backend for the configured model"""
+        detection_config = self.config['detectionConfig']
+        model_path = detection_config['modelPath']
         
         # Check if model file exists
         if not Path(model_path).exists():
             error_msg = f"Model file not found: {model_path}"
             logger.error(error_msg)
-            if HAILO_AVAILABLE:
-                raise FileNotFoundError(
-                    f"{error_msg}\n"
-                    f"Please ensure the HEF model file is installed on the Raspberry Pi.\n"
-                    f"Expected locations: /opt/camera-agent/models/yolov8n.hef or /opt/camera-agent/model.hef\n"
-                    f"For Hailo-8, you need a HEF (Hailo Executable Format) file, not TFLite."
-                )
-            else:
-                raise FileNotFoundError(
-                    f"{error_msg}\n"
-                    f"Please ensure the model file is installed on the Raspberry Pi.\n"
-                    f"Expected locations: /opt/camera-agent/model.tflite or /opt/camera-agent/models/yolov8n.tflite"
-                )
+            raise FileNotFoundError(
+                f"{error_msg}\n"
+                f"Please ensure the model file is installed on the device.\n"
+                f"Expected locations: /opt/camera-agent/models/yolov8n.hef (Hailo-8), "
+                f"/opt/camera-agent/model.tflite (TensorFlow Lite) or "
+                f"/opt/camera-agent/models/yolov8n.onnx (ONNX Runtime)\n"
+                f"Installed backends: {', '.join(available_backends()) or 'none'}"
+            )
         
         # Model configuration
-        self.confidence_threshold = self.config['detectionConfig']['confidenceThreshold']
-        self.object_classes = self.config['detectionConfig']['objectClasses']
-        self.detector_type = None
-        
-        # Try Hailo-8 first
-        if HAILO_AVAILABLE and model_path.endswith('.hef'):
-            self._init_hailo_detector(model_path)
-        elif HAILO_AVAILABLE and TFLITE_AVAILABLE:
-            # If Hailo available but model is .tflite, check if we should prefer Hailo
-            logger.warning("Hailo-8 available but model is TFLite format. Using TFLite.")
-            logger.warning("For better performance, use a HEF model file (.hef)")
-            self._init_tflite_detector(model_path)
-        elif TFLITE_AVAILABLE:
-            self._init_tflite_detector(model_path)
-        else:
-            raise RuntimeError("No compatible inference engine available")
-    
-    def _init_hailo_detector(self, model_path: str):
-        """Initialize Hailo-8 detector"""
-        try:
-            logger.info("Initializing Hailo-8 AI Accelerator...")
-            
-            # Load HEF model
-            self.hef = HEF(model_path)
-            
-            # Create virtual device
-            self.vdevice = VDevice()
-            
-            # Configure network group
-            self.network_group = self.vdevice.configure(self.hef)
-            
-            # Get input/output vstreams
-            self.network_group_params = self.network_group.create_params()
-            
-            # Get input/output shapes
-            input_vstream_info = self.network_group.get_input_vstream_infos()[0]
-            output_vstream_info = self.network_group.get_output_vstream_infos()[0]
-            
-            self.input_shape = input_vstream_info.shape
-            self.output_shape = output_vstream_info.shape
-            
-            # Store network group params for inference
-            # We'll create vstreams during each inference to ensure thread safety
-            
-            self.detector_type = 'hailo'
-            
-            logger.info(f"✓ Hailo-8 model loaded: {model_path}")
-            logger.info(f"  Input shape: {self.input_shape}")
-            logger.info(f"  Output shape: {self.output_shape}")
-            logger.info(f"  Object classes: {self.object_classes}")
-            logger.info(f"  Confidence threshold: {self.confidence_threshold}")
-            logger.info("  Using Hailo-8 AI Accelerator for inference")
-            
-        except Exception as e:
-            logger.error(f"Failed to initialize Hailo-8 detector: {e}")
-            raise
-    
-    def _init_tflite_detector(self, model_path: str):
-        """Initialize TensorFlow Lite detector (fallback)"""
-        if not TFLITE_AVAILABLE or tflite is None:
-            raise RuntimeError("TensorFlow Lite is not available")
+        self.confidence_threshold = detection_config['confidenceThreshold']
+        self.object_classes = detection_config['objectClasses']
+        self.nms_iou_threshold = detection_config.get('nmsIouThreshold', 0.45)
+        self.max_detections = detection_config.get('maxDetections', 100)
         
         try:
-            logger.info("Initializing TensorFlow Lite detector...")
-            
-            self.interpreter = tflite.Interpreter(model_path=model_path)
-            self.interpreter.allocate_tensors()
-            
-            # Get input and output details
-            self.input_details = self.interpreter.get_input_details()
-            self.output_details = self.interpreter.get_output_details()
-            
-            self.detector_type = 'tflite'
-            
-            logger.info(f"✓ TensorFlow Lite model loaded: {model_path}")
-            logger.info(f"  Input shape: {self.input_details[0]['shape']}")
-            logger.info(f"  Number of output tensors: {len(self.output_details)}")
-            logger.info(f"  Object classes: {self.object_classes}")
-            logger.info(f"  Confidence threshold: {self.confidence_threshold}")
-            
+            self.backend = create_backend(model_path, detection_config)
+            logger.info(f"Initializing {self.backend.name} inference backend...")
+            self.backend.load()
+            self.backend.warmup()
         except Exception as e:
-            logger.error(f"Failed to load TFLite model: {e}")
+            logger.error(f"Failed to initialize detector: {e}")
             raise
-    
-    def _init_tracker(self):
-        """Initialize object tracker for preventing double counting"""
-        self.tracked_objects = {}
-        self.next_object_id = 0
-        self.max_disappeared = 30  # frames
-        self.max_distance = 50  # pixels
-    
-    def _point_in_polygon(self, point: Tuple[int, int], polygon: List[List[int]]) -> bool:
-        """Check if point is inside polygon (detection zone)"""
-        x, y = point
-        n = len(polygon)
-        inside = False
-        
-        j = n - 1
-        for i in range(n):
-            xi, yi = polygon[i]
-            xj, yj = polygon[j]
-            
-            if ((yi > y) != (yj > y)) and (x < (xj - xi) * (y - yi) / (yj - yi) + xi):
-                inside = not inside
-            j = i
-        
-        return inside
-    
-    def capture_thread(self):
-        """Thread for capturing video frames"""
-        cap = cv2.VideoCapture(0)  # USB camera or RTSP stream
-        cap.set(cv2.CAP_PROP_FPS, 15)
-        cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1920)
-        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 1080)
-        
-        logger.info("Video capture started")
         
-        last_fps_time = time.time()
-        fps_frame_count = 0
+        # Batches in flight (1 = synchronous send/recv); at least one per worker
+        # for backends that infer several batches at once
+        self.pipeline_depth = max(1, int(detection_config.get('pipelineDepth', 1)), self.backend.concurrency)
+        self.pending_inferences = queue.Queue(maxsize=self.pipeline_depth)
+        
+        self.detector_type = self.backend.name
+        self.input_shape = self.backend.input_shape
+        self.decode_output = OUTPUT_DECODERS[self.backend.output_schema]
+        
+        # Preallocated model input batches: pipeline_depth queued for post-processing,
+        # one the post-processing thread is waiting on and one being filled (a
+        # worker-pool backend's concurrency is within pipeline_depth). Motion gate,
+        # zone crop and tiling are per stream (see CameraStream)
+        self.input_pool = BufferPool((1,) + tuple(self.input_shape), np.uint8,
+                                     count=self.pipeline_depth + 2)
+        
+        logger.info(f"✓ Detector ready: {self.detector_type} ({model_path})")
+        logger.info(f"  Input shape: {self.input_shape}")
+        logger.info(f"  Output schema: {self.backend.output_schema}")
+        logger.info(f"  Object classes: {self.object_classes}")
+        logger.info(f"  Confidence threshold: {self.confidence_threshold}")
+        logger.info(f"  Pipeline depth: {self.pipeline_depth if self.pipelined else 1}")
+    
+    def capture_thread(self, stream: CameraStream):
+        """Thread for capturing video frames from one camera stream"""
+        source = stream.frame_source
+        logger.info(f"Video capture started [{stream.camera_id}]: {source.kind} {source.target}")
         
         while self.running:
-            ret, frame = cap.read()
+            # Decode straight into a pooled buffer instead of a fresh 1080p array
+            buffer = stream.frame_pool.acquire()
+            ret, frame = source.read(image=buffer.array)
             if not ret:
-                logger.warning("Failed to capture frame")
+                buffer.release()
+                if source.exhausted:
+                    logger.info(f"Frame source exhausted [{stream.camera_id}]: {source.target}")
+                    break
+                if source.connected:
+                    logger.warning(f"Failed to capture frame [{stream.camera_id}]")
                 time.sleep(0.1)
                 continue
             
-            # Update frame count and FPS
-            if hasattr(self, 'frame_count'):
-                self.frame_count += 1
-            fps_frame_count += 1
+            if not np.shares_memory(frame, buffer.array):
+                # Source delivered a different size, so OpenCV allocated a new array;
+                # resize the pool so the next reads fit
+                buffer.release()
+                buffer = None
+                stream.frame_pool.reshape(frame.shape)
             
-            # Calculate FPS every second
-            current_time = time.time()
-            if current_time - last_fps_time >= 1.0:
-                if hasattr(self, 'current_fps'):
-                    self.current_fps = fps_frame_count / (current_time - last_fps_time)
-                fps_frame_count = 0
-                last_fps_time = current_time
+            # Update frame count and FPS
+            stream.record_capture()
             
-            # Put frame in queue (drop if full)
-            try:
-                self.frame_queue.put(frame, block=False)
-            except queue.Full:
-                pass  # Drop frame if queue is full
+            # Publish frame (replaces any frame the detector has not taken yet)
+            stream.frame_slot.put(frame, buffer)
             
-            time.sleep(1/15)  # 15 FPS
+            if source.realtime:
+                stream.rate_scheduler.update()
+                stream.rate_scheduler.wait()
+            else:
+                # File/image sources: feed frames as fast as detection takes them
+                while self.running and not stream.frame_slot.wait_until_taken(timeout=1):
+                    pass
         
-        cap.release()
-        logger.info("Video capture stopped")
+        source.release()
+        logger.info(f"Video capture stopped [{stream.camera_id}]")
     
     def detection_thread(self):
-        """Thread for running object detection on frames"""
-        logger.info("Detection thread started")
+        """Thread for running object detection on frames from all streams"""
+        logger.info(f"Detection thread started ({len(self.streams)} stream(s))")
         
         while self.running:
             # Skip detection if not active (controlled via API)
@@ -362,268 +242,262 @@ class CameraEdgeAgent:
                 time.sleep(0.5)
                 continue
             
-            try:
-                frame = self.frame_queue.get(timeout=1)
-            except queue.Empty:
+            # Latest frame of each stream picked by the scheduler, inferred as one batch
+            jobs = []
+            for stream, captured in self.stream_scheduler.next_batch(timeout=1):
+                if stream.motion_gate.enabled and not stream.motion_gate.should_infer(captured.image):
+                    captured.release()
+                    stream.frames_gated += 1
+                    continue
+                jobs.append(ScheduledFrame(stream, captured, stream.frames_gated))
+                stream.frames_gated = 0
+            if not jobs:
                 continue
             
-            # Run inference based on detector type
-            if self.detector_type == 'hailo':
-                detections, inference_time = self._run_hailo_inference(frame)
-            else:  # tflite
-                detections, inference_time = self._run_tflite_inference(frame)
+            # Run inference on the backend; the capture buffers are recycled
+            # once inference no longer needs the frames
+            try:
+                if self.pipelined:
+                    # Pipelined mode: postprocess_thread collects the result
+                    self._submit_inference(jobs)
+                    continue
+                results, inference_time = self._run_inference(jobs)
+            except Exception as e:
+                # e.g. a preprocessing error or a backend rejecting the batch;
+                # keep the thread alive and try the next frames
+                logger.error(f"Detection error: {e}")
+                time.sleep(1)
+                continue
+            finally:
+                for job in jobs:
+                    job.frame.release()
             
-            # Put detections in queue with timestamp
-            self.detection_queue.put({
-                'timestamp': datetime.utcnow(),
-                'detections': detections,
-                'inference_time': inference_time
-            })
+            # Put detections in each stream's queue with the capture timestamp
+            for job, detections in zip(jobs, results):
+                job.stream.detection_queue.put(self._detection_result(job, detections, inference_time))
         
         logger.info("Detection thread stopped")
     
-    def _run_hailo_inference(self, frame: np.ndarray) -> Tuple[List[Dict], float]:
-        """Run inference using Hailo-8 accelerator"""
+    @property
+    def pipelined(self) -> bool:
+        """True when send, recv and post-processing run as separate stages"""
+        return self.backend.asynchronous and self.pipeline_depth > 1
+    
+    def _frame_layout(self, stream: CameraStream, frame: np.ndarray,
+                      input_height: int, input_width: int) -> TileLayout:
+        """Model views (zone crop or tiles) of a stream's frame; one batch entry each"""
+        height, width = frame.shape[:2]
+        return stream.frame_tiler.layout((width, height), (input_width, input_height))
+    
+    def _preprocess_batch(self, jobs: List[ScheduledFrame]) -> Tuple[PooledBuffer, int, List[TileLayout]]:
+        """Crop/resize the frames of all jobs into one pooled model input batch (NHWC uint8 BGR)"""
+        # Input shape: [height, width, channels]
+        layouts = [self._frame_layout(job.stream, job.frame.image, self.input_shape[-3], self.input_shape[-2])
+                   for job in jobs]
+        batch_size = sum(len(layout) for layout in layouts)
+        if self.input_pool.shape[0] < batch_size:
+            # Grow only, so alternating batch sizes reuse the same buffers
+            self.input_pool.reshape((batch_size,) + tuple(self.input_shape))
+        
+        # The warps write into the batch slots directly
+        input_buffer = self.input_pool.acquire()
+        try:
+            offset = 0
+            for job, layout in zip(jobs, layouts):
+                layout.warp(job.frame.image, input_buffer.array[offset:offset + len(layout)])
+                offset += len(layout)
+        except Exception:
+            input_buffer.release()
+            raise
+        return input_buffer, batch_size, layouts
+    
+    def _submit_batch(self, input_buffer: PooledBuffer, batch_size: int):
+        """Submit a pooled input batch; it returns to the pool once inference is done"""
+        try:
+            future = self.backend.submit(input_buffer.array[:batch_size])
+        except Exception:
+            # Rejected before it was queued (e.g. no free worker slot): no callback will release it
+            input_buffer.release()
+            raise
+        future.add_done_callback(lambda _: input_buffer.release())
+        return future
+    
+    def _split_output(self, outputs: List[np.ndarray], jobs: List[ScheduledFrame],
+                      layouts: List[TileLayout], inference_time: float) -> List[List[Dict]]:
+        """Parse batched backend outputs back into detections per frame"""
+        batch_size = sum(len(layout) for layout in layouts)
+        results = []
+        offset = 0
+        for job, layout in zip(jobs, layouts):
+            job.stream.frame_tiler.record(inference_time, len(layout), batch_size)
+            results.append(self._parse_output([output[offset:offset + len(layout)] for output in outputs],
+                                              layout))
+            offset += len(layout)
+        return results
+    
+    def _detection_result(self, job: ScheduledFrame, detections: List[Dict],
+                          inference_time: float) -> Dict:
+        """
+        Build a detection_queue entry stamped with the frame's capture metadata.
+        
+        `frames_skipped` tells the tracker how many frames the motion gate
+        skipped since the previous entry (no change, so not missed detections).
+        """
+        latency_ms = (time.monotonic() - job.frame.captured_at) * 1000
+        job.stream.motion_gate.record_inference(inference_time)
+        job.stream.record_result(latency_ms)
+        return {
+            'timestamp': job.frame.timestamp,
+            'frame_sequence': job.frame.sequence,
+            'captured_at': job.frame.captured_at,
+            'frames_skipped': job.frames_skipped,
+            'latency_ms': latency_ms,
+            'detections': detections,
+            'inference_time': inference_time
+        }
+    
+    def _submit_inference(self, jobs: List[ScheduledFrame]):
+        """Preprocess and send a batch without waiting for its result (pipelined mode)"""
         start_time = time.time()
+        input_buffer, batch_size, layouts = self._preprocess_batch(jobs)
+        future = self._submit_batch(input_buffer, batch_size)
+        
+        # Blocks once pipeline_depth batches are awaiting post-processing
+        jobs = [job._replace(frame=job.frame._replace(image=None, buffer=None)) for job in jobs]
+        self.pending_inferences.put((future, jobs, layouts, start_time))
+    
+    def postprocess_thread(self):
+        """Thread for collecting pipelined inference results and parsing them in frame order"""
+        logger.info(f"Post-processing thread started (pipeline depth: {self.pipeline_depth})")
         
-        # Get input shape (Hailo format: [batch, height, width, channels])
-        input_height, input_width = self.input_shape[1], self.input_shape[2]
+        while self.running:
+            try:
+                future, jobs, layouts, start_time = self.pending_inferences.get(timeout=1)
+            except queue.Empty:
+                continue
+            
+            try:
+                outputs = future.result(timeout=10)
+            except Exception as e:
+                logger.error(f"{self.detector_type} inference error: {e}")
+                continue
+            
+            # Latency from preprocessing start to output received
+            inference_time = (time.time() - start_time) * 1000
+            results = self._split_output(outputs, jobs, layouts, inference_time)
+            for job, detections in zip(jobs, results):
+                job.stream.detection_queue.put(self._detection_result(job, detections, inference_time))
         
-        # Preprocess frame
-        resized_frame = cv2.resize(frame, (input_width, input_height))
+        logger.info("Post-processing thread stopped")
+    
+    def _run_inference(self, jobs: List[ScheduledFrame]) -> Tuple[List[List[Dict]], float]:
+        """Run inference for a batch of frames and wait for the result"""
+        start_time = time.time()
         
-        # Hailo expects NHWC format, normalized 0-255
-        input_data = resized_frame.astype(np.uint8)
-        input_data = np.expand_dims(input_data, axis=0)  # Add batch dimension
+        # Preprocess frames
+        input_buffer, batch_size, layouts = self._preprocess_batch(jobs)
         
         try:
-            # Create vstreams for this inference (thread-safe)
-            with InferVStreams(self.network_group, self.network_group_params) as infer_pipeline:
-                input_vstreams = infer_pipeline.input
-                output_vstreams = infer_pipeline.output
-                
-                # Run inference on Hailo-8
-                input_vstreams[0].send(input_data)
-                output_data = output_vstreams[0].recv()
-            
+            outputs = self._submit_batch(input_buffer, batch_size).result(timeout=10)
             inference_time = (time.time() - start_time) * 1000
-            
-            # Post-process Hailo output (format depends on YOLO model)
-            # Hailo YOLO outputs: [batch, num_detections, 6] where 6 = [x, y, w, h, conf, class]
-            # Or flattened format depending on model
-            detections = self._parse_hailo_yolo_output(output_data, frame.shape[:2])
-            
-            return detections, inference_time
+            return self._split_output(outputs, jobs, layouts, inference_time), inference_time
             
         except Exception as e:
-            logger.error(f"Hailo inference error: {e}")
-            return [], 0.0
-    
-    def _run_tflite_inference(self, frame: np.ndarray) -> Tuple[List[Dict], float]:
-        """Run inference using TensorFlow Lite"""
-        start_time = time.time()
-        
-        # Preprocess frame
-        input_shape = self.input_details[0]['shape']
-        input_height, input_width = input_shape[1], input_shape[2]
-        
-        resized_frame = cv2.resize(frame, (input_width, input_height))
-        input_data = np.expand_dims(resized_frame, axis=0)
-        
-        if self.input_details[0]['dtype'] == np.uint8:
-            input_data = input_data.astype(np.uint8)
-        else:
-            input_data = (input_data.astype(np.float32) - 127.5) / 127.5
-        
-        # Run inference
-        self.interpreter.set_tensor(self.input_details[0]['index'], input_data)
-        self.interpreter.invoke()
-        inference_time = (time.time() - start_time) * 1000
-        
-        # Get detections
-        boxes = self.interpreter.get_tensor(self.output_details[0]['index'])[0]
-        classes = self.interpreter.get_tensor(self.output_details[1]['index'])[0]
-        scores = self.interpreter.get_tensor(self.output_details[2]['index'])[0]
-        
-        # Parse detections
-        detections = self._parse_tflite_yolo_output(boxes, classes, scores, frame.shape[:2])
-        
-        return detections, inference_time
-    
-    def _parse_hailo_yolo_output(self, output_data: np.ndarray, frame_shape: Tuple[int, int]) -> List[Dict]:
-        """Parse Hailo YOLO output format to detections"""
-        detections = []
-        height, width = frame_shape
-        
-        # Hailo YOLO output format varies by model
-        # Common formats:
-        # 1. [batch, num_detections, 6] - [x, y, w, h, conf, class_id]
-        # 2. Separate tensors for boxes, scores, classes
-        # 3. Flattened format
-        
-        output_shape = output_data.shape
-        logger.debug(f"Hailo output shape: {output_shape}")
-        
-        # Handle different output formats
-        if len(output_shape) == 3 and output_shape[2] >= 6:
-            # Format: [batch, num_detections, 6+]
-            num_detections = output_shape[1]
-            for i in range(num_detections):
-                det = output_data[0, i]
-                if len(det) >= 6:
-                    # Assuming format: [x_center, y_center, width, height, confidence, class_id, ...]
-                    x_center, y_center, w, h, conf, class_id = det[0:6]
-                    
-                    if conf > self.confidence_threshold:
-                        class_id = int(class_id)
-                        if 0 <= class_id < len(self.object_classes):
-                            # Convert normalized coordinates to pixel coordinates
-                            x_center_px = int(x_center * width)
-                            y_center_px = int(y_center * height)
-                            w_px = int(w * width)
-                            h_px = int(h * height)
-                            
-                            x1 = max(0, x_center_px - w_px // 2)
-                            y1 = max(0, y_center_px - h_px // 2)
-                            x2 = min(width, x_center_px + w_px // 2)
-                            y2 = min(height, y_center_px + h_px // 2)
-                            
-                            detections.append({
-                                'class': self.object_classes[class_id],
-                                'confidence': float(conf),
-                                'bbox': [x1, y1, x2, y2],
-                                'center': (x_center_px, y_center_px)
-                            })
-        
-        return detections
-    
-    def _parse_tflite_yolo_output(self, boxes: np.ndarray, classes: np.ndarray, scores: np.ndarray, frame_shape: Tuple[int, int]) -> List[Dict]:
-        """Parse TFLite YOLO output format to detections"""
-        detections = []
-        height, width = frame_shape
-        
-        for i in range(len(scores)):
-            if scores[i] > self.confidence_threshold:
-                class_id = int(classes[i])
-                if class_id < len(self.object_classes):
-                    ymin, xmin, ymax, xmax = boxes[i]
-                    
-                    # Convert to pixel coordinates
-                    x1 = int(xmin * width)
-                    y1 = int(ymin * height)
-                    x2 = int(xmax * width)
-                    y2 = int(ymax * height)
-                    
-                    center_x = (x1 + x2) // 2
-                    center_y = (y1 + y2) // 2
-                    
-                    detections.append({
-                        'class': self.object_classes[class_id],
-                        'confidence': float(scores[i]),
-                        'bbox': [x1, y1, x2, y2],
-                        'center': (center_x, center_y)
-                    })
-        
-        return detections
-    
-    def counting_thread(self):
-        """Thread for counting objects and aggregating data"""
-        logger.info("Counting thread started")
-        
-        # Initialize counts structure
-        # If no zones, create a default "all" zone to count everything
-        zones = self.config['detectionConfig'].get('detectionZones', [])
-        use_default_zone = len(zones) == 0
-        
-        if use_default_zone:
-            # No zones defined - count everything in a default zone
-            logger.info("No detection zones defined - counting all detections in 'all' zone")
-            zones = [{'name': 'all', 'polygon': [], 'direction': 'bidirectional'}]
-        
-        current_counts = {zone['name']: {cls: {'in': 0, 'out': 0} 
-                                        for cls in self.object_classes}
-                         for zone in zones}
-        
-        aggregation_interval = self.config['transmissionConfig']['aggregationInterval']
-        next_aggregation = datetime.utcnow() + timedelta(seconds=aggregation_interval)
-        
-        logger.info(f"Counting initialized with {len(zones)} zone(s), aggregation interval: {aggregation_interval}s")
+            logger.error(f"{self.detector_type} inference error: {e}")
+            return [[] for _ in jobs], 0.0
+    
+    def _parse_output(self, outputs: List[np.ndarray], layout: TileLayout) -> List[Dict]:
+        """Decode one frame's outputs (one batch entry per tile) to detections in frame pixels"""
+        input_size = (self.input_shape[-2], self.input_shape[-3])
+        parts = []
+        for index, tile in enumerate(layout.tiles):
+            boxes, confidences, class_ids = self.decode_output(
+                [output[index] for output in outputs], self.confidence_threshold,
+                len(self.object_classes), input_size)
+            parts.append((tile.boxes_to_frame(boxes), confidences, class_ids))
+        
+        return self._merge_detections(parts)
+    
+    def _merge_detections(self, parts: List[Tuple[np.ndarray, np.ndarray, np.ndarray]]) -> List[Dict]:
+        """Combine per-tile (boxes, confidences, class_ids) in frame pixels; NMS merges tile seams"""
+        boxes = np.concatenate([part[0] for part in parts])
+        confidences = np.concatenate([part[1] for part in parts])
+        class_ids = np.concatenate([part[2] for part in parts])
+        
+        # Boxes clipped to nothing at a tile edge carry no information
+        visible = (boxes[:, 2] > boxes[:, 0]) & (boxes[:, 3] > boxes[:, 1])
+        boxes, confidences, class_ids = boxes[visible], confidences[visible], class_ids[visible]
+        
+        keep = non_max_suppression(boxes, confidences, class_ids,
+                                   self.nms_iou_threshold, self.max_detections)
+        return build_detections(boxes[keep], confidences[keep], class_ids[keep], self.object_classes)
+    
+    def _init_aggregation(self):
+        """Count buckets per stream, closed on wall-clock boundaries by one timer thread"""
+        transmission_config = self.config['transmissionConfig']
+        self.aggregator = AggregationEngine(transmission_config['aggregationInterval'],
+                                            transmission_config.get('allowedLateness', 5),
+                                            on_round=self._buffer_closed_buckets)
+        for stream in self.streams:
+            stream.counts = CountAccumulator(stream.tracker.region_names, self.object_classes,
+                                             self.aggregator.interval)
+            self.aggregator.register(stream.counts,
+                                     lambda snapshot, stream=stream: self._aggregate_and_queue(snapshot, stream))
+    
+    def counting_thread(self, stream: CameraStream):
+        """Thread for tracking one stream's objects and aggregating their count events"""
+        logger.info(f"Counting thread started [{stream.camera_id}]")
+        
+        # Counts per zone / counting line; without zones the tracker counts every
+        # object once in a default "all" zone
+        tracker = stream.tracker
+        if not stream.zones:
+            logger.info("No detection zones defined - counting all tracked objects in 'all' zone")
+        
+        logger.info(f"Counting initialized with {len(tracker.zones)} zone(s), {len(tracker.lines)} line(s), "
+                    f"aggregation interval: {self.aggregator.interval:.0f}s")
         
         while self.running:
             try:
-                detection_data = self.detection_queue.get(timeout=1)
+                detection_data = stream.detection_queue.get(timeout=1)
             except queue.Empty:
-                # Check if it's time to aggregate
-                if datetime.utcnow() >= next_aggregation:
-                    self._aggregate_and_queue(current_counts)
-                    
-                    # Reset counts
-                    current_counts = {zone['name']: {cls: {'in': 0, 'out': 0} 
-                                                    for cls in self.object_classes}
-                                     for zone in zones}
-                    
-                    next_aggregation = datetime.utcnow() + timedelta(seconds=aggregation_interval)
                 continue
             
-            # Process detections
-            for detection in detection_data['detections']:
-                center = detection['center']
-                obj_class = detection['class']
-                
-                # If no zones defined, count all detections in default 'all' zone
-                if use_default_zone:
-                    # Count all detections in the default 'all' zone
-                    current_counts['all'][obj_class]['in'] += 1
-                    current_counts['all'][obj_class]['out'] += 1
-                else:
-                    # Check which zone the object is in
-                    counted = False
-                    for zone in zones:
-                        polygon = zone.get('polygon', [])
-                        # If polygon is empty or point is in polygon, count it
-                        if not polygon or self._point_in_polygon(center, polygon):
-                            direction = zone.get('direction', 'bidirectional')
-                            
-                            # Simple counting logic (in production, use centroid tracking)
-                            if direction in ['in', 'bidirectional']:
-                                current_counts[zone['name']][obj_class]['in'] += 1
-                            if direction in ['out', 'bidirectional']:
-                                current_counts[zone['name']][obj_class]['out'] += 1
-                            counted = True
-                            break
-                    
-                    # If object not in any zone (shouldn't happen if zones cover full frame), still count it
-                    if not counted:
-                        logger.debug(f"Object {obj_class} at {center} not in any zone, counting in 'all' zone")
-                        if 'all' not in current_counts:
-                            current_counts['all'] = {cls: {'in': 0, 'out': 0} for cls in self.object_classes}
-                        current_counts['all'][obj_class]['in'] += 1
-        
-        logger.info("Counting thread stopped")
-    
-    def _aggregate_and_queue(self, counts: Dict):
-        """Aggregate counts and queue for upload"""
-        timestamp = datetime.utcnow()
-        
-        # Flatten counts for storage
-        flattened_counts = {}
-        for zone_name, zone_counts in counts.items():
-            for obj_class, directions in zone_counts.items():
-                if directions['in'] > 0 or directions['out'] > 0:
-                    flattened_counts[f"{zone_name}_{obj_class}"] = directions
-        
-        if not flattened_counts:
+            # Count unique objects: only track events (zone entered/left, line crossed)
+            # add to the counts, not every detection in every frame
+            events = tracker.update(detection_data['detections'], detection_data.get('frames_skipped', 0),
+                                    detection_data.get('captured_at'))
+            # Idle means no confirmed tracks: one missed detection does not reset the rate
+            stream.rate_scheduler.observe(tracker.active_objects, detection_data['inference_time'])
+            # Buckets are closed by the aggregation engine's timer, not here; a frame
+            # counts in the bucket of its capture time however late it is processed
+            stream.counts.add(events, detection_data['timestamp'])
+            if logger.isEnabledFor(logging.DEBUG):
+                for event in events:
+                    logger.debug(f"Track {event.track_id} ({event.object_class}) {event.kind} "
+                                 f"{event.region} [{stream.camera_id}]")
+        
+        logger.info(f"Counting thread stopped [{stream.camera_id}]")
+    
+    def _aggregate_and_queue(self, snapshot: CountSnapshot, stream: CameraStream):
+        """Serialize a stream's closed count bucket and queue it for upload under its cameraId"""
+        timestamp = snapshot.start
+        
+        total_objects = snapshot.total
+        if not total_objects:
             return  # No counts to upload
         
-        # Calculate total objects
-        total_objects = sum(d['in'] + d['out'] for d in flattened_counts.values())
+        # Flattened {zone}_{class} format for storage and upload
+        flattened_counts = snapshot.to_wire()
         
         count_data = {
             'timestamp': timestamp.isoformat(),
-            'cameraId': self.config['cameraId'],
-            'siteId': self.config['siteId'],
-            'orgId': self.config['orgId'],
+            'cameraId': stream.camera_id,
+            'siteId': stream.site_id,
+            'orgId': stream.org_id,
             'aggregationInterval': self.config['transmissionConfig']['aggregationInterval'],
+            'bucketStart': snapshot.start.isoformat(),
+            'bucketEnd': snapshot.end.isoformat(),
             'counts': flattened_counts,
             'metadata': {
                 'version': '1.0',
@@ -633,44 +507,51 @@ class CameraEdgeAgent:
         
         # Backend API format (for sending to custom backend)
         backend_count_data = {
-            'camera_id': self.config['cameraId'],
+            'camera_id': stream.camera_id,
             'timestamp': timestamp.isoformat(),
             'counts': flattened_counts,
             'total_objects': total_objects,
-            'frames_processed': getattr(self, 'frame_count', 0),
-            'fps': getattr(self, 'current_fps', 0.0),
-            'runtime_seconds': (timestamp - getattr(self, 'start_time', timestamp)).total_seconds() if hasattr(self, 'start_time') else 0
+            'frames_processed': stream.frames_captured,
+            'fps': stream.capture_fps,
+            'runtime_seconds': time.time() - self.start_time if hasattr(self, 'start_time') else 0
         }
         
-        # Save to local database
-        buffered = BufferedCount(
-            timestamp=timestamp,
-            camera_id=self.config['cameraId'],
-            counts_json=count_data,
-            metadata_json={'retry_count': 0, 'backend_data': backend_count_data}
-        )
-        self.db_session.add(buffered)
-        self.db_session.commit()
-        
-        # Queue for upload to Firebase
-        self.upload_queue.put(count_data)
+        # Saved to the local database (and queued for upload) with the rest of the round
+        self.closed_buckets.append({
+            'timestamp': timestamp,
+            'camera_id': stream.camera_id,
+            'counts_json': count_data,
+            'metadata_json': {'retry_count': 0, 'backend_data': backend_count_data}
+        })
         
         # Send to backend API if configured
-        if self.backend_url and self.should_send_to_backend():
+        if self.backend_url and self.should_send_to_backend(stream.camera_id):
             self._send_to_backend(backend_count_data)
         
-        logger.info(f"Aggregated counts: {total_objects} objects")
+        logger.info(f"Aggregated counts [{stream.camera_id}]: {total_objects} objects")
     
-    def should_send_to_backend(self) -> bool:
-        """Check if we should send counts to backend API"""
+    def _buffer_closed_buckets(self):
+        """Save the round's buckets and their rollups in one transaction, then queue them for upload"""
+        buckets, self.closed_buckets = self.closed_buckets, []
+        try:
+            # A bucket flushed at shutdown comes back merged with its partial counts
+            buckets = self.buffer.add_buckets(buckets)
+        finally:
+            # (buffered row id, document); no id if saving failed, the upload is still tried
+            for bucket in buckets:
+                self.upload_queue.put((bucket.get('id'), bucket['counts_json']))
+    
+    def should_send_to_backend(self, camera_id: str) -> bool:
+        """Check if we should send a camera's counts to backend API"""
         if not self.backend_url:
             return False
         
         now = datetime.utcnow()
-        if self.last_backend_report is None:
+        last_report = self.last_backend_report.get(camera_id)
+        if last_report is None:
             return True
         
-        elapsed = (now - self.last_backend_report).total_seconds()
+        elapsed = (now - last_report).total_seconds()
         return elapsed >= self.backend_report_interval
     
     def _send_to_backend(self, count_data: Dict):
@@ -690,7 +571,7 @@ class CameraEdgeAgent:
             )
             
             if response.status_code == 200:
-                self.last_backend_report = datetime.utcnow()
+                self.last_backend_report[count_data['camera_id']] = datetime.utcnow()
                 logger.debug(f"Sent counts to backend: {url}")
             else:
                 logger.warning(f"Backend API returned {response.status_code}: {response.text}")
@@ -724,6 +605,25 @@ class CameraEdgeAgent:
         except Exception as e:
             logger.error(f"Failed to initialize API server: {e}")
     
+    @property
+    def frame_count(self) -> int:
+        """Frames captured across all streams"""
+        return sum(stream.frames_captured for stream in self.streams)
+    
+    @property
+    def current_fps(self) -> float:
+        """Capture rate across all streams"""
+        return sum(stream.capture_fps for stream in self.streams)
+    
+    def get_buffer_stats(self) -> Dict:
+        """Frame/input buffer pool usage and allocations per captured frame"""
+        pools = {f"frames:{stream.camera_id}": stream.frame_pool for stream in self.streams}
+        pools['model_input'] = self.input_pool
+        stats = {name: pool.get_stats() for name, pool in pools.items() if pool is not None}
+        allocations = sum(pool_stats['allocations'] for pool_stats in stats.values())
+        stats['allocations_per_frame'] = allocations / max(1, self.frame_count)
+        return stats
+    
     def set_detection_active(self, active: bool):
         """Set detection active state (called by API)"""
         self.detection_active = active
@@ -748,24 +648,30 @@ class CameraEdgeAgent:
         
         while self.running:
             try:
-                count_data = self.upload_queue.get(timeout=1)
+                item = self.upload_queue.get(timeout=1)
             except queue.Empty:
                 # Try to upload any buffered data
                 self._upload_buffered_data()
+                self._upload_rollups()
                 continue
             
-            # Upload to Firebase
-            success = self._upload_to_firebase(count_data)
-            
-            if success:
-                # Mark as uploaded in local database
-                self.db_session.query(BufferedCount).filter(
-                    BufferedCount.timestamp == datetime.fromisoformat(count_data['timestamp'])
-                ).update({'uploaded': 1})
-                self.db_session.commit()
-            else:
-                # Will be retried in next cycle
-                logger.warning(f"Upload failed, will retry: {count_data['timestamp']}")
+            # Upload everything queued (one round closes a bucket per camera)
+            # and mark the batch uploaded in one transaction
+            batch = [item]
+            while len(batch) < 50:
+                try:
+                    batch.append(self.upload_queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            uploaded = []
+            for record_id, count_data in batch:
+                if self._upload_to_firebase(count_data):
+                    uploaded.append(record_id)
+                else:
+                    # Will be retried in next cycle
+                    logger.warning(f"Upload failed, will retry: {count_data['timestamp']}")
+            self.buffer.mark_uploaded(uploaded)
         
         logger.info("Upload thread stopped")
     
@@ -793,19 +699,57 @@ class CameraEdgeAgent:
     
     def _upload_buffered_data(self):
         """Upload any data that failed to upload previously"""
-        buffered = (self.db_session.query(BufferedCount)
-                   .filter(BufferedCount.uploaded == 0)
-                   .order_by(BufferedCount.timestamp)
-                   .limit(10)
-                   .all())
-        
-        for record in buffered:
-            success = self._upload_to_firebase(record.counts_json)
-            if success:
-                record.uploaded = 1
-                self.db_session.commit()
-            else:
+        uploaded = []
+        for record in self.buffer.pending_uploads(10):
+            if not self._upload_to_firebase(record.counts_json):
+                break  # Stop trying if one fails (likely network issue)
+            uploaded.append(record.id)
+        self.buffer.mark_uploaded(uploaded)
+    
+    def _upload_rollups(self):
+        """Add pending hourly / daily counts to their Firestore rollup documents"""
+        sent = []
+        for rollup in self.buffer.pending_rollups(10):
+            if not self._upload_rollup_to_firebase(rollup):
                 break  # Stop trying if one fails (likely network issue)
+            sent.append(rollup)
+        # Subtracts what was sent: buckets added since stay pending
+        self.buffer.rollups_uploaded(sent)
+    
+    def _upload_rollup_to_firebase(self, rollup) -> bool:
+        """Increment a rollup document by its counts not yet uploaded (a pending_rollups row)"""
+        counts, buckets = rollup.pending_json, rollup.pending_buckets
+        try:
+            # Reference: /cameras/{cameraId}/hourlyCounts/{periodStart} (or dailyCounts)
+            doc_id = rollup.period_start.isoformat().replace(':', '_').replace('-', '_')
+            doc_ref = (self.firestore_client
+                      .collection('cameras')
+                      .document(rollup.camera_id)
+                      .collection(ROLLUP_COLLECTIONS[rollup.period])
+                      .document(doc_id))
+            
+            metadata = rollup.metadata_json or {}
+            doc_ref.set({
+                'cameraId': rollup.camera_id,
+                'siteId': metadata.get('siteId'),
+                'orgId': metadata.get('orgId'),
+                'period': rollup.period,
+                'periodStart': rollup.period_start.isoformat(),
+                'periodEnd': (rollup.period_start + ROLLUP_PERIODS[rollup.period]).isoformat(),
+                # Increments merge with what is already there, so the agent never reads the document
+                'counts': {key: {direction: firestore.Increment(n) for direction, n in values.items()}
+                           for key, values in counts.items()},
+                'total': firestore.Increment(sum(sum(values.values()) for values in counts.values())),
+                'buckets': firestore.Increment(buckets),
+                'lastUpdated': firestore.SERVER_TIMESTAMP,
+            }, merge=True)
+            logger.info(f"Uploaded {rollup.period} rollup to Firebase: {rollup.camera_id} "
+                        f"{rollup.period_start.isoformat()} (+{buckets} buckets)")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Firebase rollup upload error: {e}")
+            return False
     
     def status_update_thread(self):
         """Thread for updating camera status in Firestore"""
@@ -823,31 +767,26 @@ class CameraEdgeAgent:
         logger.info("Status update thread stopped")
     
     def _update_camera_status(self):
-        """Update camera document status in Firestore"""
-        try:
-            if not hasattr(self, 'firestore_client') or self.firestore_client is None:
-                return
-            
-            camera_ref = self.firestore_client.collection('cameras').document(self.config['cameraId'])
-            
-            update_data = {
-                'status': 'online',
-                'lastSeen': firestore.SERVER_TIMESTAMP
-            }
-            
-            # Add frame count if available
-            if hasattr(self, 'frame_count'):
-                update_data['frameCount'] = self.frame_count
-            
-            # Add FPS if calculated
-            if hasattr(self, 'current_fps'):
-                update_data['fps'] = self.current_fps
-            
-            camera_ref.update(update_data)
-            logger.debug(f"Camera status updated: {self.config['cameraId']}")
-            
-        except Exception as e:
-            logger.error(f"Failed to update camera status: {e}")
+        """Update each stream's camera document status in Firestore"""
+        if not hasattr(self, 'firestore_client') or self.firestore_client is None:
+            return
+        
+        for stream in self.streams:
+            try:
+                camera_ref = self.firestore_client.collection('cameras').document(stream.camera_id)
+                
+                update_data = {
+                    'status': 'online',
+                    'lastSeen': firestore.SERVER_TIMESTAMP,
+                    'frameCount': stream.frames_captured,
+                    'fps': stream.capture_fps,
+                }
+                
+                camera_ref.update(update_data)
+                logger.debug(f"Camera status updated: {stream.camera_id}")
+                
+            except Exception as e:
+                logger.error(f"Failed to update camera status [{stream.camera_id}]: {e}")
     
     def start(self):
         """Start all threads"""
@@ -856,21 +795,23 @@ class CameraEdgeAgent:
         self.detection_active = self.config.get('apiConfig', {}).get('autoStart', False)
         
         # Initialize counters
-        self.frame_count = 0
-        self.current_fps = 0.0
         self.start_time = time.time()
         
-        # Start threads
+        # Start threads: capture and counting per stream, one shared detector
         threads = [
-            threading.Thread(target=self.capture_thread, daemon=True),
             threading.Thread(target=self.detection_thread, daemon=True),
-            threading.Thread(target=self.counting_thread, daemon=True),
             threading.Thread(target=self.upload_thread, daemon=True),
             threading.Thread(target=self.status_update_thread, daemon=True),
         ]
+        for stream in self.streams:
+            threads.append(threading.Thread(target=self.capture_thread, args=(stream,), daemon=True))
+            threads.append(threading.Thread(target=self.counting_thread, args=(stream,), daemon=True))
+        if self.pipelined:
+            threads.append(threading.Thread(target=self.postprocess_thread, daemon=True))
         
         for thread in threads:
             thread.start()
+        self.aggregator.start()
         
         logger.info(f"Camera agent started successfully (detection: {'active' if self.detection_active else 'inactive'})")
         
@@ -888,7 +829,12 @@ class CameraEdgeAgent:
         self.running = False
         time.sleep(2)  # Allow threads to finish
         
-        self.db_session.close()
+        # Buffer the open buckets so their counts go out on the next start
+        self.aggregator.stop(flush=True)
+        
+        self.backend.close()
+        
+        self.buffer.close()
         logger.info("Camera agent stopped")
 
 if __name__ == '__main__':
@@ -164,9 +164,23 @@ class CameraAgentAPI:
                     runtime = (datetime.utcnow() - self.started_at).total_seconds()
                     status['runtime_seconds'] = runtime
                 
+                # Per-camera fps, latency, drops, source, rate, gating, crop/tiling
+                if hasattr(self.agent, 'streams'):
+                    status['streams'] = [stream.get_stats() for stream in self.agent.streams]
+                if hasattr(self.agent, 'stream_scheduler'):
+                    status['scheduler'] = self.agent.stream_scheduler.get_stats()
+                if hasattr(self.agent, 'get_buffer_stats'):
+                    status['buffers'] = self.agent.get_buffer_stats()
+                
                 # Add detector type
                 if hasattr(self.agent, 'detector_type'):
                     status['detector_type'] = self.agent.detector_type
+                if hasattr(self.agent, 'backend'):
+                    status['backend'] = self.agent.backend.get_stats()
+                if hasattr(self.agent, 'aggregator'):
+                    status['aggregation'] = self.agent.aggregator.get_stats()
+                if hasattr(self.agent, 'buffer'):
+                    status['count_buffer'] = self.agent.buffer.get_stats()
                 
                 return jsonify(status), 200
                 
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Camera Streams
+Per-camera state for an agent that serves several cameras from one process
+and one accelerator. Each CameraStream owns its capture source, rate control,
+frame buffers, motion gate, zone crop / tiling, tracker, counting zones and
+metrics, and reports under its own Firestore `cameraId`.
+
+StreamScheduler decides which streams' latest frames go into the next
+detector batch: smooth weighted round robin over the streams that have a
+frame waiting, each stream at most once per batch.
+"""
+
+import logging
+import queue
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np  # type: ignore
+
+from frame_buffers import BufferPool, CapturedFrame, LatestFrameSlot
+from frame_sources import create_frame_source
+from motion_gate import MotionGate
+from preprocess import FrameTiler, ZoneCrop
+from rate_scheduler import RateScheduler
+from tracker import ObjectTracker
+
+logger = logging.getLogger(__name__)
+
+# detectionConfig options a camera entry may override for its own stream
+STREAM_DETECTION_OPTIONS = ('detectionZones', 'countingLines', 'motionGate', 'zoneCrop', 'tiling', 'tracking')
+
+
+def camera_configs(config: Dict) -> List[Dict]:
+    """
+    Camera entries from `cameras` in config.json; a config without `cameras`
+    is the single camera described by the top-level cameraId/captureConfig.
+    """
+    cameras = config.get('cameras')
+    if not cameras:
+        return [{
+            'cameraId': config['cameraId'],
+            'captureConfig': config.get('captureConfig', {}),
+        }]
+
+    camera_ids = [camera.get('cameraId') for camera in cameras]
+    if None in camera_ids:
+        raise ValueError("Every entry in 'cameras' needs a cameraId")
+    if len(set(camera_ids)) != len(camera_ids):
+        raise ValueError(f"Duplicate cameraId in 'cameras': {camera_ids}")
+    return cameras
+
+
+class RateMeter:
+    """Events per second over roughly one-second windows"""
+
+    def __init__(self):
+        self.rate = 0.0
+        self._window_start = time.monotonic()
+        self._window_events = 0
+
+    def tick(self):
+        self._window_events += 1
+        now = time.monotonic()
+        elapsed = now - self._window_start
+        if elapsed >= 1.0:
+            self.rate = self._window_events / elapsed
+            self._window_events = 0
+            self._window_start = now
+
+
+class CameraStream:
+    """One camera: capture, per-stream preprocessing options, counting state and metrics"""
+
+    def __init__(self, camera: Dict, config: Dict, condition: Optional[threading.Condition] = None):
+        self.camera = camera
+        self.camera_id = camera['cameraId']
+        self.site_id = camera.get('siteId', config.get('siteId'))
+        self.org_id = camera.get('orgId', config.get('orgId'))
+        self.weight = max(1, int(camera.get('weight', 1)))
+
+        detection_config = config.get('detectionConfig', {})
+        options = {key: camera.get(key, detection_config.get(key)) for key in STREAM_DETECTION_OPTIONS}
+        self.zones = options['detectionZones'] or []
+
+        # Capture -> detection hands over only the latest frame (no stale backlog);
+        # slots of all streams share one condition so the scheduler can wait on any
+        capture_config = camera.get('captureConfig', {})
+        self.frame_source = create_frame_source(capture_config)
+        self.frame_slot = LatestFrameSlot(condition)
+        self.rate_scheduler = RateScheduler(capture_config.get('rateControl', {}), self.frame_source.fps)
+
+        # Reusable capture buffers (slot + detector + grabber + spare)
+        width, height = self.frame_source.resolution
+        self.frame_pool = BufferPool((height, width, 3), np.uint8, count=4)
+
+        self.motion_gate = MotionGate(options['motionGate'] or {}, self.zones)
+        self.frames_gated = 0  # skipped since the last inferred frame
+        self.zone_crop = ZoneCrop(options['zoneCrop'] or {}, self.zones, options['countingLines'] or [])
+        self.frame_tiler = FrameTiler(options['tiling'] or {}, self.zone_crop)
+
+        # Detections -> tracks -> zone / line count events (owned by the counting thread)
+        self.tracker = ObjectTracker(options['tracking'] or {}, self.zones, options['countingLines'] or [])
+        self.counts = None  # CountAccumulator, registered with the agent's AggregationEngine
+
+        # Detections -> this stream's counting thread
+        self.detection_queue = queue.Queue(maxsize=100)
+
+        # Metrics
+        self.frames_captured = 0
+        self.frames_inferred = 0
+        self.latency_ms = 0.0  # running average, capture -> detections
+        self._capture_rate = RateMeter()
+        self._inference_rate = RateMeter()
+
+    @property
+    def capture_fps(self) -> float:
+        return self._capture_rate.rate
+
+    @property
+    def inference_fps(self) -> float:
+        return self._inference_rate.rate
+
+    def record_capture(self):
+        """Count a captured frame"""
+        self.frames_captured += 1
+        self._capture_rate.tick()
+
+    def record_result(self, latency_ms: float):
+        """Count an inferred frame with its capture-to-result latency"""
+        self.frames_inferred += 1
+        self._inference_rate.tick()
+        if self.frames_inferred == 1:
+            self.latency_ms = latency_ms
+        else:
+            self.latency_ms += 0.1 * (latency_ms - self.latency_ms)
+
+    def get_stats(self) -> Dict:
+        capture = self.frame_slot.get_stats()
+        return {
+            'camera_id': self.camera_id,
+            'weight': self.weight,
+            'fps': round(self.capture_fps, 2),
+            'inference_fps': round(self.inference_fps, 2),
+            'latency_ms': round(self.latency_ms, 1),
+            'frames_captured': self.frames_captured,
+            'frames_inferred': self.frames_inferred,
+            # Overwritten in the slot before the detector got to them
+            'frames_dropped': capture['frames_unseen'],
+            'frames_gated': self.motion_gate.frames_skipped,
+            'source': self.frame_source.describe(),
+            'capture': capture,
+            'rate': self.rate_scheduler.get_stats(),
+            'motion_gate': self.motion_gate.get_stats(),
+            'zone_crop': self.zone_crop.get_stats(),
+            'tiling': self.frame_tiler.get_stats(),
+            'tracker': self.tracker.get_stats(),
+            'frame_buffers': self.frame_pool.get_stats(),
+        }
+
+
+class ScheduledFrame(NamedTuple):
+    """A stream's frame picked for the next detector batch"""
+    stream: CameraStream
+    frame: CapturedFrame
+    frames_skipped: int = 0  # skipped by the stream's motion gate since its last inferred frame
+
+
+class StreamScheduler:
+    """
+    Picks up to `max_batch` waiting frames across streams for one detector batch.
+
+    Streams are chosen by smooth weighted round robin (equal weights = plain
+    round robin); weights only matter when more streams have frames waiting
+    than fit in a batch.
+    """
+
+    def __init__(self, streams: List[CameraStream], condition: threading.Condition,
+                 max_batch: Optional[int] = None):
+        self.streams = streams
+        self.condition = condition
+        self.max_batch = max(1, int(max_batch or len(streams)))
+        self._credit = {stream.camera_id: 0 for stream in streams}
+
+        # Stats
+        self.batches = 0
+        self.frames_scheduled = 0
+
+    def next_batch(self, timeout: float = 1.0) -> List[Tuple[CameraStream, CapturedFrame]]:
+        """Wait up to `timeout` for any frame, then take one frame from each picked stream"""
+        with self.condition:
+            if not self.condition.wait_for(self._any_ready, timeout):
+                return []
+            ready = [stream for stream in self.streams if stream.frame_slot.has_frame]
+            picked = self._pick(ready)
+            frames = [(stream, stream.frame_slot.get(timeout=0)) for stream in picked]
+
+        self.batches += 1
+        self.frames_scheduled += len(frames)
+        return frames
+
+    def _any_ready(self) -> bool:
+        return any(stream.frame_slot.has_frame for stream in self.streams)
+
+    def _pick(self, ready: List[CameraStream]) -> List[CameraStream]:
+        if len(ready) <= self.max_batch:
+            picked = ready
+        else:
+            picked = []
+            candidates = list(ready)
+            for _ in range(self.max_batch):
+                total = sum(stream.weight for stream in candidates)
+                for stream in candidates:
+                    self._credit[stream.camera_id] += stream.weight
+                best = max(candidates, key=lambda s: self._credit[s.camera_id])
+                self._credit[best.camera_id] -= total
+                picked.append(best)
+                candidates.remove(best)
+        return picked
+
+    def get_stats(self) -> Dict:
+        return {
+            'streams': len(self.streams),
+            'max_batch': self.max_batch,
+            'batches': self.batches,
+            'frames_per_batch': round(self.frames_scheduled / self.batches, 2) if self.batches else 0.0,
+        }
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Local Count Buffer
+SQLite store on the SD card for count buckets waiting for upload and for the
+hourly / daily rollups. The database runs in WAL mode with synchronous=NORMAL:
+a commit appends to the write-ahead log without an fsync, and a power cut can
+lose the last commits but not corrupt the file. Pending buckets are found
+through an (uploaded, timestamp) index and marked uploaded by primary key, and
+writes are SQLAlchemy Core statements, one transaction per batch (all buckets
+closed in one timer round, all records marked after one upload pass).
+
+Every call checks out its own pooled connection, so the aggregation and
+upload threads never share a session; writes are serialized in-process.
+"""
+
+import logging
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+# Import SQLAlchemy with error handling
+try:
+    from sqlalchemy import (create_engine, event, func, select, update, delete, bindparam,  # type: ignore[import-untyped]
+                            Column, Integer, String, DateTime, JSON, Index, UniqueConstraint)
+    # SQLAlchemy 2.0+ uses sqlalchemy.orm for declarative_base
+    try:
+        from sqlalchemy.orm import declarative_base  # type: ignore[import-untyped]
+    except ImportError:
+        # Fallback for SQLAlchemy < 2.0
+        from sqlalchemy.ext.declarative import declarative_base  # type: ignore[import-untyped]
+except ImportError:
+    raise ImportError(
+        "SQLAlchemy is required but not installed.\n"
+        "Please install it using: pip install sqlalchemy>=1.4.0\n"
+        "Or on Raspberry Pi: pip3 install sqlalchemy"
+    )
+
+from aggregation import ROLLUP_PERIODS, merge_counts, period_start
+
+logger = logging.getLogger(__name__)
+
+# Database models for local buffering
+Base = declarative_base()
+
+
+class BufferedCount(Base):
+    __tablename__ = 'buffered_counts'
+    # Serves the pending query (uploaded = 0 ORDER BY timestamp) and marking uploads
+    __table_args__ = (Index('ix_buffered_counts_uploaded_timestamp', 'uploaded', 'timestamp'),)
+
+    id = Column(Integer, primary_key=True)
+    timestamp = Column(DateTime, nullable=False)
+    camera_id = Column(String(50), nullable=False)
+    counts_json = Column(JSON, nullable=False)
+    metadata_json = Column(JSON)
+    uploaded = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class RollupCount(Base):
+    """Hourly / daily totals per camera, plus the part not yet added to Firestore"""
+    __tablename__ = 'rollup_counts'
+    __table_args__ = (UniqueConstraint('camera_id', 'period', 'period_start'),)
+
+    id = Column(Integer, primary_key=True)
+    camera_id = Column(String(50), nullable=False)
+    period = Column(String(8), nullable=False)
+    period_start = Column(DateTime, nullable=False)
+    counts_json = Column(JSON, nullable=False)
+    buckets = Column(Integer, default=0)
+    pending_json = Column(JSON, nullable=False)
+    pending_buckets = Column(Integer, default=0)
+    metadata_json = Column(JSON)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+def _merge_row(row: Dict, counts: Dict) -> Dict:
+    """`row` with `counts` added to its upload document's counts"""
+    document = dict(row['counts_json'], counts=merge_counts(row['counts_json']['counts'], counts))
+    return dict(row, counts_json=document)
+
+
+def _configure_connection(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.close()
+
+
+class CountBuffer:
+    """Buffered count buckets and rollups in one SQLite database"""
+
+    def __init__(self, db_path: str):
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = db_path
+        self.engine = create_engine(f'sqlite:///{db_path}')
+        event.listen(self.engine, 'connect', _configure_connection)
+        Base.metadata.create_all(self.engine)
+        # create_all skips indexes of tables that already exist (databases from older versions)
+        for index in BufferedCount.__table__.indexes:
+            index.create(self.engine, checkfirst=True)
+        self._write_lock = threading.Lock()
+
+    def add_buckets(self, rows: List[Dict]) -> List[Dict]:
+        """
+        Buffer closed buckets and add them to their hourly / daily rollups, in
+        one transaction. Rows are BufferedCount columns; `counts_json` is the
+        upload document (`counts`, `siteId`, `orgId`).
+
+        A bucket already buffered for the same (camera_id, timestamp) - the
+        partial bucket flushed at shutdown, closed again after a restart - is
+        merged with the new one into a single pending row, so the uploaded
+        document carries the same counts as the rollups. Returns the rows as
+        buffered (merged documents, with their `id`), for the upload queue.
+        """
+        if not rows:
+            return []
+        # Sum the round's buckets per rollup row first: one statement per row, not per bucket
+        deltas: Dict[Tuple[str, str, datetime], Dict] = {}
+        for row in rows:
+            document = row['counts_json']
+            for period in ROLLUP_PERIODS:
+                key = (row['camera_id'], period, period_start(row['timestamp'], period))
+                delta = deltas.setdefault(key, {'counts': {}, 'buckets': 0,
+                                                'metadata': {'siteId': document.get('siteId'),
+                                                             'orgId': document.get('orgId')}})
+                delta['counts'] = merge_counts(delta['counts'], document['counts'])
+                delta['buckets'] += 1
+
+        rollups = RollupCount.__table__
+        now = datetime.utcnow()
+        with self._write_lock, self.engine.begin() as conn:
+            rows, merged_ids = self._merge_buffered(conn, rows)
+            # One statement per bucket for the ids (a round closes one bucket per camera)
+            insert = BufferedCount.__table__.insert()
+            buffered = []
+            for row in rows:
+                result = conn.execute(insert, {'uploaded': 0, 'created_at': now, **row})
+                buffered.append(dict(row, id=result.inserted_primary_key[0]))
+            # Deleted after the inserts: SQLite reuses the highest id once it is free, and an
+            # upload of a merged-away row must not mark its replacement
+            if merged_ids:
+                logger.info(f"Merged {len(merged_ids)} buffered bucket(s) closed again after a restart")
+                conn.execute(delete(BufferedCount.__table__).where(BufferedCount.__table__.c.id.in_(merged_ids)))
+
+            existing = {}
+            query = select(rollups).where(rollups.c.camera_id.in_({key[0] for key in deltas}),
+                                          rollups.c.period_start.in_({key[2] for key in deltas}))
+            for rollup in conn.execute(query):
+                existing[(rollup.camera_id, rollup.period, rollup.period_start)] = rollup
+
+            inserts, updates = [], []
+            for key, delta in deltas.items():
+                rollup = existing.get(key)
+                if rollup is None:
+                    camera_id, period, start = key
+                    inserts.append({'camera_id': camera_id, 'period': period, 'period_start': start,
+                                    'counts_json': delta['counts'], 'buckets': delta['buckets'],
+                                    'pending_json': delta['counts'], 'pending_buckets': delta['buckets'],
+                                    'metadata_json': delta['metadata'], 'updated_at': now})
+                else:
+                    updates.append({'row_id': rollup.id,
+                                     'counts_json': merge_counts(rollup.counts_json, delta['counts']),
+                                     'buckets': rollup.buckets + delta['buckets'],
+                                     'pending_json': merge_counts(rollup.pending_json, delta['counts']),
+                                     'pending_buckets': rollup.pending_buckets + delta['buckets'],
+                                     'updated_at': now})
+            if inserts:
+                conn.execute(rollups.insert(), inserts)
+            if updates:
+                conn.execute(update(rollups).where(rollups.c.id == bindparam('row_id')), updates)
+        return buffered
+
+    @staticmethod
+    def _merge_buffered(conn, rows: List[Dict]) -> Tuple[List[Dict], List[int]]:
+        """
+        One row per (camera_id, timestamp): sum duplicates within `rows` and
+        with rows already buffered. Returns the merged rows and the ids of the
+        buffered ones to delete (uploaded or not; the merged row is pending and
+        its document replaces the one in Firestore).
+        """
+        merged: Dict[Tuple[str, datetime], Dict] = {}
+        for row in rows:
+            key = (row['camera_id'], row['timestamp'])
+            if key in merged:
+                row = _merge_row(row, merged[key]['counts_json']['counts'])
+            merged[key] = row
+
+        table = BufferedCount.__table__
+        # uploaded IN (0, 1) lets the (uploaded, timestamp) index find the timestamps
+        query = select(table.c.id, table.c.camera_id, table.c.timestamp, table.c.counts_json).where(
+            table.c.uploaded.in_([0, 1]), table.c.timestamp.in_({key[1] for key in merged}),
+            table.c.camera_id.in_({key[0] for key in merged}))
+        duplicates = []
+        for record in conn.execute(query):
+            key = (record.camera_id, record.timestamp)
+            if key in merged:
+                merged[key] = _merge_row(merged[key], record.counts_json['counts'])
+                duplicates.append(record.id)
+        return list(merged.values()), duplicates
+
+    def pending_uploads(self, limit: int = 10) -> List:
+        """Oldest buckets not uploaded yet (id, camera_id, timestamp, counts_json)"""
+        table = BufferedCount.__table__
+        query = (select(table.c.id, table.c.camera_id, table.c.timestamp, table.c.counts_json)
+                 .where(table.c.uploaded == 0)
+                 .order_by(table.c.timestamp)
+                 .limit(limit))
+        with self.engine.connect() as conn:
+            return conn.execute(query).fetchall()
+
+    def mark_uploaded(self, ids: Iterable[int]):
+        """Mark buckets uploaded by id (from add_buckets or pending_uploads), in one statement"""
+        ids = [row_id for row_id in ids if row_id is not None]
+        if not ids:
+            return
+        table = BufferedCount.__table__
+        # A merged row replaces the ones it was merged from, so uploads of those mark nothing
+        with self._write_lock, self.engine.begin() as conn:
+            conn.execute(update(table).where(table.c.id.in_(ids)).values(uploaded=1))
+
+    def pending_rollups(self, limit: int = 10) -> List:
+        """Rollup rows with counts not yet added to Firestore, oldest period first"""
+        rollups = RollupCount.__table__
+        query = (select(rollups)
+                 .where(rollups.c.pending_buckets > 0)
+                 .order_by(rollups.c.period_start)
+                 .limit(limit))
+        with self.engine.connect() as conn:
+            return conn.execute(query).fetchall()
+
+    def rollups_uploaded(self, sent: Iterable):
+        """Subtract what was uploaded (rows from pending_rollups); buckets added since stay pending"""
+        sent = {rollup.id: rollup for rollup in sent}
+        if not sent:
+            return
+        rollups = RollupCount.__table__
+        with self._write_lock, self.engine.begin() as conn:
+            current = conn.execute(select(rollups.c.id, rollups.c.pending_json, rollups.c.pending_buckets)
+                                   .where(rollups.c.id.in_(list(sent)))).fetchall()
+            conn.execute(update(rollups).where(rollups.c.id == bindparam('row_id')), [
+                {'row_id': rollup.id,
+                 'pending_json': merge_counts(rollup.pending_json, sent[rollup.id].pending_json, -1),
+                 'pending_buckets': rollup.pending_buckets - sent[rollup.id].pending_buckets}
+                for rollup in current
+            ])
+
+    def get_stats(self) -> Dict:
+        table = BufferedCount.__table__
+        rollups = RollupCount.__table__
+        with self.engine.connect() as conn:
+            pending = conn.execute(select(func.count()).select_from(table).where(table.c.uploaded == 0)).scalar()
+            pending_rollups = conn.execute(select(func.count()).select_from(rollups)
+                                           .where(rollups.c.pending_buckets > 0)).scalar()
+        wal = Path(f'{self.db_path}-wal')
+        return {
+            'pending_uploads': pending,
+            'pending_rollups': pending_rollups,
+            'database_bytes': Path(self.db_path).stat().st_size,
+            'wal_bytes': wal.stat().st_size if wal.exists() else 0,
+        }
+
+    def close(self):
+        self.engine.dispose()
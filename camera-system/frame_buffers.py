@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Frame Buffers
+Hand-off between the capture thread and the detection thread.
+
+LatestFrameSlot holds a single frame: the grabber overwrites it and the
+detector always takes the most recent one, so detection never works through
+a backlog of stale frames.
+
+BufferPool hands out reference-counted, preallocated arrays (capture frames,
+model input tensors) so steady-state capture and preprocessing allocate
+nothing per frame.
+"""
+
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import NamedTuple, Optional, Tuple
+
+import numpy as np  # type: ignore
+
+
+class PooledBuffer:
+    """Reference-counted array owned by a BufferPool"""
+
+    __slots__ = ('array', '_pool', '_refs')
+
+    def __init__(self, array: np.ndarray, pool: 'BufferPool'):
+        self.array = array
+        self._pool = pool
+        self._refs = 0
+
+    def retain(self) -> 'PooledBuffer':
+        with self._pool._lock:
+            self._refs += 1
+        return self
+
+    def release(self):
+        """Drop one reference; the array returns to the pool when none are left"""
+        with self._pool._lock:
+            self._refs -= 1
+            if self._refs == 0:
+                self._pool._recycle(self)
+
+
+class BufferPool:
+    """
+    Fixed set of preallocated arrays of one shape/dtype.
+
+    When every buffer is in use a temporary array is allocated instead and
+    counted in `allocations`; it is discarded on release.
+    """
+
+    def __init__(self, shape: Tuple[int, ...], dtype=np.uint8, count: int = 4):
+        self._lock = threading.Lock()
+        self.dtype = dtype
+        self.count = count
+        self.allocations = 0
+        self.acquired = 0
+        self._reset(tuple(shape))
+
+    def _reset(self, shape: Tuple[int, ...]):
+        self.shape = shape
+        self._free = deque(PooledBuffer(np.empty(shape, dtype=self.dtype), self)
+                           for _ in range(self.count))
+
+    def reshape(self, shape: Tuple[int, ...]):
+        """Reallocate the pool for a new shape (e.g. the source changed resolution)"""
+        with self._lock:
+            if tuple(shape) != self.shape:
+                self._reset(tuple(shape))
+                self.allocations += self.count
+
+    def acquire(self) -> PooledBuffer:
+        with self._lock:
+            if self._free:
+                buffer = self._free.popleft()
+            else:
+                buffer = PooledBuffer(np.empty(self.shape, dtype=self.dtype), self)
+                self.allocations += 1
+            buffer._refs = 1
+            self.acquired += 1
+            return buffer
+
+    def _recycle(self, buffer: PooledBuffer):
+        # Called with the lock held; overflow and stale-shape buffers are dropped
+        if buffer.array.shape == self.shape and len(self._free) < self.count:
+            self._free.append(buffer)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                'shape': list(self.shape),
+                'buffers': self.count,
+                'free': len(self._free),
+                'acquired': self.acquired,
+                'allocations': self.allocations,
+            }
+
+
+class CapturedFrame(NamedTuple):
+    """A frame plus its capture metadata"""
+    image: np.ndarray
+    sequence: int          # Monotonically increasing per capture source
+    timestamp: datetime    # Wall-clock capture time (UTC)
+    captured_at: float     # time.monotonic() at capture, for latency
+    buffer: Optional[PooledBuffer] = None  # Pool buffer backing `image`, if any
+
+    def release(self):
+        """Return the backing buffer to its pool once the frame is no longer needed"""
+        if self.buffer is not None:
+            self.buffer.release()
+
+
+class LatestFrameSlot:
+    """Single-slot "latest frame wins" buffer between capture and detection"""
+
+    def __init__(self, condition: Optional[threading.Condition] = None):
+        # Several slots may share one condition so a consumer can wait on all of them
+        self._cond = condition or threading.Condition()
+        self._frame: Optional[CapturedFrame] = None
+        self._sequence = 0
+        self._last_taken_sequence = 0
+
+        # Stats
+        self.frames_published = 0
+        self.frames_taken = 0
+        self.frames_overwritten = 0  # replaced before the detector took them
+
+    def put(self, image: np.ndarray, buffer: Optional[PooledBuffer] = None) -> int:
+        """
+        Publish a new frame, replacing any frame the detector has not taken yet.
+
+        The slot takes over the caller's reference to `buffer`; the taker must
+        call CapturedFrame.release() when done with the image.
+        """
+        with self._cond:
+            if self._frame is not None:
+                self.frames_overwritten += 1
+                self._frame.release()
+            self._sequence += 1
+            self._frame = CapturedFrame(image, self._sequence, datetime.utcnow(),
+                                        time.monotonic(), buffer)
+            self.frames_published += 1
+            self._cond.notify_all()
+            return self._sequence
+
+    @property
+    def has_frame(self) -> bool:
+        """True while a published frame is waiting to be taken"""
+        return self._frame is not None
+
+    def get(self, timeout: Optional[float] = None) -> Optional[CapturedFrame]:
+        """Take the most recent frame, waiting up to `timeout` seconds; None on timeout"""
+        with self._cond:
+            if self._frame is None and not self._cond.wait_for(lambda: self._frame is not None, timeout):
+                return None
+            frame = self._frame
+            self._frame = None
+            self._last_taken_sequence = frame.sequence
+            self.frames_taken += 1
+            self._cond.notify_all()
+            return frame
+
+    def wait_until_taken(self, timeout: Optional[float] = None) -> bool:
+        """Block until the detector has taken the published frame (lossless sources)"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._frame is None, timeout)
+
+    def get_stats(self) -> dict:
+        with self._cond:
+            return {
+                'last_sequence': self._sequence,
+                'last_taken_sequence': self._last_taken_sequence,
+                'frames_published': self.frames_published,
+                'frames_taken': self.frames_taken,
+                'frames_unseen': self.frames_overwritten,
+            }
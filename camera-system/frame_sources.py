@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Frame Sources
+Capture backends selected by `captureConfig` in config.json:
+
+- v4l2:      USB / CSI camera by index (default: index 0, 1920x1080 @ 15 fps)
+- rtsp:      IP camera stream URL
+- gstreamer: custom GStreamer pipeline ending in `appsink drop=true max-buffers=1`
+- file:      local video file (optionally looped)
+- images:    directory of still images (optionally looped)
+
+Each source has its own reconnect/backoff policy and reports the format it
+actually negotiated. File and directory sources are not real-time: the
+capture thread feeds them as fast as detection consumes frames, which makes
+them suitable for throughput testing on a dev box.
+"""
+
+import logging
+import re
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np  # type: ignore
+
+# Import OpenCV with error handling
+try:
+    import cv2  # type: ignore
+except ImportError:
+    raise ImportError(
+        "OpenCV (cv2) is required but not installed.\n"
+        "Please install it using: pip install opencv-python>=4.5.0\n"
+        "Or on Raspberry Pi: sudo apt-get install -y python3-opencv"
+    )
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp'}
+
+
+class FrameSource:
+    """
+    Base frame source: open/read/release with a per-source reconnect policy.
+
+    After `failures_before_reconnect` consecutive failed reads the source is
+    released and reopened, waiting `reconnect_delay` seconds (doubling up to
+    `max_reconnect_delay`) between attempts.
+    """
+
+    kind = 'base'
+    realtime = True
+    reconnect_delay = 1.0
+    max_reconnect_delay = 30.0
+    failures_before_reconnect = 5
+
+    def __init__(self, config: Dict):
+        self.config = config
+        self.resolution = tuple(config.get('resolution', [1920, 1080]))
+        self.fps = float(config.get('fps', 15))
+        self.reconnect_delay = float(config.get('reconnectDelay', self.reconnect_delay))
+        self.max_reconnect_delay = float(config.get('maxReconnectDelay', self.max_reconnect_delay))
+
+        self._handle = None
+        self._delay = self.reconnect_delay
+        self._next_attempt = 0.0
+        self.failures = 0
+        self.connect_count = 0
+        self.exhausted = False  # finite sources with looping disabled
+        self.negotiated_format: Dict = {}
+
+    @property
+    def target(self) -> str:
+        raise NotImplementedError
+
+    @property
+    def connected(self) -> bool:
+        return self._handle is not None
+
+    def read(self, image: Optional[np.ndarray] = None) -> Tuple[bool, Optional[np.ndarray]]:
+        """Read the next frame, decoding into `image` when its size matches"""
+        if self._handle is None and not self._connect():
+            return False, None
+
+        ok, frame = self._read(image)
+        if ok:
+            self.failures = 0
+            self._delay = self.reconnect_delay
+            return True, frame
+
+        self.failures += 1
+        if self.failures >= self.failures_before_reconnect and not self.exhausted:
+            logger.warning(f"{self.kind} source {self.target}: {self.failures} failed reads, reconnecting")
+            self.release()
+            self._schedule_reconnect()
+        return False, None
+
+    def release(self):
+        if self._handle is not None:
+            self._handle.release()
+            self._handle = None
+
+    def describe(self) -> Dict:
+        return {
+            'type': self.kind,
+            'target': self.target,
+            'connected': self.connected,
+            'realtime': self.realtime,
+            'format': self.negotiated_format,
+            'connects': self.connect_count,
+            'exhausted': self.exhausted,
+        }
+
+    def _connect(self) -> bool:
+        if time.monotonic() < self._next_attempt:
+            return False
+        try:
+            self._handle = self._open()
+            self.negotiated_format = self._negotiate()
+        except Exception as e:
+            logger.error(f"Failed to open {self.kind} source {self.target}: {e}")
+            self.release()
+            self._schedule_reconnect()
+            return False
+
+        self.failures = 0
+        self.connect_count += 1
+        logger.info(f"✓ {self.kind} source opened: {self.target} {self.negotiated_format}")
+        return True
+
+    def _schedule_reconnect(self):
+        self._next_attempt = time.monotonic() + self._delay
+        self._delay = min(self._delay * 2, self.max_reconnect_delay)
+
+    def _open(self):
+        raise NotImplementedError
+
+    def _read(self, image: Optional[np.ndarray]) -> Tuple[bool, Optional[np.ndarray]]:
+        if image is not None:
+            return self._handle.read(image=image)
+        return self._handle.read()
+
+    def _negotiate(self) -> Dict:
+        """Format the device actually delivers (may differ from what was requested)"""
+        cap = self._handle
+        fourcc = int(cap.get(cv2.CAP_PROP_FOURCC))
+        return {
+            'width': int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            'height': int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            'fps': round(cap.get(cv2.CAP_PROP_FPS), 2),
+            'fourcc': ''.join(chr((fourcc >> 8 * i) & 0xFF) for i in range(4)).strip('\x00'),
+        }
+
+    @staticmethod
+    def _check_opened(cap, target: str):
+        if not cap.isOpened():
+            cap.release()
+            raise IOError(f"could not open {target}")
+        return cap
+
+
+class V4L2Source(FrameSource):
+    """Local camera by V4L2 index"""
+
+    kind = 'v4l2'
+
+    @property
+    def target(self) -> str:
+        return f"/dev/video{int(self.config.get('cameraIndex', 0))}"
+
+    def _open(self):
+        cap = self._check_opened(
+            cv2.VideoCapture(int(self.config.get('cameraIndex', 0)), cv2.CAP_V4L2), self.target
+        )
+        if 'fourcc' in self.config:
+            cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*self.config['fourcc']))
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.resolution[0])
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.resolution[1])
+        cap.set(cv2.CAP_PROP_FPS, self.fps)
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        return cap
+
+
+class RTSPSource(FrameSource):
+    """IP camera over RTSP (FFmpeg backend)"""
+
+    kind = 'rtsp'
+    reconnect_delay = 2.0
+    max_reconnect_delay = 60.0
+    failures_before_reconnect = 3
+
+    @property
+    def target(self) -> str:
+        # Hide credentials in logs and status
+        return re.sub(r'//[^@/]+@', '//***@', self.config['url'])
+
+    def _open(self):
+        cap = self._check_opened(cv2.VideoCapture(self.config['url'], cv2.CAP_FFMPEG), self.target)
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        return cap
+
+
+class GStreamerSource(FrameSource):
+    """Custom GStreamer pipeline; the appsink only ever holds the newest buffer"""
+
+    kind = 'gstreamer'
+    reconnect_delay = 2.0
+    max_reconnect_delay = 60.0
+    failures_before_reconnect = 3
+
+    @property
+    def target(self) -> str:
+        return self.pipeline
+
+    @property
+    def pipeline(self) -> str:
+        pipeline = self.config['pipeline'].strip()
+        if 'appsink' not in pipeline:
+            return f"{pipeline} ! videoconvert ! video/x-raw,format=BGR ! appsink drop=true max-buffers=1"
+        if 'drop=' not in pipeline:
+            pipeline = pipeline.replace('appsink', 'appsink drop=true', 1)
+        if 'max-buffers=' not in pipeline:
+            pipeline = pipeline.replace('appsink', 'appsink max-buffers=1', 1)
+        return pipeline
+
+    def _open(self):
+        return self._check_opened(cv2.VideoCapture(self.pipeline, cv2.CAP_GSTREAMER), self.target)
+
+
+class VideoFileSource(FrameSource):
+    """Local video file, rewound at the end when `loop` is set"""
+
+    kind = 'file'
+    realtime = False
+    reconnect_delay = 0.5
+    failures_before_reconnect = 1
+
+    @property
+    def target(self) -> str:
+        return str(self.config['path'])
+
+    def _open(self):
+        if not Path(self.target).is_file():
+            raise FileNotFoundError(self.target)
+        return self._check_opened(cv2.VideoCapture(self.target), self.target)
+
+    def _read(self, image):
+        ok, frame = super()._read(image)
+        if not ok:
+            if not self.config.get('loop', True):
+                self.exhausted = True
+                return False, None
+            # End of file: rewind and retry once
+            self._handle.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = super()._read(image)
+        return ok, frame
+
+
+class _ImageDirectoryHandle:
+    def __init__(self, files: List[Path]):
+        self.files = files
+        self.position = 0
+
+    def release(self):
+        pass
+
+
+class ImageDirectorySource(FrameSource):
+    """Directory of still images read in name order"""
+
+    kind = 'images'
+    realtime = False
+    reconnect_delay = 0.5
+    failures_before_reconnect = 1
+
+    @property
+    def target(self) -> str:
+        return str(self.config['path'])
+
+    def _open(self):
+        files = sorted(p for p in Path(self.target).iterdir()
+                       if p.suffix.lower() in IMAGE_EXTENSIONS)
+        if not files:
+            raise FileNotFoundError(f"no images in {self.target}")
+        return _ImageDirectoryHandle(files)
+
+    def _negotiate(self) -> Dict:
+        first = cv2.imread(str(self._handle.files[0]))
+        height, width = first.shape[:2] if first is not None else (0, 0)
+        return {'width': width, 'height': height, 'fps': None, 'images': len(self._handle.files)}
+
+    def _read(self, image):
+        handle = self._handle
+        # Unreadable files are skipped here: a failed read would reopen the
+        # directory and start over from the first image. One pass at most
+        # (plus the end-of-list check), so a directory of bad files still fails.
+        for _ in range(len(handle.files) + 1):
+            if handle.position >= len(handle.files):
+                if not self.config.get('loop', True):
+                    self.exhausted = True
+                    return False, None
+                handle.position = 0
+
+            path = handle.files[handle.position]
+            handle.position += 1
+            frame = cv2.imread(str(path))
+            if frame is not None:
+                break
+            logger.warning(f"Unreadable image skipped: {path}")
+        else:
+            return False, None
+
+        if image is not None and image.shape == frame.shape:
+            np.copyto(image, frame)
+            return True, image
+        return True, frame
+
+
+FRAME_SOURCES = {
+    'v4l2': V4L2Source,
+    'usb': V4L2Source,
+    'rtsp': RTSPSource,
+    'gstreamer': GStreamerSource,
+    'file': VideoFileSource,
+    'images': ImageDirectorySource,
+}
+
+
+def create_frame_source(capture_config: Dict) -> FrameSource:
+    """Build the frame source described by `captureConfig` (defaults to V4L2 camera 0)"""
+    kind = capture_config.get('source', 'v4l2')
+    if kind not in FRAME_SOURCES:
+        raise ValueError(f"Unknown frame source '{kind}'. Expected one of: {', '.join(FRAME_SOURCES)}")
+    return FRAME_SOURCES[kind](capture_config)
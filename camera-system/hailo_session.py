@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Long-lived Hailo-8 Inference Session
+Activates the network group once and keeps the vstreams open for the life of
+the agent. The streams are owned by a single worker thread and are only torn
+down and rebuilt after a device error.
+
+Sending and receiving run on separate threads with up to `depth` requests in
+flight, so the accelerator works on one frame while the caller preprocesses
+the next. A request may carry a batch of frames (e.g. the tiles of one camera
+frame); it is sent in one call and its outputs come back stacked. Results
+complete in submission order (vstreams are FIFO).
+
+Includes FakeHailoDevice, a drop-in stand-in for running the session without
+Hailo hardware.
+"""
+
+import contextlib
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np  # type: ignore
+
+try:
+    from hailo_platform import (HEF, VDevice, HailoStreamInterface,  # type: ignore[import-untyped]
+                                ConfigureParams, InputVStreamParams,
+                                OutputVStreamParams, InputVStreams,
+                                OutputVStreams, FormatType)
+    HAILO_AVAILABLE = True
+except ImportError:
+    HEF = None
+    HAILO_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+class HailoSessionUnavailable(RuntimeError):
+    """Raised for requests submitted while the vstreams are down or being rebuilt."""
+
+
+class HailoDevice:
+    """HailoRT device: loads the HEF, configures the network group and opens vstreams."""
+
+    def __init__(self, model_path: str):
+        if not HAILO_AVAILABLE:
+            raise RuntimeError("hailo_platform not installed. Run: pip install hailo-platform")
+
+        self.model_path = model_path
+        self.hef = HEF(model_path)
+        self.vdevice = VDevice()
+
+        configure_params = ConfigureParams.create_from_hef(
+            self.hef, interface=HailoStreamInterface.PCIe
+        )
+        self.network_group = self.vdevice.configure(self.hef, configure_params)[0]
+        self.network_group_params = self.network_group.create_params()
+
+        self.input_vstreams_params = InputVStreamParams.make(
+            self.network_group, format_type=FormatType.UINT8
+        )
+        self.output_vstreams_params = OutputVStreamParams.make(
+            self.network_group, format_type=FormatType.FLOAT32
+        )
+
+        # vstream shapes are per frame (no batch dimension): [height, width, channels]
+        self.input_shape = tuple(self.hef.get_input_vstream_infos()[0].shape)
+        self.output_shape = tuple(self.hef.get_output_vstream_infos()[0].shape)
+
+    @contextlib.contextmanager
+    def open_vstreams(self):
+        """Activate the network group and open input/output vstreams."""
+        with self.network_group.activate(self.network_group_params):
+            with InputVStreams(self.network_group, self.input_vstreams_params) as inputs, \
+                    OutputVStreams(self.network_group, self.output_vstreams_params) as outputs:
+                yield list(inputs), list(outputs)
+
+    def release(self):
+        """Release the virtual device."""
+        self.vdevice.release()
+
+
+class _FakeInputVStream:
+    def __init__(self, device: 'FakeHailoDevice', pending: queue.Queue):
+        self.device = device
+        self.pending = pending
+
+    def send(self, input_data: np.ndarray):
+        if tuple(input_data.shape[-3:]) != tuple(self.device.input_shape):
+            raise ValueError(f"Fake Hailo input shape mismatch: {input_data.shape}")
+        self.device._maybe_fail()
+        # Like HailoRT, a batch is sent in one call and received frame by frame
+        for frame in input_data.reshape((-1,) + self.device.input_shape):
+            self.pending.put(frame)
+
+
+class _FakeOutputVStream:
+    def __init__(self, device: 'FakeHailoDevice', pending: queue.Queue):
+        self.device = device
+        self.pending = pending
+
+    def recv(self) -> np.ndarray:
+        input_data = self.pending.get(timeout=self.device.recv_timeout)
+        if self.device.latency:
+            time.sleep(self.device.latency)
+        self.device.frames_inferred += 1
+        if self.device.output_fn is not None:
+            return self.device.output_fn(input_data)
+        return np.zeros(self.device.output_shape, dtype=np.float32)
+
+
+class FakeHailoDevice:
+    """
+    Stand-in for HailoDevice that needs no Hailo hardware.
+
+    Mimics the HailoRT send/recv contract (FIFO, blocking recv) with an optional
+    per-frame latency, and can inject device errors to exercise the rebuild path.
+    """
+
+    def __init__(self, input_shape: Tuple[int, int, int] = (640, 640, 3),
+                 output_shape: Tuple[int, ...] = (100, 6), latency: float = 0.0,
+                 output_fn: Optional[Callable[[np.ndarray], np.ndarray]] = None,
+                 recv_timeout: float = 10.0):
+        self.input_shape = tuple(input_shape)
+        self.output_shape = tuple(output_shape)
+        self.latency = latency
+        self.output_fn = output_fn
+        self.recv_timeout = recv_timeout
+
+        self.open_count = 0
+        self.frames_inferred = 0
+        self._errors_to_inject = 0
+        self._lock = threading.Lock()
+
+    def inject_errors(self, count: int = 1):
+        """Make the next `count` sends fail with a device error."""
+        with self._lock:
+            self._errors_to_inject += count
+
+    def _maybe_fail(self):
+        with self._lock:
+            if self._errors_to_inject > 0:
+                self._errors_to_inject -= 1
+                raise RuntimeError("Fake Hailo device error")
+
+    @contextlib.contextmanager
+    def open_vstreams(self):
+        self.open_count += 1
+        pending: queue.Queue = queue.Queue()
+        yield [_FakeInputVStream(self, pending)], [_FakeOutputVStream(self, pending)]
+
+    def release(self):
+        pass
+
+
+class HailoInferenceSession:
+    """
+    Inference session owned by a dedicated worker thread.
+
+    The worker opens the vstreams once and sends every request through them;
+    a receiver thread reads the outputs back. If the device raises, the streams
+    are closed, pending requests are failed with HailoSessionUnavailable and
+    the streams are rebuilt with backoff.
+    """
+
+    def __init__(self, device, depth: int = 1, rebuild_delay: float = 1.0,
+                 max_rebuild_delay: float = 30.0):
+        self.device = device
+        self.depth = max(1, int(depth))
+        self.rebuild_delay = rebuild_delay
+        self.max_rebuild_delay = max_rebuild_delay
+
+        self._requests: queue.Queue = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._running = False
+        self.ready = threading.Event()
+
+        self._receive_error: Optional[Exception] = None
+
+        # Stats
+        self.frames_processed = 0
+        self.frames_sent = 0
+        self.frames_received = 0
+        self.error_count = 0
+        self.rebuild_count = 0
+        self.last_error: Optional[str] = None
+
+    def start(self):
+        """Start the worker thread and open the vstreams."""
+        if self._running:
+            return
+        self._running = True
+        self._worker = threading.Thread(target=self._run, name='hailo-session', daemon=True)
+        self._worker.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Close the vstreams and stop the worker thread."""
+        self._running = False
+        self._requests.put(None)
+        if self._worker:
+            self._worker.join(timeout=timeout)
+        self._fail_pending(HailoSessionUnavailable("Hailo session stopped"))
+
+    def submit(self, input_data: np.ndarray) -> Future:
+        """Queue an NHWC uint8 batch (usually of one frame) for inference."""
+        future: Future = Future()
+        if not self._running:
+            future.set_exception(HailoSessionUnavailable("Hailo session not running"))
+            return future
+        self._requests.put((input_data, future))
+        return future
+
+    def infer(self, input_data: np.ndarray, timeout: float = 10.0) -> List[np.ndarray]:
+        """Run one batch and return the outputs, each with a leading batch dimension."""
+        return self.submit(input_data).result(timeout=timeout)
+
+    @property
+    def frames_in_flight(self) -> int:
+        return self.frames_sent - self.frames_received
+
+    def get_stats(self) -> dict:
+        return {
+            'ready': self.ready.is_set(),
+            'depth': self.depth,
+            'frames_in_flight': self.frames_in_flight,
+            'frames_processed': self.frames_processed,
+            'error_count': self.error_count,
+            'rebuild_count': self.rebuild_count,
+            'last_error': self.last_error,
+        }
+
+    def _run(self):
+        delay = self.rebuild_delay
+        while self._running:
+            try:
+                with self.device.open_vstreams() as (inputs, outputs):
+                    self.ready.set()
+                    logger.info("✓ Hailo vstreams opened")
+                    delay = self.rebuild_delay
+                    self._serve(inputs, outputs)
+            except Exception as e:
+                self.ready.clear()
+                self.error_count += 1
+                self.last_error = str(e)
+                logger.error(f"Hailo device error, rebuilding vstreams in {delay:.1f}s: {e}")
+                self._fail_pending(HailoSessionUnavailable(f"Hailo device error: {e}"))
+                self._backoff(delay)
+                delay = min(delay * 2, self.max_rebuild_delay)
+                self.rebuild_count += 1
+        self.ready.clear()
+        logger.info("Hailo vstreams closed")
+
+    def _serve(self, inputs, outputs):
+        """Send loop; a receiver thread completes the futures in send order."""
+        sent: queue.Queue = queue.Queue()
+        slots = threading.Semaphore(self.depth)
+        failed = threading.Event()
+        self._receive_error = None
+
+        receiver = threading.Thread(target=self._receive, args=(outputs, sent, slots, failed),
+                                    name='hailo-recv', daemon=True)
+        receiver.start()
+        try:
+            while self._running and not failed.is_set():
+                try:
+                    request = self._requests.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                if request is None:
+                    break
+
+                input_data, future = request
+                if not self._acquire_slot(slots, failed):
+                    # Device failed (or session stopped) while waiting for a slot
+                    if future.set_running_or_notify_cancel():
+                        future.set_exception(HailoSessionUnavailable("Hailo vstreams closed"))
+                    continue
+                if not future.set_running_or_notify_cancel():
+                    slots.release()
+                    continue
+
+                try:
+                    inputs[0].send(input_data)
+                except Exception as e:
+                    slots.release()
+                    future.set_exception(e)
+                    raise
+                frames = len(input_data)
+                self.frames_sent += frames
+                sent.put((future, frames))
+        finally:
+            sent.put(None)
+            receiver.join()
+
+        if self._receive_error is not None:
+            raise self._receive_error
+
+    def _acquire_slot(self, slots: threading.Semaphore, failed: threading.Event) -> bool:
+        """Block while `depth` requests are already on the device."""
+        while not slots.acquire(timeout=0.5):
+            if failed.is_set() or not self._running:
+                return False
+        return True
+
+    def _receive(self, outputs, sent: queue.Queue, slots: threading.Semaphore,
+                 failed: threading.Event):
+        while True:
+            request = sent.get()
+            if request is None:
+                return
+            future, frames = request
+            self.frames_received += frames
+
+            if failed.is_set():
+                future.set_exception(HailoSessionUnavailable("Hailo vstreams closed"))
+                continue
+            try:
+                results = [np.stack([vstream.recv() for _ in range(frames)]) for vstream in outputs]
+            except Exception as e:
+                self._receive_error = e
+                failed.set()
+                future.set_exception(e)
+                continue
+            finally:
+                slots.release()
+
+            future.set_result(results)
+            self.frames_processed += frames
+
+    def _backoff(self, delay: float):
+        """Wait before rebuilding, failing requests that arrive in the meantime."""
+        deadline = time.monotonic() + delay
+        while self._running and time.monotonic() < deadline:
+            self._fail_pending(HailoSessionUnavailable("Hailo vstreams are being rebuilt"))
+            time.sleep(0.1)
+
+    def _fail_pending(self, error: Exception):
+        while True:
+            try:
+                request = self._requests.get_nowait()
+            except queue.Empty:
+                return
+            if request is None:
+                continue
+            _, future = request
+            if future.set_running_or_notify_cancel():
+                future.set_exception(error)
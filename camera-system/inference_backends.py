@@ -0,0 +1,642 @@
+#!/usr/bin/env python3
+"""
+Inference Backends
+One interface over the detection engines the agent can run:
+
+- hailo:  Hailo-8 HEF models through the long-lived HailoInferenceSession
+- tflite: TensorFlow Lite models on the CPU (tflite_runtime), in-process or
+          on a pool of worker processes (`workers`)
+- onnx:   ONNX models on the CPU (onnxruntime), for x86 boxes and CI
+
+Every backend loads a model, warms it up, runs a uint8 NHWC batch and
+declares the schema of its outputs (see postprocess.OUTPUT_DECODERS). The
+backend is picked from the model file type and what is installed; engines
+that are not installed are simply unavailable rather than import errors.
+"""
+
+import itertools
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Type
+
+import numpy as np  # type: ignore
+
+from hailo_session import HAILO_AVAILABLE, HailoDevice, HailoInferenceSession
+
+try:
+    import tflite_runtime.interpreter as tflite  # type: ignore
+    TFLITE_AVAILABLE = True
+except ImportError:
+    tflite = None
+    TFLITE_AVAILABLE = False
+
+try:
+    import onnxruntime  # type: ignore
+    ONNXRUNTIME_AVAILABLE = True
+except ImportError:
+    onnxruntime = None
+    ONNXRUNTIME_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+class BackendUnavailable(RuntimeError):
+    """Raised when no installed backend can run the configured model."""
+
+
+class InferenceBackend:
+    """
+    Base inference backend.
+
+    `infer(batch)` takes a (B, H, W, C) uint8 BGR batch and returns the model
+    outputs, each with a leading batch dimension, in the layout named by
+    `output_schema`. `submit` returns a Future; only asynchronous backends
+    complete it on another thread, the others run inline.
+    """
+
+    name = 'base'
+    extensions: Tuple[str, ...] = ()
+    output_schema = 'detections'
+    asynchronous = False
+    available = False
+    install_hint = ''
+    concurrency = 1  # batches the backend works on at once
+
+    def __init__(self, model_path: str, config: Optional[Dict] = None):
+        self.model_path = model_path
+        self.config = config or {}
+        self.warmup_ms: Optional[float] = None
+
+        # Stats
+        self.batches = 0
+        self.frames = 0
+        self.latency_ms = 0.0  # running average per batch
+
+    @property
+    def input_shape(self) -> Tuple[int, int, int]:
+        """Per-frame model input shape (height, width, channels)"""
+        raise NotImplementedError
+
+    def load(self):
+        raise NotImplementedError
+
+    def infer(self, batch: np.ndarray) -> List[np.ndarray]:
+        start = time.perf_counter()
+        outputs = self._infer(batch)
+        self._record((time.perf_counter() - start) * 1000, len(batch))
+        return outputs
+
+    def submit(self, batch: np.ndarray) -> Future:
+        future: Future = Future()
+        try:
+            future.set_result(self.infer(batch))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def warmup(self, runs: int = 2):
+        """Run a few blank frames so first-frame allocation/compilation is not on the live path"""
+        batch = np.zeros((1,) + tuple(self.input_shape), dtype=np.uint8)
+        start = time.perf_counter()
+        for _ in range(runs):
+            self.infer(batch)
+        self.warmup_ms = (time.perf_counter() - start) * 1000 / max(1, runs)
+        self.batches = self.frames = 0
+        self.latency_ms = 0.0
+        logger.info(f"✓ {self.name} backend warmed up ({self.warmup_ms:.1f} ms per run)")
+
+    def benchmark(self, batch_size: int = 1, iterations: int = 50) -> Dict:
+        """Latency and throughput on random frames"""
+        batch = np.random.randint(0, 255, (batch_size,) + tuple(self.input_shape), dtype=np.uint8)
+        latencies = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            self.infer(batch)
+            latencies.append((time.perf_counter() - start) * 1000)
+        latencies = np.array(latencies)
+        return {
+            'backend': self.name,
+            'batch_size': batch_size,
+            'latency_ms_mean': round(float(latencies.mean()), 2),
+            'latency_ms_p50': round(float(np.percentile(latencies, 50)), 2),
+            'latency_ms_p95': round(float(np.percentile(latencies, 95)), 2),
+            'frames_per_second': round(batch_size * 1000.0 / float(latencies.mean()), 1),
+        }
+
+    def close(self):
+        pass
+
+    def get_stats(self) -> Dict:
+        return {
+            'backend': self.name,
+            'model': self.model_path,
+            'input_shape': list(self.input_shape),
+            'output_schema': self.output_schema,
+            'warmup_ms': round(self.warmup_ms, 1) if self.warmup_ms is not None else None,
+            'batches': self.batches,
+            'frames': self.frames,
+            'latency_ms': round(self.latency_ms, 2),
+        }
+
+    def _infer(self, batch: np.ndarray) -> List[np.ndarray]:
+        raise NotImplementedError
+
+    def _record(self, latency_ms: float, frames: int):
+        self.batches += 1
+        self.frames += frames
+        if self.batches == 1:
+            self.latency_ms = latency_ms
+        else:
+            self.latency_ms += 0.1 * (latency_ms - self.latency_ms)
+
+
+class HailoBackend(InferenceBackend):
+    """Hailo-8 HEF model; requests are pipelined up to `pipelineDepth` deep"""
+
+    name = 'hailo'
+    extensions = ('.hef',)
+    output_schema = 'detections'
+    asynchronous = True
+    available = HAILO_AVAILABLE
+    install_hint = 'Install the Hailo runtime: pip install hailo-platform (see install-hailo-rpi.sh)'
+
+    def load(self):
+        # The session's worker thread activates the network group once and
+        # keeps the vstreams open until the agent stops (or a device error)
+        self.device = HailoDevice(self.model_path)
+        self.session = HailoInferenceSession(self.device, depth=int(self.config.get('pipelineDepth', 1)))
+        self.session.start()
+        if not self.session.ready.wait(timeout=10):
+            error = self.session.last_error or 'timed out after 10s'
+            self.close()
+            raise RuntimeError(f"Hailo vstreams did not open for {self.model_path}: {error}")
+        logger.info(f"✓ Hailo-8 model loaded: {self.model_path} (output shape {self.device.output_shape})")
+
+    @property
+    def input_shape(self) -> Tuple[int, int, int]:
+        return tuple(self.device.input_shape)
+
+    def submit(self, batch: np.ndarray) -> Future:
+        start = time.perf_counter()
+        frames = len(batch)
+        future = self.session.submit(batch)
+        future.add_done_callback(lambda _: self._record((time.perf_counter() - start) * 1000, frames))
+        return future
+
+    def _infer(self, batch: np.ndarray) -> List[np.ndarray]:
+        return self.session.infer(batch)
+
+    def close(self):
+        self.session.stop()
+        self.device.release()
+
+    def get_stats(self) -> Dict:
+        stats = super().get_stats()
+        stats['session'] = self.session.get_stats()
+        return stats
+
+
+class TFLiteBackend(InferenceBackend):
+    """
+    TensorFlow Lite model (SSD-style boxes/classes/scores outputs).
+
+    Runs on `numThreads` interpreter threads (default: up to 4 cores) with the
+    XNNPACK delegate unless `xnnpack` is false; `delegate` may name an external
+    delegate library instead. Frames are written straight into the
+    interpreter's input tensor: uint8 models take the pixels as-is, int8 models
+    go through a 256-entry lookup table built from the tensor's quantization,
+    and float models are normalized in place with `inputMean` / `inputStd`
+    (default 127.5 / 127.5, i.e. [-1, 1]).
+    """
+
+    name = 'tflite'
+    extensions = ('.tflite',)
+    output_schema = 'boxes_classes_scores'
+    available = TFLITE_AVAILABLE
+    install_hint = 'Install TensorFlow Lite: pip install tflite-runtime (see install-tflite-rpi.sh)'
+
+    def __init__(self, model_path: str, config: Optional[Dict] = None):
+        super().__init__(model_path, config)
+        self.num_threads = int(self.config.get('numThreads') or min(4, os.cpu_count() or 1))
+        self.xnnpack = bool(self.config.get('xnnpack', True))
+        self.delegate_path = self.config.get('delegate')
+        self.input_mean = float(self.config.get('inputMean', 127.5))
+        self.input_std = float(self.config.get('inputStd', 127.5))
+        self.delegate = None
+        self.batchable = True
+
+    def load(self):
+        options = {'model_path': self.model_path, 'num_threads': self.num_threads}
+        if self.delegate_path:
+            try:
+                options['experimental_delegates'] = [tflite.load_delegate(self.delegate_path)]
+                self.delegate = self.delegate_path
+            except (ValueError, OSError) as e:
+                logger.warning(f"Could not load TFLite delegate {self.delegate_path}, using the CPU: {e}")
+
+        # XNNPACK is the runtime's default CPU delegate; opting out needs an op
+        # resolver without default delegates (older runtimes always use it)
+        resolver = getattr(tflite, 'OpResolverType', None)
+        if resolver is not None:
+            options['experimental_op_resolver_type'] = (
+                resolver.AUTO if self.xnnpack else resolver.BUILTIN_WITHOUT_DEFAULT_DELEGATES)
+        if self.delegate is None and self.xnnpack:
+            self.delegate = 'xnnpack'
+
+        self.interpreter = tflite.Interpreter(**options)
+        self.interpreter.allocate_tensors()
+        self._refresh_details()
+        logger.info(f"✓ TensorFlow Lite model loaded: {self.model_path} "
+                    f"({len(self.output_details)} output tensors, {np.dtype(self.input_dtype).name} input, "
+                    f"{self.num_threads} threads, delegate: {self.delegate or 'none'})")
+
+    @property
+    def input_shape(self) -> Tuple[int, int, int]:
+        return tuple(int(v) for v in self.input_details[0]['shape'][1:])
+
+    def _refresh_details(self):
+        self.input_details = self.interpreter.get_input_details()
+        self.output_details = self._ssd_outputs(self.interpreter.get_output_details())
+        self.input_dtype = self.input_details[0]['dtype']
+
+        # Pixel -> quantized input, computed once (no per-frame float conversion)
+        self.input_lut = None
+        if self.input_dtype == np.int8:
+            scale, zero_point = self.input_details[0]['quantization']
+            pixels = (np.arange(256, dtype=np.float64) - self.input_mean) / self.input_std
+            quantized = np.round(pixels / (scale or 1.0) + zero_point)
+            self.input_lut = np.clip(quantized, -128, 127).astype(np.int8)
+
+    @staticmethod
+    def _ssd_outputs(details: List[Dict]) -> List[Dict]:
+        """
+        [boxes, classes, scores] output details; converters emit them in
+        different orders. Boxes are the rank-3 [B, N, 4] tensor and the rank-1
+        detection count is dropped. Classes and scores are told apart by name
+        (`class` / `score`, or outputs :1 / :2 of TFLite_Detection_PostProcess),
+        otherwise taken in output order.
+        """
+        boxes = [detail for detail in details if len(detail['shape']) == 3 and detail['shape'][-1] == 4]
+        per_box = [detail for detail in details if len(detail['shape']) == 2]
+        if len(boxes) != 1 or len(per_box) != 2:
+            shapes = [[int(v) for v in detail['shape']] for detail in details]
+            raise ValueError(f"Expected SSD outputs (boxes [B, N, 4], classes and scores [B, N]), got {shapes}")
+
+        def role(detail: Dict) -> Optional[str]:
+            name = detail['name'].lower()
+            if 'class' in name:
+                return 'classes'
+            if 'score' in name:
+                return 'scores'
+            if 'tflite_detection_postprocess:' in name:
+                return {'1': 'classes', '2': 'scores'}.get(name.rsplit(':', 1)[1])
+            return None
+
+        roles = {role(detail): detail for detail in per_box}
+        if set(roles) == {'classes', 'scores'}:
+            per_box = [roles['classes'], roles['scores']]
+        return boxes + per_box
+
+    def _resize_batch(self, batch_size: int) -> bool:
+        """Resize the input to `batch_size` frames (tiles / streams); False if the model cannot batch"""
+        input_shape = (batch_size,) + tuple(self.input_shape)
+        try:
+            self.interpreter.resize_tensor_input(self.input_details[0]['index'], input_shape)
+            self.interpreter.allocate_tensors()
+        except (RuntimeError, ValueError) as e:
+            # Fixed-batch graphs (e.g. a reshape baked for one frame); run frames one by one
+            logger.warning(f"TFLite model cannot run batches of {batch_size}, invoking per frame: {e}")
+            self.batchable = False
+            self.interpreter.resize_tensor_input(self.input_details[0]['index'], (1,) + tuple(self.input_shape))
+            self.interpreter.allocate_tensors()
+            self._refresh_details()
+            return False
+        self._refresh_details()
+        logger.info(f"TFLite input resized to batch of {batch_size}: {input_shape}")
+        return True
+
+    def _infer(self, batch: np.ndarray) -> List[np.ndarray]:
+        if self.input_details[0]['shape'][0] != len(batch):
+            if not (self.batchable and self._resize_batch(len(batch))):
+                outputs = [self._invoke(batch[i:i + 1]) for i in range(len(batch))]
+                return [np.concatenate(tensors) for tensors in zip(*outputs)]
+        return self._invoke(batch)
+
+    def _invoke(self, batch: np.ndarray) -> List[np.ndarray]:
+        # View of the interpreter's input buffer; released before invoke()
+        tensor = self.interpreter.tensor(self.input_details[0]['index'])()
+        if self.input_dtype == np.uint8:
+            np.copyto(tensor, batch)
+        elif self.input_lut is not None:
+            np.take(self.input_lut, batch, out=tensor)
+        else:
+            np.subtract(batch, self.input_mean, out=tensor)
+            tensor /= self.input_std
+        del tensor
+
+        self.interpreter.invoke()
+        return [self._output(detail) for detail in self.output_details]
+
+    def _output(self, detail: Dict) -> np.ndarray:
+        output = self.interpreter.get_tensor(detail['index'])
+        scale, zero_point = detail['quantization']
+        if scale and output.dtype in (np.int8, np.uint8):
+            return (output.astype(np.float32) - zero_point) * scale
+        return output
+
+    def get_stats(self) -> Dict:
+        stats = super().get_stats()
+        stats.update({
+            'threads': self.num_threads,
+            'delegate': self.delegate,
+            'input_dtype': np.dtype(self.input_dtype).name,
+            'batchable': self.batchable,
+        })
+        return stats
+
+
+def _tflite_worker(index: int, model_path: str, config: Dict, tasks, results):
+    """Worker process: one interpreter, batches read from shared memory by name"""
+    backend = TFLiteBackend(model_path, config)
+    try:
+        backend.load()
+        backend.warmup()
+    except Exception as e:
+        results.put(('failed', index, repr(e)))
+        return
+    results.put(('ready', index, backend.input_shape))
+
+    attached: Dict[str, shared_memory.SharedMemory] = {}
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        request_id, slot_name, shape = task
+        try:
+            slot = attached.get(slot_name)
+            if slot is None:
+                # Spawned workers share the agent's resource tracker; the agent
+                # owns and unlinks the slots
+                slot = shared_memory.SharedMemory(name=slot_name)
+                attached[slot_name] = slot
+            batch = np.ndarray(shape, dtype=np.uint8, buffer=slot.buf)
+            outputs = backend.infer(batch)
+            del batch
+            results.put((request_id, index, outputs))
+        except Exception as e:
+            results.put((request_id, index, e))
+
+    for slot in attached.values():
+        slot.close()
+
+
+class TFLiteWorkerPool(InferenceBackend):
+    """
+    TensorFlow Lite on `workers` processes, each with its own interpreter, so
+    inference does not compete with capture, counting and the API for the GIL.
+
+    Batches are copied into shared-memory slots and handed to whichever worker
+    is free; only the slot name goes through the task queue and only the small
+    output arrays come back. Futures resolve as workers finish, and the agent
+    collects them in submission order (its pipeline queue), so results reach
+    tracking in frame order.
+    """
+
+    name = 'tflite'
+    extensions = TFLiteBackend.extensions
+    output_schema = TFLiteBackend.output_schema
+    asynchronous = True
+    available = TFLITE_AVAILABLE
+    install_hint = TFLiteBackend.install_hint
+
+    def __init__(self, model_path: str, config: Optional[Dict] = None):
+        super().__init__(model_path, config)
+        self.workers = max(1, int(self.config.get('workers', 2)))
+        self.concurrency = self.workers
+
+        # Split the cores between workers unless numThreads is set
+        self.worker_config = dict(self.config)
+        self.worker_config.setdefault('numThreads', max(1, (os.cpu_count() or 1) // self.workers))
+
+        self._input_shape: Optional[Tuple[int, int, int]] = None
+        self._pending: Dict[int, Tuple[Future, shared_memory.SharedMemory, float, int]] = {}
+        self._free_slots: queue.Queue = queue.Queue()
+        self._slots: List[shared_memory.SharedMemory] = []
+        self._request_ids = itertools.count()
+        self._lock = threading.Lock()
+        self.frames_per_worker = [0] * self.workers
+
+    def load(self):
+        context = multiprocessing.get_context('spawn')  # no fork of a threaded agent
+        self._tasks = context.Queue()
+        self._results = context.Queue()
+        self._processes = [
+            context.Process(target=_tflite_worker, name=f"tflite-worker-{index}", daemon=True,
+                            args=(index, self.model_path, self.worker_config, self._tasks, self._results))
+            for index in range(self.workers)
+        ]
+        for process in self._processes:
+            process.start()
+
+        for _ in range(self.workers):
+            status, index, detail = self._results.get(timeout=120)
+            if status == 'failed':
+                self.close()
+                raise RuntimeError(f"TFLite worker {index} failed to load {self.model_path}: {detail}")
+            self._input_shape = tuple(detail)
+
+        # Two slots per worker: one being inferred, one being filled
+        for _ in range(2 * self.workers):
+            self._free_slots.put(None)
+
+        self._collector = threading.Thread(target=self._collect, name='tflite-results', daemon=True)
+        self._collector.start()
+        logger.info(f"✓ TensorFlow Lite worker pool started: {self.workers} processes x "
+                    f"{self.worker_config['numThreads']} threads ({self.model_path})")
+
+    @property
+    def input_shape(self) -> Tuple[int, int, int]:
+        return self._input_shape
+
+    def submit(self, batch: np.ndarray) -> Future:
+        future: Future = Future()
+        slot = self._slot(batch.nbytes)
+        np.ndarray(batch.shape, dtype=np.uint8, buffer=slot.buf)[...] = batch
+
+        request_id = next(self._request_ids)
+        with self._lock:
+            self._pending[request_id] = (future, slot, time.perf_counter(), len(batch))
+        self._tasks.put((request_id, slot.name, batch.shape))
+        return future
+
+    def _infer(self, batch: np.ndarray) -> List[np.ndarray]:
+        return self.submit(batch).result(timeout=30)
+
+    def infer(self, batch: np.ndarray) -> List[np.ndarray]:
+        # Latency is recorded by the collector
+        return self._infer(batch)
+
+    def _slot(self, size: int) -> shared_memory.SharedMemory:
+        """A free shared-memory slot of at least `size` bytes (blocks while all are in use)"""
+        try:
+            slot = self._free_slots.get(timeout=30)
+        except queue.Empty:
+            raise RuntimeError("TFLite workers are not returning results") from None
+        if slot is None or slot.size < size:
+            if slot is not None:
+                self._slots.remove(slot)
+                slot.close()
+                slot.unlink()
+            slot = shared_memory.SharedMemory(create=True, size=size)
+            self._slots.append(slot)
+        return slot
+
+    def _collect(self):
+        """Resolve futures as worker results arrive"""
+        while True:
+            message = self._results.get()
+            if message is None:
+                break
+            request_id, index, outputs = message
+            with self._lock:
+                future, slot, start, frames = self._pending.pop(request_id)
+            self._free_slots.put(slot)
+            self.frames_per_worker[index] += frames
+            if isinstance(outputs, Exception):
+                future.set_exception(outputs)
+            else:
+                self._record((time.perf_counter() - start) * 1000, frames)
+                future.set_result(outputs)
+
+    def close(self):
+        for _ in self._processes:
+            self._tasks.put(None)
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._results.put(None)
+
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for future, _, _, _ in pending.values():
+            future.set_exception(RuntimeError("TFLite worker pool stopped"))
+        for slot in self._slots:
+            slot.close()
+            slot.unlink()
+        self._slots = []
+
+    def get_stats(self) -> Dict:
+        stats = super().get_stats()
+        stats.update({
+            'workers': self.workers,
+            'threads_per_worker': self.worker_config['numThreads'],
+            'in_flight': len(self._pending),
+            'frames_per_worker': list(self.frames_per_worker),
+        })
+        return stats
+
+
+class OnnxRuntimeBackend(InferenceBackend):
+    """
+    ONNX model on the CPU execution provider.
+
+    Defaults to a raw YOLOv8 head (`outputSchema: "yolov8"`, RGB input scaled
+    to 0-1, NCHW); `outputSchema` may name any postprocess.OUTPUT_DECODERS
+    entry for other exports.
+    """
+
+    name = 'onnx'
+    extensions = ('.onnx',)
+    available = ONNXRUNTIME_AVAILABLE
+    install_hint = 'Install ONNX Runtime: pip install onnxruntime'
+
+    def __init__(self, model_path: str, config: Optional[Dict] = None):
+        super().__init__(model_path, config)
+        self.output_schema = self.config.get('outputSchema', 'yolov8')
+
+    def load(self):
+        options = onnxruntime.SessionOptions()
+        threads = self.config.get('numThreads')
+        if threads:
+            options.intra_op_num_threads = int(threads)
+        self.session = onnxruntime.InferenceSession(self.model_path, sess_options=options,
+                                                    providers=['CPUExecutionProvider'])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.float_input = 'float' in model_input.type
+
+        # Dynamic dimensions (names or None) fall back to the configured input size
+        dims = list(model_input.shape)
+        self.channels_first = dims[1] in (1, 3)
+        size = int(self.config.get('inputSize', 640))
+        spatial = dims[2:4] if self.channels_first else dims[1:3]
+        height, width = (d if isinstance(d, int) else size for d in spatial)
+        self._input_shape = (height, width, 3)
+        self._nchw: Optional[np.ndarray] = None
+        logger.info(f"✓ ONNX Runtime model loaded: {self.model_path} (input {model_input.name} {dims})")
+
+    @property
+    def input_shape(self) -> Tuple[int, int, int]:
+        return self._input_shape
+
+    def _infer(self, batch: np.ndarray) -> List[np.ndarray]:
+        # BGR uint8 NHWC -> RGB, optionally scaled to 0-1 and transposed to NCHW
+        rgb = batch[..., ::-1]
+        if self.channels_first:
+            rgb = rgb.transpose(0, 3, 1, 2)
+        if not self.float_input:
+            input_data = np.ascontiguousarray(rgb)
+        else:
+            if self._nchw is None or self._nchw.shape != rgb.shape:
+                self._nchw = np.empty(rgb.shape, dtype=np.float32)
+            input_data = self._nchw
+            np.multiply(rgb, 1.0 / 255.0, out=input_data)
+        return self.session.run(None, {self.input_name: input_data})
+
+
+INFERENCE_BACKENDS: Dict[str, Type[InferenceBackend]] = {
+    'hailo': HailoBackend,
+    'tflite': TFLiteBackend,
+    'onnx': OnnxRuntimeBackend,
+}
+
+
+def available_backends() -> List[str]:
+    return [name for name, backend in INFERENCE_BACKENDS.items() if backend.available]
+
+
+def create_backend(model_path: str, config: Optional[Dict] = None) -> InferenceBackend:
+    """
+    Backend for `model_path`: `detectionConfig.backend` if set, otherwise the
+    backend registered for the model's file extension; TFLite with `workers`
+    above 1 runs on a worker process pool. Raises BackendUnavailable when that
+    engine is not installed.
+    """
+    config = config or {}
+    name = config.get('backend')
+    if name is None:
+        suffix = Path(model_path).suffix.lower()
+        matches = [n for n, backend in INFERENCE_BACKENDS.items() if suffix in backend.extensions]
+        if not matches:
+            known = ', '.join(ext for backend in INFERENCE_BACKENDS.values() for ext in backend.extensions)
+            raise BackendUnavailable(f"No inference backend for '{suffix}' models (supported: {known})")
+        name = matches[0]
+    elif name not in INFERENCE_BACKENDS:
+        raise BackendUnavailable(f"Unknown inference backend '{name}'. "
+                                 f"Expected one of: {', '.join(INFERENCE_BACKENDS)}")
+
+    backend = INFERENCE_BACKENDS[name]
+    if backend is TFLiteBackend and int(config.get('workers', 1)) > 1:
+        backend = TFLiteWorkerPool
+    if not backend.available:
+        raise BackendUnavailable(f"The {name} backend is not installed. {backend.install_hint}. "
+                                 f"Available backends: {', '.join(available_backends()) or 'none'}")
+    return backend(model_path, config)
@@ -67,6 +67,19 @@ else
     echo "⚠ Warning: plugins/traffic_monitor not found"
 fi
 
+# Copy shared agent modules (imported by camera_agent.py and the Hailo plugin)
+echo "Copying agent modules..."
+AGENT_MODULES=(hailo_session.py postprocess.py frame_buffers.py frame_sources.py motion_gate.py rate_scheduler.py preprocess.py camera_streams.py inference_backends.py tracker.py aggregation.py count_buffer.py)
+for module in "${AGENT_MODULES[@]}"; do
+    if [[ -f "$SCRIPT_DIR/$module" ]]; then
+        cp "$SCRIPT_DIR/$module" "$APP_DIR/"
+        chown "$SERVICE_USER:$SERVICE_USER" "$APP_DIR/$module"
+        echo "✓ $module copied"
+    else
+        echo "⚠ Warning: $module not found in $SCRIPT_DIR"
+    fi
+done
+
 # Install Python dependencies (if requirements.txt exists)
 if [[ -f "$SCRIPT_DIR/requirements.txt" ]]; then
     echo "Installing Python dependencies..."
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Motion Gate
+Cheap change detection in front of inference. Each frame is downscaled to
+grayscale and compared (frame differencing or MOG2 background subtraction)
+inside the configured detection zones only; frames with no change skip
+inference. A keyframe is forced periodically so slow changes and stationary
+objects are still re-detected.
+"""
+
+import logging
+import time
+from typing import Dict, List, Optional
+
+import cv2  # type: ignore
+import numpy as np  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+
+class MotionGate:
+    """Decides per frame whether inference needs to run"""
+
+    def __init__(self, config: Dict, zones: Optional[List[Dict]] = None):
+        self.enabled = bool(config.get('enabled', False))
+        self.method = config.get('method', 'diff')  # 'diff' or 'mog2'
+        self.width = int(config.get('width', 160))
+        self.pixel_threshold = int(config.get('pixelThreshold', 25))
+        self.min_changed_ratio = float(config.get('minChangedRatio', 0.002))
+        self.keyframe_interval = float(config.get('keyframeInterval', 2.0))
+        self.zones = [z for z in (zones or []) if z.get('polygon')]
+
+        if self.method not in ('diff', 'mog2'):
+            raise ValueError(f"Unknown motion gate method '{self.method}'. Expected 'diff' or 'mog2'")
+
+        self._subtractor = None
+        if self.method == 'mog2':
+            self._subtractor = cv2.createBackgroundSubtractorMOG2(
+                history=300, varThreshold=16, detectShadows=False
+            )
+
+        self._frame_size = None
+        self._small_size = None
+        self._mask = None
+        self._mask_area = 0
+        self._reference = None
+        self._last_inference = 0.0
+
+        # Stats
+        self.frames_checked = 0
+        self.frames_skipped = 0
+        self.keyframes = 0
+        self.gate_time_ms = 0.0        # running average per checked frame
+        self.inference_time_ms = 0.0   # running average per inferred frame
+        self.cpu_saved_ms = 0.0
+        self.last_changed_ratio = 0.0
+
+    def _build_mask(self, frame_size):
+        """Rasterize the detection zones at the downscaled resolution (once per frame size)"""
+        height, width = frame_size
+        scale = self.width / float(width)
+        self._frame_size = frame_size
+        self._small_size = (self.width, max(1, int(round(height * scale))))
+
+        small_w, small_h = self._small_size
+        if not self.zones:
+            self._mask = None
+            self._mask_area = small_w * small_h
+        else:
+            mask = np.zeros((small_h, small_w), dtype=np.uint8)
+            for zone in self.zones:
+                polygon = np.round(np.asarray(zone['polygon'], dtype=np.float32) * scale).astype(np.int32)
+                cv2.fillPoly(mask, [polygon], 255)
+            self._mask = mask
+            self._mask_area = max(1, cv2.countNonZero(mask))
+        self._reference = None
+
+    def should_infer(self, frame: np.ndarray) -> bool:
+        """True when the zones changed or a keyframe is due"""
+        start = time.perf_counter()
+        if frame.shape[:2] != self._frame_size:
+            self._build_mask(frame.shape[:2])
+
+        small = cv2.resize(frame, self._small_size, interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        gray = cv2.GaussianBlur(gray, (5, 5), 0)
+
+        if self._subtractor is not None:
+            changed = self._subtractor.apply(gray)
+        elif self._reference is None:
+            changed = None
+        else:
+            # Compare against the last inferred frame so slow motion accumulates
+            diff = cv2.absdiff(gray, self._reference)
+            _, changed = cv2.threshold(diff, self.pixel_threshold, 255, cv2.THRESH_BINARY)
+
+        if changed is None:
+            ratio = 1.0
+        else:
+            if self._mask is not None:
+                changed = cv2.bitwise_and(changed, self._mask)
+            ratio = cv2.countNonZero(changed) / self._mask_area
+        self.last_changed_ratio = ratio
+
+        now = time.monotonic()
+        keyframe = now - self._last_inference >= self.keyframe_interval
+        run = ratio >= self.min_changed_ratio or keyframe
+
+        gate_ms = (time.perf_counter() - start) * 1000
+        self.frames_checked += 1
+        self.gate_time_ms += (gate_ms - self.gate_time_ms) / self.frames_checked
+
+        if run:
+            if keyframe and ratio < self.min_changed_ratio:
+                self.keyframes += 1
+            self._last_inference = now
+            self._reference = gray
+        else:
+            self.frames_skipped += 1
+            self.cpu_saved_ms += max(0.0, self.inference_time_ms - gate_ms)
+        return run
+
+    def record_inference(self, inference_time_ms: float):
+        """Feed measured inference time so the CPU-saved estimate tracks the real model"""
+        if self.inference_time_ms == 0.0:
+            self.inference_time_ms = inference_time_ms
+        else:
+            self.inference_time_ms += 0.1 * (inference_time_ms - self.inference_time_ms)
+
+    def get_stats(self) -> Dict:
+        return {
+            'enabled': self.enabled,
+            'method': self.method,
+            'frames_checked': self.frames_checked,
+            'frames_skipped': self.frames_skipped,
+            'skip_ratio': round(self.frames_skipped / self.frames_checked, 3) if self.frames_checked else 0.0,
+            'keyframes': self.keyframes,
+            'gate_time_ms': round(self.gate_time_ms, 3),
+            'cpu_saved_seconds': round(self.cpu_saved_ms / 1000, 1),
+            'last_changed_ratio': round(self.last_changed_ratio, 4),
+        }
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Detection Post-processing
+Vectorized NumPy decoding of raw YOLO output tensors. Masks, box conversion
+and clamping run on whole arrays; Python dicts are built only for the
+detections that survive.
+
+Also provides the class-aware non-maximum suppression stage shared by all
+detector backends, and OUTPUT_DECODERS: one decoder per inference backend
+output schema (see inference_backends.py).
+"""
+
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np  # type: ignore
+
+
+def class_filter_mask(num_classes: int, class_names: Dict[int, str],
+                      target_classes: Iterable[str]) -> np.ndarray:
+    """Boolean lookup table: True for class ids that map to a target class name"""
+    targets = set(target_classes)
+    mask = np.zeros(num_classes, dtype=bool)
+    for class_id, name in class_names.items():
+        if 0 <= class_id < num_classes and name in targets:
+            mask[class_id] = True
+    return mask
+
+
+def decode_yolo_objectness(output: np.ndarray, confidence_threshold: float,
+                           class_mask: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Decode YOLO rows of [x_center, y_center, w, h, objectness, class_0 .. class_C].
+
+    Confidence is objectness times the best class score. Rows below the
+    threshold, or whose best class is not set in `class_mask`, are dropped.
+
+    Returns:
+        boxes: (K, 4) float32 [x1, y1, x2, y2] in model-input pixels
+        confidences: (K,) float32
+        class_ids: (K,) int
+    """
+    output = np.asarray(output)
+    class_scores = output[:, 5:]
+    class_ids = class_scores.argmax(axis=1)
+    confidences = output[:, 4] * np.take_along_axis(class_scores, class_ids[:, None], axis=1)[:, 0]
+
+    keep = confidences >= confidence_threshold
+    if class_mask is not None:
+        keep &= class_mask[class_ids]
+
+    rows = output[keep]
+    half_w = rows[:, 2] / 2
+    half_h = rows[:, 3] / 2
+    boxes = np.stack([rows[:, 0] - half_w, rows[:, 1] - half_h,
+                      rows[:, 0] + half_w, rows[:, 1] + half_h], axis=1)
+    return boxes, confidences[keep], class_ids[keep]
+
+
+def scale_boxes(boxes: np.ndarray, src_size: Tuple[int, int],
+                dst_size: Tuple[int, int]) -> np.ndarray:
+    """Scale (K, 4) boxes from src (width, height) to dst pixels, truncate and clamp to dst"""
+    src_width, src_height = src_size
+    dst_width, dst_height = dst_size
+
+    scaled = np.empty(boxes.shape, dtype=np.int64)
+    scaled[:, 0::2] = boxes[:, 0::2] * dst_width / src_width
+    scaled[:, 1::2] = boxes[:, 1::2] * dst_height / src_height
+    np.clip(scaled[:, 0::2], 0, dst_width, out=scaled[:, 0::2])
+    np.clip(scaled[:, 1::2], 0, dst_height, out=scaled[:, 1::2])
+    return scaled
+
+
+def build_detections(boxes: np.ndarray, confidences: np.ndarray, class_ids: np.ndarray,
+                     class_names) -> List[Dict]:
+    """Build detection dicts from pixel boxes; `class_names` maps class id -> name"""
+    centers = (boxes[:, 0:2] + boxes[:, 2:4]) // 2
+    return [
+        {
+            'class': class_names[class_id],
+            'confidence': confidence,
+            'bbox': bbox,
+            'center': center
+        }
+        for bbox, confidence, class_id, center in zip(
+            boxes.tolist(), confidences.tolist(), class_ids.tolist(), centers.tolist()
+        )
+    ]
+
+
+# Above this many boxes per class, NMS compares row by row instead of
+# building the full pairwise IoU matrix (n * n floats)
+MATRIX_NMS_LIMIT = 512
+
+
+def _pairwise_overlaps(boxes: np.ndarray, iou_threshold: float) -> np.ndarray:
+    """(n, n) bool matrix: IoU(i, j) > iou_threshold, compared without dividing."""
+    x1, y1, x2, y2 = np.ascontiguousarray(boxes.T, dtype=np.float32)
+    areas = np.maximum(x2 - x1, 0) * np.maximum(y2 - y1, 0)
+
+    inter = np.minimum(x2[:, None], x2)
+    inter -= np.maximum(x1[:, None], x1)
+    np.maximum(inter, 0, out=inter)
+    inter_h = np.minimum(y2[:, None], y2)
+    inter_h -= np.maximum(y1[:, None], y1)
+    np.maximum(inter_h, 0, out=inter_h)
+    inter *= inter_h
+
+    # union = area_i + area_j - inter; IoU > t  <=>  inter > t * union
+    union = np.add(areas[:, None], areas, out=inter_h)
+    union -= inter
+    union *= iou_threshold
+    return inter > union
+
+
+def _greedy_nms(boxes: np.ndarray, iou_threshold: float, max_detections: int) -> List[int]:
+    """Greedy NMS over boxes already sorted by descending score."""
+    keep: List[int] = []
+    if len(boxes) <= MATRIX_NMS_LIMIT:
+        overlaps = _pairwise_overlaps(boxes, iou_threshold)
+        suppressed = np.zeros(len(boxes), dtype=bool)
+        for i in range(len(boxes)):
+            if suppressed[i]:
+                continue
+            keep.append(i)
+            if len(keep) >= max_detections:
+                break
+            suppressed |= overlaps[i]
+        return keep
+
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = np.maximum(x2 - x1, 0) * np.maximum(y2 - y1, 0)
+    order = np.arange(len(boxes))
+    while order.size and len(keep) < max_detections:
+        best = order[0]
+        keep.append(int(best))
+        rest = order[1:]
+
+        inter_w = np.maximum(np.minimum(x2[best], x2[rest]) - np.maximum(x1[best], x1[rest]), 0)
+        inter_h = np.maximum(np.minimum(y2[best], y2[rest]) - np.maximum(y1[best], y1[rest]), 0)
+        inter = inter_w * inter_h
+        union = areas[best] + areas[rest] - inter
+        iou = np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+        order = rest[iou <= iou_threshold]
+    return keep
+
+
+def non_max_suppression(boxes: np.ndarray, scores: np.ndarray, class_ids: np.ndarray = None,
+                        iou_threshold: float = 0.45, max_detections: int = 100) -> np.ndarray:
+    """
+    Greedy class-aware NMS over (K, 4) [x1, y1, x2, y2] boxes.
+
+    Boxes only suppress boxes of the same class, so each class is suppressed
+    independently; small groups use one pairwise overlap matrix, large
+    groups compare the best remaining box against the rest row by row.
+
+    Returns:
+        Indices of kept boxes, highest score first, at most `max_detections`.
+    """
+    if len(boxes) == 0 or max_detections <= 0:
+        return np.empty(0, dtype=np.int64)
+
+    boxes = np.asarray(boxes, dtype=np.float64)
+    scores = np.asarray(scores)
+    order = np.argsort(-scores, kind='stable')
+
+    if class_ids is None:
+        groups = [order]
+    else:
+        sorted_classes = np.asarray(class_ids)[order]
+        groups = [order[sorted_classes == c] for c in np.unique(sorted_classes)]
+
+    kept = [group[_greedy_nms(boxes[group], iou_threshold, max_detections)] for group in groups]
+    keep = np.concatenate(kept).astype(np.int64)
+
+    # Merge classes back into global score order (ties by index) and apply the cap
+    keep = keep[np.lexsort((keep, -scores[keep]))]
+    return keep[:max_detections]
+
+
+# Output decoders: one per backend output schema. Each takes one frame's
+# outputs (batch dimension removed) and returns (boxes, confidences,
+# class_ids) with boxes as [x1, y1, x2, y2] normalized to the model input;
+# class ids index detectionConfig.objectClasses.
+
+_EMPTY = (np.empty((0, 4)), np.empty(0), np.empty(0, dtype=np.int64))
+
+
+def decode_detection_rows(outputs: List[np.ndarray], confidence_threshold: float,
+                          num_classes: int, input_size: Tuple[int, int]):
+    """Rows of [x_center, y_center, width, height, confidence, class_id, ...], normalized (Hailo)"""
+    rows = np.asarray(outputs[0], dtype=np.float64)
+    if rows.ndim != 2 or rows.shape[1] < 6:
+        return _EMPTY
+
+    class_ids = rows[:, 5].astype(np.int64)
+    keep = (rows[:, 4] > confidence_threshold) & (class_ids >= 0) & (class_ids < num_classes)
+    rows, class_ids = rows[keep], class_ids[keep]
+
+    half_sizes = rows[:, 2:4] / 2
+    boxes = np.hstack([rows[:, 0:2] - half_sizes, rows[:, 0:2] + half_sizes])
+    return boxes, rows[:, 4], class_ids
+
+
+def decode_boxes_classes_scores(outputs: List[np.ndarray], confidence_threshold: float,
+                                num_classes: int, input_size: Tuple[int, int]):
+    """Separate [ymin, xmin, ymax, xmax] boxes, class ids and scores, normalized (TFLite SSD)"""
+    boxes, classes, scores = outputs[0], outputs[1], outputs[2]
+    class_ids = classes.astype(np.int64)
+    keep = (scores > confidence_threshold) & (class_ids >= 0) & (class_ids < num_classes)
+    return boxes[keep][:, [1, 0, 3, 2]].astype(np.float64), scores[keep].astype(np.float64), class_ids[keep]
+
+
+def decode_yolov8(outputs: List[np.ndarray], confidence_threshold: float,
+                  num_classes: int, input_size: Tuple[int, int]):
+    """Raw YOLOv8 head [4 + C, N]: x_center, y_center, width, height in input pixels, then class scores"""
+    output = np.asarray(outputs[0])
+    if output.shape[0] > output.shape[1]:
+        output = output.T  # exported as [N, 4 + C]
+    class_scores = output[4:4 + num_classes]
+    class_ids = class_scores.argmax(axis=0)
+    confidences = class_scores[class_ids, np.arange(output.shape[1])]
+
+    keep = confidences > confidence_threshold
+    xywh = output[:4, keep].T.astype(np.float64)
+    xywh /= np.array([input_size[0], input_size[1]] * 2)
+    half_sizes = xywh[:, 2:4] / 2
+    boxes = np.hstack([xywh[:, 0:2] - half_sizes, xywh[:, 0:2] + half_sizes])
+    return boxes, confidences[keep].astype(np.float64), class_ids[keep].astype(np.int64)
+
+
+OUTPUT_DECODERS = {
+    'detections': decode_detection_rows,
+    'boxes_classes_scores': decode_boxes_classes_scores,
+    'yolov8': decode_yolov8,
+}
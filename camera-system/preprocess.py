@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Zone-cropped and Tiled Preprocessing
+When the detection zones cover only part of the frame, the model is fed the
+bounding rectangle of their union (plus a margin), letterboxed to the model
+input, instead of the whole frame squashed to the input size. Small objects
+inside the zones keep more pixels at the same inference cost.
+
+For wide scenes the region can instead be split into overlapping tiles that
+are inferred as one batch; boxes are mapped back per tile and merged across
+seams by NMS.
+
+Crop rectangles, tile layouts and the frame -> input affine transforms are
+computed once per zone configuration and frame/input size; per frame there
+is one warp per tile into a preallocated input batch and a vectorized box
+mapping back to full-frame pixels.
+"""
+
+import logging
+import math
+from typing import Dict, List, Optional, Tuple
+
+import cv2  # type: ignore
+import numpy as np  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+LETTERBOX_FILL = (114, 114, 114)
+
+
+class CropGeometry:
+    """Frame -> model-input mapping for one crop rectangle, frame size and input size"""
+
+    def __init__(self, frame_size: Tuple[int, int], input_size: Tuple[int, int],
+                 crop: Optional[Tuple[int, int, int, int]] = None):
+        """
+        Args:
+            frame_size: (width, height) of captured frames
+            input_size: (width, height) of the model input
+            crop: (x1, y1, x2, y2) region to feed the model; None = whole frame,
+                  stretched to the input exactly as without cropping
+        """
+        frame_width, frame_height = frame_size
+        input_width, input_height = input_size
+        self.frame_size = (frame_width, frame_height)
+        self.input_size = (input_width, input_height)
+        self.cropped = crop is not None
+        self.crop = tuple(int(v) for v in crop) if crop is not None else (0, 0, frame_width, frame_height)
+
+        x1, y1, x2, y2 = self.crop
+        crop_width, crop_height = x2 - x1, y2 - y1
+        if self.cropped:
+            # Letterbox: keep the aspect ratio and centre the crop in the input
+            scale = min(input_width / crop_width, input_height / crop_height)
+            self.scale = (scale, scale)
+            self.pad = ((input_width - crop_width * scale) / 2, (input_height - crop_height * scale) / 2)
+        else:
+            self.scale = (input_width / crop_width, input_height / crop_height)
+            self.pad = (0.0, 0.0)
+
+        (scale_x, scale_y), (pad_x, pad_y) = self.scale, self.pad
+        self.matrix = np.array([[scale_x, 0.0, pad_x - x1 * scale_x],
+                                [0.0, scale_y, pad_y - y1 * scale_y]], dtype=np.float64)
+
+        # Normalized model-input coords -> frame pixels: frame = input * gain + offset
+        self._gain = np.array([input_width / scale_x, input_height / scale_y] * 2)
+        self._offset = np.array([x1 - pad_x / scale_x, y1 - pad_y / scale_y] * 2)
+
+    def warp(self, frame: np.ndarray, dst: np.ndarray) -> np.ndarray:
+        """Write the model view of `frame` into the preallocated (H, W, C) `dst`"""
+        if not self.cropped:
+            return cv2.resize(frame, self.input_size, dst=dst)
+        return cv2.warpAffine(frame, self.matrix, self.input_size, dst=dst,
+                              flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_CONSTANT,
+                              borderValue=LETTERBOX_FILL)
+
+    def boxes_to_frame(self, boxes: np.ndarray) -> np.ndarray:
+        """
+        Map (K, 4) [x1, y1, x2, y2] boxes normalized to the model input back to
+        full-frame pixels; truncated and clamped to the crop rectangle.
+        """
+        mapped = (np.asarray(boxes, dtype=np.float64).reshape(-1, 4) * self._gain + self._offset).astype(np.int64)
+        x1, y1, x2, y2 = self.crop
+        np.clip(mapped[:, 0::2], x1, x2, out=mapped[:, 0::2])
+        np.clip(mapped[:, 1::2], y1, y2, out=mapped[:, 1::2])
+        return mapped
+
+    def describe(self) -> Dict:
+        return {
+            'cropped': self.cropped,
+            'crop': list(self.crop),
+            'frame_size': list(self.frame_size),
+            'input_size': list(self.input_size),
+            'scale': [round(s, 4) for s in self.scale],
+        }
+
+
+def zone_union_rect(zones: List[Dict], frame_size: Tuple[int, int],
+                    margin: float = 0.0) -> Optional[Tuple[int, int, int, int]]:
+    """Bounding rectangle of all zone polygons grown by `margin` (fraction), clamped to the frame"""
+    points = [point for zone in zones for point in zone.get('polygon') or []]
+    if not points:
+        return None
+
+    frame_width, frame_height = frame_size
+    points = np.asarray(points, dtype=np.float64)
+    (x1, y1), (x2, y2) = points.min(axis=0), points.max(axis=0)
+    grow_x, grow_y = (x2 - x1) * margin, (y2 - y1) * margin
+    x1, x2 = max(0, int(np.floor(x1 - grow_x))), min(frame_width, int(np.ceil(x2 + grow_x)))
+    y1, y2 = max(0, int(np.floor(y1 - grow_y))), min(frame_height, int(np.ceil(y2 + grow_y)))
+    if x2 <= x1 or y2 <= y1:
+        return None
+    return x1, y1, x2, y2
+
+
+class ZoneCrop:
+    """
+    Chooses the model view of the frame from `detectionConfig.zoneCrop`.
+
+    Cropping is on by default whenever zones are configured; without zones,
+    with `enabled: false`, or when the zones span the whole frame, the frame is
+    resized to the input as before. The crop also covers the counting lines,
+    so a line outside the zones still sees every object crossing it.
+    """
+
+    def __init__(self, config: Dict, zones: Optional[List[Dict]] = None,
+                 lines: Optional[List[Dict]] = None):
+        self.enabled = bool(config.get('enabled', True))
+        self.margin = float(config.get('margin', 0.05))
+        self._geometries: Dict[Tuple, CropGeometry] = {}
+        self.revision = 0
+        self.configure(zones or [], lines)
+
+    def configure(self, zones: List[Dict], lines: Optional[List[Dict]] = None):
+        """Set the zones and counting lines; geometry is recomputed lazily for the next frame"""
+        self.zones = [z for z in zones if z.get('polygon')]
+        self.lines = [line for line in lines or [] if line.get('line')]
+        self._geometries = {}
+        self.revision += 1
+
+    def region(self, frame_size: Tuple[int, int]) -> Optional[Tuple[int, int, int, int]]:
+        """Crop rectangle for this frame size, or None for the whole frame"""
+        crop = None
+        if self.enabled and self.zones:
+            shapes = self.zones + [{'polygon': line['line']} for line in self.lines]
+            crop = zone_union_rect(shapes, frame_size, self.margin)
+        if crop == (0, 0) + tuple(frame_size):
+            return None
+        return crop
+
+    def geometry(self, frame_size: Tuple[int, int], input_size: Tuple[int, int]) -> CropGeometry:
+        """Cached geometry for (width, height) frame and input sizes"""
+        key = (tuple(frame_size), tuple(input_size))
+        geometry = self._geometries.get(key)
+        if geometry is None:
+            geometry = CropGeometry(frame_size, input_size, self.region(frame_size))
+            self._geometries[key] = geometry
+            if geometry.cropped:
+                logger.info(f"✓ Zone crop {geometry.crop} of {frame_size[0]}x{frame_size[1]} "
+                            f"-> {input_size[0]}x{input_size[1]} (scale {geometry.scale[0]:.3f})")
+        return geometry
+
+    def get_stats(self) -> Dict:
+        return {
+            'enabled': self.enabled,
+            'margin': self.margin,
+            'geometries': [g.describe() for g in self._geometries.values()],
+        }
+
+
+def tile_starts(length: int, tile: int, overlap: int) -> List[int]:
+    """Evenly spaced tile offsets covering [0, length) with at least `overlap` pixels shared"""
+    if length <= tile:
+        return [0]
+    count = math.ceil((length - overlap) / (tile - overlap))
+    return [int(round(v)) for v in np.linspace(0, length - tile, count)]
+
+
+class TileLayout:
+    """The model views of one frame: one CropGeometry per batch entry"""
+
+    def __init__(self, tiles: List[CropGeometry]):
+        self.tiles = tiles
+
+    def __len__(self) -> int:
+        return len(self.tiles)
+
+    @classmethod
+    def grid(cls, frame_size: Tuple[int, int], input_size: Tuple[int, int],
+             region: Optional[Tuple[int, int, int, int]], tile_width: int,
+             overlap: float) -> 'TileLayout':
+        """Overlapping tiles of the input's aspect ratio covering `region` (default: whole frame)"""
+        x1, y1, x2, y2 = region if region is not None else (0, 0) + tuple(frame_size)
+        tile_height = int(round(tile_width * input_size[1] / input_size[0]))
+        tile_width, tile_height = min(tile_width, x2 - x1), min(tile_height, y2 - y1)
+
+        tiles = [
+            CropGeometry(frame_size, input_size, (x1 + tx, y1 + ty, x1 + tx + tile_width, y1 + ty + tile_height))
+            for ty in tile_starts(y2 - y1, tile_height, int(tile_height * overlap))
+            for tx in tile_starts(x2 - x1, tile_width, int(tile_width * overlap))
+        ]
+        return cls(tiles)
+
+    def warp(self, frame: np.ndarray, batch: np.ndarray) -> np.ndarray:
+        """Write every tile of `frame` into the preallocated (T, H, W, C) `batch`"""
+        for tile, dst in zip(self.tiles, batch):
+            tile.warp(frame, dst)
+        return batch
+
+    def describe(self) -> Dict:
+        return {
+            'tiles': len(self.tiles),
+            'crops': [list(tile.crop) for tile in self.tiles],
+        }
+
+
+class FrameTiler:
+    """
+    Builds the per-resolution TileLayout from `detectionConfig.tiling`.
+
+    Disabled (the default), the layout is the single zone-crop view; enabled,
+    the zone-crop region (or whole frame) is covered by `tileSize`-wide tiles
+    overlapping by `overlap`. Tracks batch latency so per-tile cost can be
+    weighed against accuracy per site.
+    """
+
+    def __init__(self, config: Dict, zone_crop: ZoneCrop):
+        self.enabled = bool(config.get('enabled', False))
+        self.tile_size = config.get('tileSize')  # frame pixels; default: model input width
+        self.overlap = float(config.get('overlap', 0.2))
+        self.zone_crop = zone_crop
+        self._layouts: Dict[Tuple, TileLayout] = {}
+
+        if not 0.0 <= self.overlap < 1.0:
+            raise ValueError(f"Tiling overlap must be in [0, 1), got {self.overlap}")
+
+        # Stats
+        self.batches = 0
+        self.batch_latency_ms = 0.0     # running average per inference batch
+        self.per_tile_latency_ms = 0.0  # batch latency / tiles in the batch
+        self.tiles_per_frame = 0
+
+    def layout(self, frame_size: Tuple[int, int], input_size: Tuple[int, int]) -> TileLayout:
+        """Cached layout for (width, height) frame and input sizes"""
+        key = (tuple(frame_size), tuple(input_size), self.zone_crop.revision)
+        layout = self._layouts.get(key)
+        if layout is None:
+            if self.enabled:
+                tile_width = int(self.tile_size or input_size[0])
+                layout = TileLayout.grid(frame_size, input_size, self.zone_crop.region(frame_size),
+                                         tile_width, self.overlap)
+                logger.info(f"✓ Tiled inference: {len(layout)} tiles of {tile_width}px "
+                            f"({self.overlap:.0%} overlap) for {frame_size[0]}x{frame_size[1]}")
+            else:
+                layout = TileLayout([self.zone_crop.geometry(frame_size, input_size)])
+            self._layouts[key] = layout
+        return layout
+
+    def record(self, latency_ms: float, tiles: int, batch_tiles: Optional[int] = None):
+        """
+        Feed the inference latency of the batch carrying one frame's `tiles`;
+        `batch_tiles` counts every tile in that batch (frames of other streams too).
+        """
+        per_tile_ms = latency_ms / max(1, batch_tiles or tiles)
+        self.batches += 1
+        self.tiles_per_frame = tiles
+        if self.batches == 1:
+            self.batch_latency_ms, self.per_tile_latency_ms = latency_ms, per_tile_ms
+        else:
+            self.batch_latency_ms += 0.1 * (latency_ms - self.batch_latency_ms)
+            self.per_tile_latency_ms += 0.1 * (per_tile_ms - self.per_tile_latency_ms)
+
+    def get_stats(self) -> Dict:
+        return {
+            'enabled': self.enabled,
+            'tile_size': self.tile_size,
+            'overlap': self.overlap,
+            'tiles_per_frame': self.tiles_per_frame,
+            'batch_latency_ms': round(self.batch_latency_ms, 2),
+            'per_tile_latency_ms': round(self.per_tile_latency_ms, 2),
+            'layouts': [layout.describe() for layout in self._layouts.values()],
+        }
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Adaptive Capture Rate Scheduler
+Paces capture against monotonic deadlines (no drift from read time) and
+adapts the rate to load:
+
+- idle:        no active (confirmed tracked) objects for `idleAfter` seconds -> `idleFps`
+- activity:    an object is confirmed -> straight back to the target rate
+- latency:     inference latency above `maxLatencyMs` -> multiplicative back-off
+- temperature: SoC above `tempSoftLimit` -> scaled down towards `minFps`
+               at `tempHardLimit`
+
+Every rate change is logged with its reason and reported in status.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+THERMAL_ZONE_PATH = '/sys/class/thermal/thermal_zone0/temp'
+
+
+def read_soc_temperature(path: str = THERMAL_ZONE_PATH) -> Optional[float]:
+    """SoC temperature in °C, or None where the thermal zone is not available"""
+    try:
+        with open(path, 'r') as f:
+            return int(f.read().strip()) / 1000.0
+    except (OSError, ValueError):
+        return None
+
+
+class RateScheduler:
+    """Monotonic-deadline pacing with load-driven rate changes"""
+
+    def __init__(self, config: Dict, target_fps: float):
+        self.target_fps = float(target_fps)
+        self.adaptive = bool(config.get('adaptive', True))
+        self.idle_fps = float(config.get('idleFps', 5))
+        self.idle_after = float(config.get('idleAfter', 3.0))
+        self.min_fps = float(config.get('minFps', 2))
+        self.max_latency_ms = float(config.get('maxLatencyMs', 250))
+        self.temp_soft_limit = float(config.get('tempSoftLimit', 75.0))
+        self.temp_hard_limit = float(config.get('tempHardLimit', 82.0))
+        self.evaluate_interval = float(config.get('evaluateInterval', 1.0))
+
+        self.current_fps = self.target_fps
+        self.reason = 'target'
+        self.changes = deque(maxlen=20)
+        self._lock = threading.Lock()
+
+        self._next_deadline = time.monotonic()
+        self._next_evaluation = 0.0
+        self._last_activity = time.monotonic()
+        self._latency_ms = 0.0
+        self._latency_cap = self.target_fps
+        self.temperature: Optional[float] = None
+
+    def wait(self):
+        """Sleep until the next frame deadline"""
+        now = time.monotonic()
+        period = 1.0 / self.current_fps
+        self._next_deadline += period
+        if self._next_deadline < now - period:
+            # Fell more than a frame behind (slow read): resync instead of bursting
+            self._next_deadline = now
+        delay = self._next_deadline - now
+        if delay > 0:
+            time.sleep(delay)
+
+    def observe(self, active_objects: int, inference_latency_ms: float):
+        """Feed per-frame load; objects appearing ramps back up immediately"""
+        now = time.monotonic()
+        self._latency_ms += 0.2 * (inference_latency_ms - self._latency_ms)
+        if active_objects > 0:
+            self._last_activity = now
+            if self.reason == 'idle':
+                self._evaluate(now)
+
+    def update(self):
+        """Re-evaluate the rate (called from the capture loop; throttled internally)"""
+        now = time.monotonic()
+        if now >= self._next_evaluation:
+            self._next_evaluation = now + self.evaluate_interval
+            self.temperature = read_soc_temperature()
+            self._evaluate(now)
+
+    def _evaluate(self, now: float):
+        if not self.adaptive:
+            return
+        with self._lock:
+            self._evaluate_locked(now)
+
+    def _evaluate_locked(self, now: float):
+        fps, reason = self.target_fps, 'target'
+        if now - self._last_activity >= self.idle_after:
+            fps, reason = min(fps, self.idle_fps), 'idle'
+
+        # AIMD on inference latency: back off 20% while over budget, recover 1 fps/step
+        if self._latency_ms > self.max_latency_ms:
+            self._latency_cap = max(self.min_fps, min(self._latency_cap, self.current_fps) * 0.8)
+        else:
+            self._latency_cap = min(self.target_fps, self._latency_cap + 1.0)
+        if self._latency_cap < fps:
+            fps, reason = self._latency_cap, 'latency'
+
+        if self.temperature is not None and self.temperature >= self.temp_soft_limit:
+            span = max(0.1, self.temp_hard_limit - self.temp_soft_limit)
+            heat = min(1.0, (self.temperature - self.temp_soft_limit) / span)
+            thermal_fps = self.target_fps - heat * (self.target_fps - self.min_fps)
+            if thermal_fps < fps:
+                fps, reason = thermal_fps, 'temperature'
+
+        self._set_rate(max(self.min_fps, round(fps, 1)), reason)
+
+    def _set_rate(self, fps: float, reason: str):
+        if fps == self.current_fps and reason == self.reason:
+            return
+        logger.info(f"Capture rate {self.current_fps:g} -> {fps:g} fps ({reason})")
+        self.current_fps = fps
+        self.reason = reason
+        self.changes.append({
+            'timestamp': datetime.utcnow().isoformat(),
+            'fps': fps,
+            'reason': reason,
+        })
+
+    def get_stats(self) -> Dict:
+        return {
+            'adaptive': self.adaptive,
+            'target_fps': self.target_fps,
+            'current_fps': self.current_fps,
+            'reason': self.reason,
+            'inference_latency_ms': round(self._latency_ms, 1),
+            'temperature_c': self.temperature,
+            'recent_changes': list(self.changes),
+        }
@@ -0,0 +1,107 @@
+"""
+Wall-clock bucketing and the closing timer in aggregation.
+
+Run from camera-system/:
+    python3 -m pytest tests
+"""
+
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from aggregation import AggregationEngine, CountAccumulator, merge_counts, period_start  # noqa: E402
+from tracker import TrackEvent  # noqa: E402
+
+EPOCH = datetime(1970, 1, 1)
+# A bucket boundary for 300 s buckets: 2026-01-01 10:05:00 UTC
+BOUNDARY = datetime(2026, 1, 1, 10, 5)
+BOUNDARY_SECONDS = (BOUNDARY - EPOCH).total_seconds()
+
+
+def crossing(direction='in', object_class='car'):
+    return TrackEvent('crossed', 'gate', direction, 0, object_class)
+
+
+def engine_with_accumulator(lateness=5.0):
+    accumulator = CountAccumulator(['gate'], ['car'], 300)
+    engine = AggregationEngine(300, allowed_lateness=lateness)
+    closed = []
+    engine.register(accumulator, closed.append)
+    return engine, accumulator, closed
+
+
+def test_events_land_in_the_bucket_of_their_capture_time():
+    engine, accumulator, closed = engine_with_accumulator()
+    accumulator.add([crossing()], BOUNDARY - timedelta(microseconds=1))
+    accumulator.add([crossing('out')], BOUNDARY)
+    engine.close_buckets(BOUNDARY_SECONDS + 300 + 5)
+    assert [(bucket.start, bucket.to_wire()) for bucket in closed] == [
+        (BOUNDARY - timedelta(seconds=300), {'gate_car': {'in': 1, 'out': 0}}),
+        (BOUNDARY, {'gate_car': {'in': 0, 'out': 1}}),
+    ]
+    assert closed[0].end == BOUNDARY
+
+
+def test_bucket_closes_at_the_boundary_plus_allowed_lateness():
+    engine, accumulator, closed = engine_with_accumulator(lateness=5.0)
+    accumulator.add([crossing()], BOUNDARY - timedelta(seconds=1))
+    assert engine.next_deadline(BOUNDARY_SECONDS - 1) == BOUNDARY_SECONDS + 5
+
+    # Still inside the closing lag: the bucket stays open for late frames
+    engine.close_buckets(BOUNDARY_SECONDS + 4.999)
+    assert closed == []
+    assert engine.next_deadline(BOUNDARY_SECONDS + 4.999) == BOUNDARY_SECONDS + 5
+
+    engine.close_buckets(BOUNDARY_SECONDS + 5)
+    assert [bucket.end for bucket in closed] == [BOUNDARY]
+    assert engine.next_deadline(BOUNDARY_SECONDS + 5) == BOUNDARY_SECONDS + 305
+
+
+def test_events_after_their_bucket_closed_go_to_the_oldest_open_one():
+    engine, accumulator, closed = engine_with_accumulator()
+    accumulator.add([crossing()], BOUNDARY - timedelta(seconds=1))
+    engine.close_buckets(BOUNDARY_SECONDS + 5)
+    accumulator.add([crossing()], BOUNDARY - timedelta(seconds=2))
+    assert accumulator.late_events == 1
+
+    engine.close_buckets(BOUNDARY_SECONDS + 305)
+    assert [(bucket.start, bucket.total) for bucket in closed] == [
+        (BOUNDARY - timedelta(seconds=300), 1), (BOUNDARY, 1)]
+
+
+def test_round_hook_runs_once_per_close_with_buckets():
+    rounds = []
+    accumulators = [CountAccumulator(['gate'], ['car'], 300) for _ in range(2)]
+    engine = AggregationEngine(300, allowed_lateness=5, on_round=lambda: rounds.append(1))
+    closed = []
+    for accumulator in accumulators:
+        accumulator.add([crossing()], BOUNDARY)
+        engine.register(accumulator, closed.append)
+
+    engine.close_buckets(BOUNDARY_SECONDS + 5)  # nothing ended yet
+    engine.close_buckets(BOUNDARY_SECONDS + 305)
+    assert (len(closed), len(rounds)) == (2, 1)
+
+
+def test_flush_hands_out_the_open_bucket():
+    engine, accumulator, closed = engine_with_accumulator()
+    accumulator.add([crossing(), crossing()], BOUNDARY)
+    engine.stop(flush=True)
+    assert [(bucket.start, bucket.total) for bucket in closed] == [(BOUNDARY, 2)]
+
+
+def test_new_classes_grow_the_bucket():
+    accumulator = CountAccumulator(['gate'], ['car'], 300)
+    accumulator.add([crossing()], BOUNDARY)
+    accumulator.add([crossing('out', 'bus')], BOUNDARY)
+    bucket, = accumulator.flush()
+    assert bucket.to_wire() == {'gate_car': {'in': 1, 'out': 0}, 'gate_bus': {'in': 0, 'out': 1}}
+
+
+def test_rollup_periods_and_merging():
+    assert period_start(BOUNDARY, 'hour') == datetime(2026, 1, 1, 10)
+    assert period_start(BOUNDARY, 'day') == datetime(2026, 1, 1)
+    total = merge_counts({'gate_car': {'in': 1, 'out': 0}}, {'gate_car': {'in': 2, 'out': 1}})
+    assert total == {'gate_car': {'in': 3, 'out': 1}}
+    assert merge_counts(total, total, -1) == {}
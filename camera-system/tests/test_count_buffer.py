@@ -0,0 +1,54 @@
+"""
+Regressions for count_buffer.CountBuffer: buckets closed again after a restart
+and marking uploads by id.
+
+Run from camera-system/:
+    python3 -m pytest tests
+"""
+
+import sys
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from count_buffer import CountBuffer  # noqa: E402
+
+START = datetime(2026, 1, 1, 10, 0)
+
+
+def bucket(camera_id, cars, timestamp=START):
+    counts = {'zone1_car': {'in': cars, 'out': 0}}
+    return {'timestamp': timestamp, 'camera_id': camera_id,
+            'counts_json': {'cameraId': camera_id, 'timestamp': timestamp.isoformat(), 'counts': counts}}
+
+
+def test_bucket_closed_again_is_merged_with_its_buffered_part(tmp_path):
+    buffer = CountBuffer(str(tmp_path / 'buffer.db'))
+    first, = buffer.add_buckets([bucket('cam0', 3)])
+    buffer.mark_uploaded([first['id']])
+
+    # Restart: the partial bucket flushed at shutdown closes again
+    merged, = buffer.add_buckets([bucket('cam0', 4)])
+    assert merged['counts_json']['counts'] == {'zone1_car': {'in': 7, 'out': 0}}
+    pending = buffer.pending_uploads()
+    assert [(row.id, row.counts_json) for row in pending] == [(merged['id'], merged['counts_json'])]
+    hour, day = sorted(buffer.pending_rollups(), key=lambda rollup: rollup.period)
+    assert day.counts_json == hour.counts_json == merged['counts_json']['counts']
+    buffer.close()
+
+
+def test_mark_uploaded_marks_only_the_given_rows(tmp_path):
+    buffer = CountBuffer(str(tmp_path / 'buffer.db'))
+    cam0, cam1 = buffer.add_buckets([bucket('cam0', 1), bucket('cam1', 2)])
+    buffer.mark_uploaded([cam0['id']])
+    assert [row.id for row in buffer.pending_uploads()] == [cam1['id']]
+    buffer.close()
+
+
+def test_upload_of_a_merged_away_row_marks_nothing(tmp_path):
+    buffer = CountBuffer(str(tmp_path / 'buffer.db'))
+    stale, = buffer.add_buckets([bucket('cam0', 3)])
+    merged, = buffer.add_buckets([bucket('cam0', 4)])
+    buffer.mark_uploaded([stale['id']])
+    assert [row.id for row in buffer.pending_uploads()] == [merged['id']]
+    buffer.close()
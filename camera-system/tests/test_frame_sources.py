@@ -0,0 +1,73 @@
+"""
+Image-directory frame source: reading order, looping and exhaustion.
+
+Run from camera-system/:
+    python3 -m pytest tests
+"""
+
+import sys
+from pathlib import Path
+
+import cv2  # type: ignore
+import numpy as np  # type: ignore
+import pytest  # type: ignore
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from frame_sources import ImageDirectorySource, create_frame_source  # noqa: E402
+
+
+@pytest.fixture
+def image_directory(tmp_path):
+    """0.png .. 3.png, each filled with 10 * its number; 2.png is not an image"""
+    for index in range(4):
+        cv2.imwrite(str(tmp_path / f'{index}.png'), np.full((8, 8, 3), index * 10, dtype=np.uint8))
+    (tmp_path / '2.png').write_text('not an image')
+    (tmp_path / 'notes.txt').write_text('ignored')
+    return tmp_path
+
+
+def read_values(source, frames):
+    values = []
+    for _ in range(frames):
+        ok, frame = source.read()
+        values.append(int(frame[0, 0, 0]) if ok else None)
+    return values
+
+
+def test_directory_without_loop_is_exhausted(image_directory):
+    source = ImageDirectorySource({'path': str(image_directory), 'loop': False})
+    assert read_values(source, 5) == [0, 10, 30, None, None]
+    assert source.exhausted
+    assert source.connect_count == 1
+
+
+def test_directory_with_loop_starts_over(image_directory):
+    source = create_frame_source({'source': 'images', 'path': str(image_directory)})
+    assert read_values(source, 7) == [0, 10, 30, 0, 10, 30, 0]
+    assert not source.exhausted
+    assert source.connect_count == 1
+
+
+def test_directory_of_unreadable_images_is_exhausted(tmp_path):
+    (tmp_path / 'broken.jpg').write_text('not an image')
+    source = ImageDirectorySource({'path': str(tmp_path), 'loop': False})
+    assert read_values(source, 2) == [None, None]
+    assert source.exhausted
+
+
+def test_frames_are_decoded_into_a_matching_buffer(image_directory):
+    source = ImageDirectorySource({'path': str(image_directory)})
+    buffer = np.zeros((8, 8, 3), dtype=np.uint8)
+    ok, frame = source.read(image=buffer)
+    assert ok and frame is buffer
+
+
+def test_empty_directory_does_not_connect(tmp_path):
+    source = ImageDirectorySource({'path': str(tmp_path)})
+    assert source.read() == (False, None)
+    assert not source.connected
+
+
+def test_unknown_source_type():
+    with pytest.raises(ValueError):
+        create_frame_source({'source': 'carrier-pigeon'})
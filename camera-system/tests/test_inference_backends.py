@@ -0,0 +1,49 @@
+"""
+TFLite SSD output selection (no TFLite runtime needed).
+
+Run from camera-system/:
+    python3 -m pytest tests
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np  # type: ignore
+import pytest  # type: ignore
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from inference_backends import TFLiteBackend  # noqa: E402
+
+
+def detail(name, shape):
+    return {'name': name, 'shape': np.array(shape), 'index': 0}
+
+
+def names(details):
+    return [d['name'] for d in TFLiteBackend._ssd_outputs(details)]
+
+
+def test_batch_of_four_does_not_mistake_the_count_for_boxes():
+    # num_detections is [4] at batch size 4, like the last dimension of the boxes
+    details = [detail('TFLite_Detection_PostProcess:3', [4]),
+               detail('TFLite_Detection_PostProcess:2', [4, 10]),
+               detail('TFLite_Detection_PostProcess', [4, 10, 4]),
+               detail('TFLite_Detection_PostProcess:1', [4, 10])]
+    assert names(details) == ['TFLite_Detection_PostProcess', 'TFLite_Detection_PostProcess:1',
+                              'TFLite_Detection_PostProcess:2']
+
+
+def test_classes_and_scores_by_name():
+    details = [detail('detection_scores', [1, 10]), detail('num_detections', [1]),
+               detail('detection_boxes', [1, 10, 4]), detail('detection_classes', [1, 10])]
+    assert names(details) == ['detection_boxes', 'detection_classes', 'detection_scores']
+
+
+def test_unnamed_outputs_in_output_order():
+    details = [detail('out_a', [1, 10]), detail('out_b', [1, 10, 4]), detail('out_c', [1]), detail('out_d', [1, 10])]
+    assert names(details) == ['out_b', 'out_a', 'out_d']
+
+
+def test_non_ssd_outputs_are_rejected():
+    with pytest.raises(ValueError):
+        TFLiteBackend._ssd_outputs([detail('output0', [1, 84, 8400])])
@@ -0,0 +1,74 @@
+"""
+Motion gate decisions: change inside the zones, keyframes.
+
+Run from camera-system/:
+    python3 -m pytest tests
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np  # type: ignore
+import pytest  # type: ignore
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from motion_gate import MotionGate  # noqa: E402
+
+# Left half of a 320 x 240 frame
+LEFT_ZONE = {'name': 'left', 'polygon': [[0, 0], [160, 0], [160, 240], [0, 240]]}
+
+
+def frame(box=None):
+    """Grey 320 x 240 frame, with a white (x1, y1, x2, y2) box if given"""
+    image = np.full((240, 320, 3), 100, dtype=np.uint8)
+    if box is not None:
+        x1, y1, x2, y2 = box
+        image[y1:y2, x1:x2] = 255
+    return image
+
+
+def gate(method='diff', zones=None):
+    return MotionGate({'enabled': True, 'method': method, 'keyframeInterval': 3600}, zones)
+
+
+def test_first_frame_is_inferred_and_a_still_scene_is_skipped():
+    motion_gate = gate()
+    assert motion_gate.should_infer(frame())
+    assert not motion_gate.should_infer(frame())
+    assert motion_gate.frames_skipped == 1
+
+
+def test_change_is_measured_against_the_last_inferred_frame():
+    motion_gate = gate()
+    motion_gate.should_infer(frame())
+    assert motion_gate.should_infer(frame((40, 40, 80, 80)))
+    # Same as the new reference: nothing changed since it was inferred
+    assert not motion_gate.should_infer(frame((40, 40, 80, 80)))
+
+
+def test_only_change_inside_the_zones_counts():
+    motion_gate = gate(zones=[LEFT_ZONE])
+    motion_gate.should_infer(frame())
+    assert not motion_gate.should_infer(frame((240, 40, 300, 100)))
+    assert motion_gate.should_infer(frame((40, 40, 100, 100)))
+
+
+def test_keyframe_is_forced_after_the_interval():
+    motion_gate = gate()
+    motion_gate.should_infer(frame())
+    motion_gate._last_inference -= 3600
+    assert motion_gate.should_infer(frame())
+    assert motion_gate.keyframes == 1
+
+
+def test_mog2_learns_a_still_background():
+    motion_gate = gate('mog2')
+    for _ in range(30):
+        motion_gate.should_infer(frame())
+    assert not motion_gate.should_infer(frame())
+    assert motion_gate.should_infer(frame((40, 40, 120, 120)))
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        MotionGate({'method': 'optical-flow'})
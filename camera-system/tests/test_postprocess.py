@@ -0,0 +1,118 @@
+"""
+Non-maximum suppression and the output decoders in postprocess.
+
+Run from camera-system/:
+    python3 -m pytest tests
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np  # type: ignore
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import postprocess  # noqa: E402
+from postprocess import (OUTPUT_DECODERS, class_filter_mask, decode_yolo_objectness,  # noqa: E402
+                         non_max_suppression, scale_boxes)
+
+INPUT_SIZE = (640, 640)
+
+
+def test_nms_suppresses_overlapping_boxes_of_one_class():
+    boxes = np.array([[0, 0, 100, 100], [5, 5, 105, 105], [200, 200, 300, 300]])
+    scores = np.array([0.8, 0.9, 0.7])
+    keep = non_max_suppression(boxes, scores, np.zeros(3, dtype=np.int64))
+    assert keep.tolist() == [1, 2]
+
+
+def test_nms_keeps_overlapping_boxes_of_different_classes():
+    boxes = np.array([[0, 0, 100, 100], [5, 5, 105, 105]])
+    scores = np.array([0.8, 0.9])
+    assert non_max_suppression(boxes, scores, np.array([0, 1])).tolist() == [1, 0]
+    # Without class ids every box competes
+    assert non_max_suppression(boxes, scores).tolist() == [1]
+
+
+def test_nms_keeps_boxes_at_the_iou_threshold():
+    # IoU of these two is exactly 1/3
+    boxes = np.array([[0, 0, 100, 100], [50, 0, 150, 100]])
+    scores = np.array([0.9, 0.8])
+    assert non_max_suppression(boxes, scores, iou_threshold=1 / 3).tolist() == [0, 1]
+    assert non_max_suppression(boxes, scores, iou_threshold=0.3).tolist() == [0]
+
+
+def test_nms_caps_across_classes_in_score_order():
+    boxes = np.array([[0, 0, 10, 10], [100, 100, 110, 110], [200, 200, 210, 210]])
+    scores = np.array([0.5, 0.9, 0.7])
+    keep = non_max_suppression(boxes, scores, np.array([0, 1, 0]), max_detections=2)
+    assert keep.tolist() == [1, 2]
+
+
+def test_nms_row_by_row_path_matches_the_matrix_path(monkeypatch):
+    rng = np.random.default_rng(0)
+    corners = rng.uniform(0, 600, size=(300, 2))
+    boxes = np.hstack([corners, corners + rng.uniform(20, 80, size=(300, 2))])
+    scores = rng.uniform(size=300)
+    class_ids = rng.integers(0, 3, size=300)
+
+    matrix = non_max_suppression(boxes, scores, class_ids)
+    monkeypatch.setattr(postprocess, 'MATRIX_NMS_LIMIT', 0)
+    assert non_max_suppression(boxes, scores, class_ids).tolist() == matrix.tolist()
+
+
+def test_nms_of_no_boxes():
+    assert non_max_suppression(np.empty((0, 4)), np.empty(0)).tolist() == []
+
+
+def test_decode_detection_rows():
+    rows = np.array([
+        [0.5, 0.5, 0.2, 0.4, 0.9, 1],
+        [0.2, 0.2, 0.1, 0.1, 0.3, 0],   # below the threshold
+        [0.5, 0.5, 0.2, 0.2, 0.8, 7],   # unknown class
+    ])
+    boxes, confidences, class_ids = OUTPUT_DECODERS['detections']([rows], 0.5, 3, INPUT_SIZE)
+    np.testing.assert_allclose(boxes, [[0.4, 0.3, 0.6, 0.7]])
+    assert confidences.tolist() == [0.9]
+    assert class_ids.tolist() == [1]
+
+
+def test_decode_boxes_classes_scores():
+    boxes = np.array([[0.1, 0.2, 0.3, 0.4], [0.5, 0.5, 0.6, 0.6]], dtype=np.float32)  # ymin, xmin, ymax, xmax
+    classes = np.array([2.0, 0.0], dtype=np.float32)
+    scores = np.array([0.75, 0.25], dtype=np.float32)
+    decoded, confidences, class_ids = OUTPUT_DECODERS['boxes_classes_scores']([boxes, classes, scores],
+                                                                             0.5, 3, INPUT_SIZE)
+    np.testing.assert_allclose(decoded, [[0.2, 0.1, 0.4, 0.3]], rtol=1e-6)
+    assert confidences.tolist() == [0.75]
+    assert class_ids.tolist() == [2]
+
+
+def test_decode_yolov8_in_both_layouts():
+    # [4 + C, N] with N anchors > 4 + C: one confident box of class 1 at
+    # (320, 160), 64 x 32 pixels; the other anchors are weak
+    head = np.full((6, 8), 0.1)
+    head[:, 0] = [320.0, 160.0, 64.0, 32.0, 0.1, 0.8]
+    for output in (head, head.T):
+        boxes, confidences, class_ids = OUTPUT_DECODERS['yolov8']([output], 0.5, 2, INPUT_SIZE)
+        np.testing.assert_allclose(boxes, [[0.45, 0.225, 0.55, 0.275]])
+        np.testing.assert_allclose(confidences, [0.8])
+        assert class_ids.tolist() == [1]
+
+
+def test_decode_yolo_objectness_filters_classes():
+    rows = np.array([
+        [50.0, 50.0, 20.0, 10.0, 0.9, 0.1, 0.9],   # class 1, 0.81
+        [80.0, 80.0, 10.0, 10.0, 0.9, 0.9, 0.1],   # class 0, filtered out by the mask
+        [10.0, 10.0, 10.0, 10.0, 0.5, 0.1, 0.6],   # 0.3, below the threshold
+    ])
+    mask = class_filter_mask(2, {0: 'person', 1: 'car'}, ['car'])
+    boxes, confidences, class_ids = decode_yolo_objectness(rows, 0.5, mask)
+    np.testing.assert_allclose(boxes, [[40.0, 45.0, 60.0, 55.0]])
+    np.testing.assert_allclose(confidences, [0.81])
+    assert class_ids.tolist() == [1]
+
+
+def test_scale_boxes_clamps_to_the_frame():
+    boxes = np.array([[-10.0, 20.0, 330.0, 100.0]])
+    scaled = scale_boxes(boxes, (320, 320), (640, 480))
+    assert scaled.tolist() == [[0, 30, 640, 150]]
@@ -0,0 +1,86 @@
+"""
+Adaptive capture rate: idle, activity, latency back-off and temperature.
+
+Run from camera-system/:
+    python3 -m pytest tests
+"""
+
+import sys
+from pathlib import Path
+
+import pytest  # type: ignore
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import rate_scheduler  # noqa: E402
+from rate_scheduler import RateScheduler  # noqa: E402
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_scheduler.time, 'monotonic', clock)
+    monkeypatch.setattr(rate_scheduler, 'read_soc_temperature', lambda: None)
+    return clock
+
+
+def scheduler(**config):
+    return RateScheduler({'idleFps': 5, 'idleAfter': 3.0, 'minFps': 2, 'maxLatencyMs': 250, **config}, 15)
+
+
+def test_idle_after_no_confirmed_objects_and_back_on_activity(clock):
+    rates = scheduler()
+    rates.update()
+    assert (rates.current_fps, rates.reason) == (15, 'target')
+
+    clock.now += 3.0
+    rates.update()
+    assert (rates.current_fps, rates.reason) == (5, 'idle')
+
+    # An object is confirmed: straight back up, without waiting for the next evaluation
+    rates.observe(1, 10.0)
+    assert (rates.current_fps, rates.reason) == (15, 'target')
+
+
+def test_latency_over_budget_backs_off(clock):
+    rates = scheduler()
+    for _ in range(20):
+        rates.observe(1, 1000.0)
+        clock.now += 1.0
+        rates.update()
+    assert rates.reason == 'latency'
+    assert rates.current_fps == 2  # down to minFps
+
+    for _ in range(20):
+        rates.observe(1, 10.0)
+        clock.now += 1.0
+        rates.update()
+    assert (rates.current_fps, rates.reason) == (15, 'target')
+
+
+def test_temperature_scales_towards_min_fps(clock, monkeypatch):
+    rates = scheduler(tempSoftLimit=75.0, tempHardLimit=85.0)
+    rates.observe(1, 10.0)
+    monkeypatch.setattr(rate_scheduler, 'read_soc_temperature', lambda: 80.0)
+    rates.update()
+    assert (rates.current_fps, rates.reason) == (8.5, 'temperature')
+
+    monkeypatch.setattr(rate_scheduler, 'read_soc_temperature', lambda: 90.0)
+    clock.now += 1.0
+    rates.observe(1, 10.0)
+    rates.update()
+    assert rates.current_fps == 2
+
+
+def test_fixed_rate_when_not_adaptive(clock):
+    rates = scheduler(adaptive=False)
+    clock.now += 60.0
+    rates.update()
+    assert (rates.current_fps, rates.reason) == (15, 'target')
@@ -0,0 +1,81 @@
+"""
+Line-crossing regressions for tracker.segment_crossings and ObjectTracker.
+
+Run from camera-system/:
+    python3 -m pytest tests
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np  # type: ignore
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from tracker import ObjectTracker, segment_crossings  # noqa: E402
+
+LINE_STARTS = np.array([[300.0, 0.0]])
+LINE_ENDS = np.array([[300.0, 1080.0]])
+
+
+def steps(xs, y=500.0):
+    """Consecutive (prev, curr) centers of a track moving through `xs` at height y"""
+    points = np.column_stack([np.asarray(xs, dtype=np.float64), np.full(len(xs), y)])
+    return points[:-1], points[1:]
+
+
+def test_center_landing_on_line_is_counted_once():
+    # x = 100, 110, ..., 490 lands exactly on x = 300
+    prev, curr = steps(100 + 10 * np.arange(40))
+    crossings = segment_crossings(prev, curr, LINE_STARTS, LINE_ENDS)
+    assert np.count_nonzero(crossings) == 1
+
+
+def test_center_stepping_over_line_is_counted_once():
+    prev, curr = steps(105 + 10 * np.arange(40))
+    crossings = segment_crossings(prev, curr, LINE_STARTS, LINE_ENDS)
+    assert np.count_nonzero(crossings) == 1
+
+
+def test_directions_are_opposite_through_the_line():
+    forward = segment_crossings(*steps([290, 300, 310]), LINE_STARTS, LINE_ENDS)
+    backward = segment_crossings(*steps([310, 300, 290]), LINE_STARTS, LINE_ENDS)
+    assert forward.sum() == -backward.sum() != 0
+
+
+def test_touching_the_line_and_turning_back_nets_zero():
+    # On the line counts as the left side (x > 300 for this downward line): touching
+    # from there is no crossing, touching from the right crosses and crosses back
+    assert not segment_crossings(*steps([310, 300, 310]), LINE_STARTS, LINE_ENDS).any()
+    crossings = segment_crossings(*steps([290, 300, 290]), LINE_STARTS, LINE_ENDS)
+    assert crossings.ravel().tolist() == [1, -1]
+
+
+def test_standing_on_the_line_is_not_a_crossing():
+    assert not segment_crossings(*steps([300, 300, 300]), LINE_STARTS, LINE_ENDS).any()
+
+
+def test_passing_beyond_the_end_points_is_not_a_crossing():
+    assert not segment_crossings(*steps([290, 310], y=1200), LINE_STARTS, LINE_ENDS).any()
+
+
+def test_tracker_counts_a_track_landing_on_the_line():
+    line = {'name': 'gate', 'line': [[300, 0], [300, 1080]]}
+    tracker = ObjectTracker({}, lines=[line])
+    crossed = []
+    for frame, x in enumerate(range(100, 500, 10)):
+        detection = {'class': 'car', 'confidence': 0.9, 'bbox': [x - 20, 480, x + 20, 520], 'center': [x, 500]}
+        events = tracker.update([detection], timestamp=frame / 15)
+        crossed += [event for event in events if event.kind == 'crossed']
+    assert [(event.region, event.track_id) for event in crossed] == [('gate', 0)]
+
+
+def test_gated_frames_do_not_move_predictions():
+    # Moves 10 px per frame, stops, the motion gate skips 30 frames, then the same position
+    tracker = ObjectTracker({})
+    track_ids = set()
+    frames = [(frame, 100 + 10 * frame, 0) for frame in range(10)] + [(40, 190, 30)]
+    for frame, x, frames_skipped in frames:
+        detection = {'class': 'car', 'confidence': 0.9, 'bbox': [x - 20, 480, x + 20, 520], 'center': [x, 500]}
+        tracker.update([detection], frames_skipped=frames_skipped, timestamp=frame / 15)
+        track_ids.add(detection['track_id'])
+    assert track_ids == {0}
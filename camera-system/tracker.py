@@ -0,0 +1,555 @@
+#!/usr/bin/env python3
+"""
+Multi-object Tracker
+Associates each frame's detections with existing tracks so an object is
+counted once, however many frames it stays in view.
+
+Association builds one cost matrix per frame (IoU, falling back to centroid
+distance for small or fast objects; different classes never match) and
+solves it globally: Hungarian assignment when SciPy is installed, greedy
+lowest-cost-first otherwise. Track state lives in NumPy arrays, one row per
+track.
+
+With `kalman` on (default), each track carries a constant-velocity Kalman
+filter and detections are matched against its predicted box for the frame's
+capture time, so tracks hold at 3-5 inferred frames per second.
+
+Tracks are born tentative and confirmed after `minHits` consecutive matches;
+tentative tracks die on their first miss, confirmed ones after
+`maxDisappeared` inferred frames without a match (frames skipped by the
+motion gate do not count). Confirmed tracks raise count events: entering or
+leaving a detection zone and crossing a counting line.
+"""
+
+import logging
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import cv2  # type: ignore
+import numpy as np  # type: ignore
+
+try:
+    from scipy.optimize import linear_sum_assignment  # type: ignore
+    from scipy.sparse import coo_matrix  # type: ignore
+    from scipy.sparse.csgraph import connected_components  # type: ignore
+    SCIPY_AVAILABLE = True
+except ImportError:
+    linear_sum_assignment = None
+    SCIPY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Stands in for "no match" in the solver's cost matrix
+_NO_MATCH_COST = 1e6
+
+
+def iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU of (N, 4) and (M, 4) [x1, y1, x2, y2] boxes -> (N, M)"""
+    top_left = np.maximum(boxes_a[:, None, :2], boxes_b[None, :, :2])
+    bottom_right = np.minimum(boxes_a[:, None, 2:], boxes_b[None, :, 2:])
+    intersection = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    area_a = np.prod(boxes_a[:, 2:] - boxes_a[:, :2], axis=1)
+    area_b = np.prod(boxes_b[:, 2:] - boxes_b[:, :2], axis=1)
+    union = area_a[:, None] + area_b[None, :] - intersection
+    return np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+
+
+def box_centers(boxes: np.ndarray) -> np.ndarray:
+    return (boxes[:, :2] + boxes[:, 2:]) / 2
+
+
+def linear_assignment(cost: np.ndarray, greedy: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Minimum-cost one-to-one matching of rows to columns; infinite costs never
+    match. Returns (rows, cols) index arrays. With `greedy` (or without SciPy)
+    the cheapest pairs are taken first: several times faster on busy frames,
+    not always the global minimum.
+    """
+    if cost.size == 0 or not np.isfinite(cost).any():
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    if linear_sum_assignment is not None and not greedy:
+        # Gated costs split into many small independent groups; solve each one
+        finite = np.isfinite(cost)
+        pair_rows, pair_cols = np.nonzero(finite)
+        num_rows = cost.shape[0]
+        graph = coo_matrix((np.ones(len(pair_rows)), (pair_rows, num_rows + pair_cols)),
+                           shape=(num_rows + cost.shape[1],) * 2)
+        _, labels = connected_components(graph, directed=False)
+        row_labels, col_labels = labels[:num_rows], labels[num_rows:]
+
+        # One track and one detection: the pair is the match
+        row_counts = np.bincount(row_labels, minlength=len(labels))
+        col_counts = np.bincount(col_labels, minlength=len(labels))
+        single = (row_counts == 1) & (col_counts == 1)
+        rows = [pair_rows[single[row_labels[pair_rows]]]]
+        cols = [pair_cols[single[row_labels[pair_rows]]]]
+
+        # Contested groups: Hungarian within the group
+        row_order, col_order = np.argsort(row_labels, kind='stable'), np.argsort(col_labels, kind='stable')
+        row_starts, col_starts = np.cumsum(row_counts) - row_counts, np.cumsum(col_counts) - col_counts
+        for label in np.flatnonzero((row_counts > 0) & (col_counts > 0) & ~single):
+            group_rows = row_order[row_starts[label]:row_starts[label] + row_counts[label]]
+            group_cols = col_order[col_starts[label]:col_starts[label] + col_counts[label]]
+            sub = cost[np.ix_(group_rows, group_cols)]
+            sub_rows, sub_cols = linear_sum_assignment(np.where(np.isfinite(sub), sub, _NO_MATCH_COST))
+            keep = np.isfinite(sub[sub_rows, sub_cols])
+            rows.append(group_rows[sub_rows[keep]])
+            cols.append(group_cols[sub_cols[keep]])
+        return np.concatenate(rows).astype(np.int64), np.concatenate(cols).astype(np.int64)
+
+    # Greedy: take candidate pairs cheapest first, each row/column once
+    candidates = np.flatnonzero(np.isfinite(cost))
+    candidates = candidates[np.argsort(cost.ravel()[candidates], kind='stable')]
+    row_used = np.zeros(cost.shape[0], dtype=bool)
+    col_used = np.zeros(cost.shape[1], dtype=bool)
+    rows, cols = [], []
+    for row, col in zip(*np.unravel_index(candidates, cost.shape)):
+        if not row_used[row] and not col_used[col]:
+            row_used[row] = col_used[col] = True
+            rows.append(row)
+            cols.append(col)
+    return np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64)
+
+
+def association_cost(track_boxes: np.ndarray, track_classes: np.ndarray,
+                     det_boxes: np.ndarray, det_classes: np.ndarray,
+                     min_iou: float, max_distance: float) -> np.ndarray:
+    """
+    (tracks, detections) cost: 1 - IoU where boxes overlap by at least
+    `min_iou`, otherwise 1 + centroid distance / `max_distance` within
+    `max_distance`; infinite across classes and beyond both gates.
+
+    IoU and distances are only computed for same-class pairs whose boxes
+    touch or whose centers are within `max_distance`. Candidates come from a
+    sorted sweep along x, so a busy frame costs about tracks x nearby
+    detections rather than tracks x detections.
+    """
+    cost = np.full((len(track_boxes), len(det_boxes)), np.inf)
+    if cost.size == 0:
+        return cost
+
+    track_centers, det_centers = box_centers(track_boxes), box_centers(det_boxes)
+    track_half = (track_boxes[:, 2:] - track_boxes[:, :2]) / 2
+    det_half = (det_boxes[:, 2:] - det_boxes[:, :2]) / 2
+
+    # Detections within the widest possible reach along x of each track
+    order = np.argsort(det_centers[:, 0], kind='stable')
+    sorted_x = det_centers[order, 0]
+    reach_x = max(max_distance, track_half[:, 0].max() + det_half[:, 0].max())
+    lo = np.searchsorted(sorted_x, track_centers[:, 0] - reach_x, side='left')
+    hi = np.searchsorted(sorted_x, track_centers[:, 0] + reach_x, side='right')
+    counts = hi - lo
+    rows = np.repeat(np.arange(len(track_boxes)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    cols = order[np.repeat(lo, counts) + offsets]
+
+    # Exact per-pair gate: same class, boxes touching or centers within max_distance
+    reach = np.maximum(track_half[rows] + det_half[cols], max_distance)
+    keep = (np.abs(track_centers[rows] - det_centers[cols]) < reach).all(axis=1)
+    keep &= track_classes[rows] == det_classes[cols]
+    rows, cols = rows[keep], cols[keep]
+
+    a, b = track_boxes[rows], det_boxes[cols]
+    overlap = np.clip(np.minimum(a[:, 2:], b[:, 2:]) - np.maximum(a[:, :2], b[:, :2]), 0, None).prod(axis=1)
+    union = (a[:, 2:] - a[:, :2]).prod(axis=1) + (b[:, 2:] - b[:, :2]).prod(axis=1) - overlap
+    iou = np.divide(overlap, union, out=np.zeros_like(overlap), where=union > 0)
+    distance = np.linalg.norm(track_centers[rows] - det_centers[cols], axis=1)
+
+    overlapping = iou >= min_iou
+    pair_cost = np.where(overlapping, 1.0 - iou, 1.0 + distance / max_distance)
+    pair_cost[~overlapping & (distance > max_distance)] = np.inf
+    cost[rows, cols] = pair_cost
+    return cost
+
+
+def segment_crossings(prev: np.ndarray, curr: np.ndarray,
+                      line_starts: np.ndarray, line_ends: np.ndarray) -> np.ndarray:
+    """
+    Moves prev -> curr (K, 2) against line segments (L, 2) -> (L, 2) end points.
+    Returns (K, L): +1 crossed from the right to the left of start -> end,
+    -1 the other way, 0 no crossing (including passing beyond the end points).
+
+    Sides are half-open: a point exactly on the line counts as left of it
+    (the end points likewise against the move). A center landing on the line
+    while crossing is counted once; one touching it from the right and turning
+    back counts a crossing each way.
+    """
+    line_vec = (line_ends - line_starts)[None, :, :]
+    move_vec = (curr - prev)[:, None, :]
+
+    def cross(a, b):
+        return a[..., 0] * b[..., 1] - a[..., 1] * b[..., 0]
+
+    # Image y points down: a positive cross product is on the right of start -> end
+    right_prev = cross(line_vec, prev[:, None, :] - line_starts[None]) > 0
+    right_curr = cross(line_vec, curr[:, None, :] - line_starts[None]) > 0
+    start_right = cross(move_vec, line_starts[None] - prev[:, None, :]) > 0
+    end_right = cross(move_vec, line_ends[None] - prev[:, None, :]) > 0
+
+    moved = (move_vec != 0).any(axis=2)
+    crossed = moved & (right_prev != right_curr) & (start_right != end_right)
+    return np.where(crossed, np.where(right_prev, 1, -1), 0)
+
+
+class ConstantVelocityFilter:
+    """
+    Constant-velocity Kalman filters for a batch of boxes, one row per track.
+
+    Center x/y, width and height are filtered independently as value +
+    velocity pairs, so each of the K x 4 filters has a 2 x 2 covariance and
+    predict / update are closed-form array operations for all tracks at once.
+    The center moves at constant velocity; width and height follow a random
+    walk (their velocity stays zero), so a mismatch cannot make boxes grow
+    without bound. Time is in seconds. Noise scales with the box size:
+    `acceleration_std` and `velocity_std` are box sizes per s^2 / per s,
+    `measurement_std` a fraction of the box size.
+    """
+
+    # Components with a velocity: center x, center y (not width, height)
+    _MOVING = np.array([True, True, False, False])
+
+    def __init__(self, acceleration_std: float = 2.0, measurement_std: float = 0.05,
+                 velocity_std: float = 5.0):
+        self.acceleration_std = acceleration_std
+        self.measurement_std = measurement_std
+        self.velocity_std = velocity_std
+        self.mean = np.empty((0, 4, 2), dtype=np.float64)  # [cx, cy, w, h] x [value, velocity]
+        self.cov = np.empty((0, 4, 3), dtype=np.float64)  # [var(value), cov, var(velocity)]
+
+    def __len__(self) -> int:
+        return len(self.mean)
+
+    def add(self, boxes: np.ndarray):
+        """Start filters at (N, 4) [x1, y1, x2, y2] boxes with unknown velocity"""
+        mean = np.zeros((len(boxes), 4, 2))
+        mean[:, :2, 0] = box_centers(boxes)
+        mean[:, 2:, 0] = boxes[:, 2:] - boxes[:, :2]
+        scale = self._scale(mean)
+        cov = np.zeros((len(boxes), 4, 3))
+        cov[..., 0] = (self.measurement_std * scale) ** 2
+        cov[..., 2] = np.where(self._MOVING, (self.velocity_std * scale) ** 2, 0.0)
+        self.mean = np.concatenate([self.mean, mean])
+        self.cov = np.concatenate([self.cov, cov])
+
+    def keep(self, mask: np.ndarray):
+        self.mean, self.cov = self.mean[mask], self.cov[mask]
+
+    def predict(self, dt):
+        """Advance all filters by `dt` seconds (scalar or one per track)"""
+        dt = np.broadcast_to(np.asarray(dt, dtype=np.float64), (len(self.mean),))[:, None]
+        q = (self.acceleration_std * self._scale(self.mean)) ** 2
+        p00, p01, p11 = self.cov[..., 0], self.cov[..., 1], self.cov[..., 2]
+        self.mean[..., 0] += dt * self.mean[..., 1]
+        moving = self._MOVING
+        self.cov = np.stack([p00 + dt * (2 * p01 + dt * p11) + q * np.where(moving, dt ** 4 / 4, dt ** 2),
+                             np.where(moving, p01 + dt * p11 + q * dt ** 3 / 2, 0.0),
+                             np.where(moving, p11 + q * dt ** 2, 0.0)], axis=-1)
+
+    def update(self, rows: np.ndarray, boxes: np.ndarray):
+        """Correct the filters in `rows` with measured (len(rows), 4) boxes"""
+        if not len(rows):
+            return
+        measured = np.concatenate([box_centers(boxes), boxes[:, 2:] - boxes[:, :2]], axis=1)
+        mean, cov = self.mean[rows], self.cov[rows]
+        p00, p01, p11 = cov[..., 0], cov[..., 1], cov[..., 2]
+        variance = p00 + (self.measurement_std * self._scale(mean)) ** 2
+        gain_value, gain_velocity = p00 / variance, p01 / variance
+        residual = measured - mean[..., 0]
+        mean[..., 0] += gain_value * residual
+        mean[..., 1] += gain_velocity * residual
+        self.mean[rows] = mean
+        self.cov[rows] = np.stack([(1 - gain_value) * p00, (1 - gain_value) * p01,
+                                   p11 - gain_velocity * p01], axis=-1)
+
+    def boxes(self) -> np.ndarray:
+        """Current (K, 4) [x1, y1, x2, y2] estimates"""
+        center, size = self.mean[:, :2, 0], np.clip(self.mean[:, 2:, 0], 1.0, None)
+        return np.concatenate([center - size / 2, center + size / 2], axis=1)
+
+    @staticmethod
+    def _scale(mean: np.ndarray) -> np.ndarray:
+        """(K, 1) box size (larger side, at least one pixel) noise is relative to"""
+        return np.clip(mean[:, 2:, 0].max(axis=1, keepdims=True), 1.0, None)
+
+
+class ZoneRaster:
+    """
+    Detection zones compiled into one raster of `cell_size`-pixel cells.
+    Bit z of a cell is set when the cell's center is inside zone z, so zones
+    may overlap and membership of a batch of points is one fancy-indexing
+    lookup instead of a ray cast per point and zone. A zone without polygon
+    covers the whole frame; points outside every polygon's extent are in no
+    such zone. Boundaries are exact to one cell.
+    """
+
+    def __init__(self, zones: List[Dict], cell_size: int = 4):
+        if len(zones) > 64:
+            raise ValueError(f"At most 64 detection zones are supported, got {len(zones)}")
+        self.cell_size = max(1, int(cell_size))
+        self.dtype = next(np.dtype(t) for t in (np.uint8, np.uint16, np.uint32, np.uint64)
+                          if np.dtype(t).itemsize * 8 >= len(zones))
+
+        polygons = {index: np.asarray(zone['polygon'], dtype=np.float64)
+                    for index, zone in enumerate(zones) if zone.get('polygon')}
+        self.everywhere = self.dtype.type(sum(1 << index for index in range(len(zones))
+                                              if index not in polygons))
+
+        extent = np.max([polygon.max(axis=0) for polygon in polygons.values()], axis=0) \
+            if polygons else np.zeros(2)
+        width, height = (np.floor(extent / self.cell_size).astype(int) + 1).tolist()
+        self.raster = np.zeros((height, width), dtype=self.dtype)
+        layer = np.zeros((height, width), dtype=np.uint8)
+        for index, polygon in polygons.items():
+            # Cell (row, col) is filled when its center lies inside: shift by half a
+            # cell, 4 fractional bits of sub-cell precision
+            points = np.round((polygon / self.cell_size - 0.5) * 16).astype(np.int32)
+            layer[:] = 0
+            cv2.fillPoly(layer, [points], 1, lineType=cv2.LINE_8, shift=4)
+            self.raster |= layer.astype(self.dtype) << self.dtype.type(index)
+        self._bits = np.arange(len(zones), dtype=self.dtype)
+
+    def lookup(self, points: np.ndarray) -> np.ndarray:
+        """(K, 2) frame pixel points -> (K, zones) bool membership"""
+        cells = np.floor(points / self.cell_size).astype(np.intp)
+        valid = ((cells >= 0) & (cells < (self.raster.shape[1], self.raster.shape[0]))).all(axis=1)
+        bits = np.full(len(points), self.everywhere, dtype=self.dtype)
+        bits[valid] |= self.raster[cells[valid, 1], cells[valid, 0]]
+        return ((bits[:, None] >> self._bits) & 1).astype(bool)
+
+
+class TrackEvent(NamedTuple):
+    """A counted track event: `region` is a zone or counting line name"""
+    kind: str  # 'entered' / 'exited' (zones), 'crossed' (lines)
+    region: str
+    direction: str  # 'in' / 'out'
+    track_id: int
+    object_class: str
+
+
+class ObjectTracker:
+    """
+    Tracks one stream's detections from `detectionConfig.tracking` and turns
+    them into zone / line count events.
+
+    Zones count `in` when a confirmed track's center enters them (or the track
+    is confirmed inside) and `out` when it leaves (or the track ends inside);
+    a zone without a polygon covers the whole frame. Lines count `in` when a
+    track crosses from the right to the left of first point -> second point,
+    `out` the other way. A region's `direction` limits which of the two it counts.
+    """
+
+    def __init__(self, config: Dict, zones: Optional[List[Dict]] = None,
+                 lines: Optional[List[Dict]] = None):
+        self.max_disappeared = int(config.get('maxDisappeared', 30))  # inferred frames
+        self.max_distance = float(config.get('maxDistance', 50))  # pixels
+        self.min_iou = float(config.get('minIou', 0.1))
+        self.min_hits = max(1, int(config.get('minHits', 3)))
+        self.motion = ConstantVelocityFilter(float(config.get('accelerationStd', 2.0)),
+                                             float(config.get('measurementStd', 0.05))) \
+            if config.get('kalman', True) else None
+        self._last_timestamp: Optional[float] = None
+
+        self.zone_cell_size = int(config.get('zoneCellSize', 4))  # pixels
+        self.set_zones(zones, reset=False)
+        self.lines = lines or []
+        for line in self.lines:
+            if len(line.get('line') or []) != 2:
+                raise ValueError(f"Counting line '{line.get('name')}' needs two points: {line.get('line')}")
+        self._line_starts = np.array([line['line'][0] for line in self.lines], dtype=np.float64).reshape(-1, 2)
+        self._line_ends = np.array([line['line'][1] for line in self.lines], dtype=np.float64).reshape(-1, 2)
+
+        # Track state, one row per track
+        self.ids = np.empty(0, dtype=np.int64)
+        self.boxes = np.empty((0, 4), dtype=np.float64)
+        self.classes = np.empty(0, dtype=np.int64)
+        self.hits = np.empty(0, dtype=np.int64)
+        self.misses = np.empty(0, dtype=np.int64)
+        self.confirmed = np.empty(0, dtype=bool)
+        self.next_id = 0
+
+        self.class_names: List[str] = []
+        self._class_ids: Dict[str, int] = {}
+
+        # Stats
+        self.updates = 0
+        self.tracks_created = 0
+        self.tracks_confirmed = 0
+        self.update_ms = 0.0  # running average
+
+    def set_zones(self, zones: Optional[List[Dict]], reset: bool = True):
+        """
+        Compile the detection zones into the membership raster (at config load
+        and whenever zones change; call from the thread running update).
+        Tracks keep their ids; their zone membership is re-evaluated silently.
+        """
+        self.zones = zones or [{'name': 'all', 'polygon': [], 'direction': 'bidirectional'}]
+        self.zone_raster = ZoneRaster(self.zones, self.zone_cell_size)
+        self.inside = np.empty((0, len(self.zones)), dtype=bool)
+        if reset and len(self.ids):
+            self.inside = self._zone_membership(box_centers(self.boxes)) & self.confirmed[:, None]
+        logger.info(f"✓ {len(self.zones)} zone(s) compiled to a {self.zone_raster.raster.shape[1]}x"
+                    f"{self.zone_raster.raster.shape[0]} {self.zone_raster.dtype.name} raster")
+
+    @property
+    def active_objects(self) -> int:
+        """Confirmed tracks; they outlive missed detections for up to maxDisappeared frames"""
+        return int(np.count_nonzero(self.confirmed))
+
+    @property
+    def region_names(self) -> List[str]:
+        return [zone['name'] for zone in self.zones] + [line['name'] for line in self.lines]
+
+    def update(self, detections: List[Dict], frames_skipped: int = 0,
+               timestamp: Optional[float] = None) -> List[TrackEvent]:
+        """
+        Match one inferred frame's detections (in frame order) to tracks, tag
+        each with its `track_id` and return the count events it caused.
+
+        `timestamp` is the frame's monotonic capture time (default: now); the
+        Kalman prediction covers the time since the previous frame. Of that,
+        `frames_skipped` frames were dropped by the motion gate because nothing
+        changed: the objects moved only during the last of the gap's
+        `frames_skipped + 1` frame intervals, so the prediction covers that
+        share. Misses count inferred frames, so gated frames never age a track.
+        """
+        start = time.perf_counter()
+        det_boxes = np.array([d['bbox'] for d in detections], dtype=np.float64).reshape(-1, 4)
+        det_classes = np.array([self._class_id(d['class']) for d in detections], dtype=np.int64)
+
+        # Match against where each track should be now, not where it was last seen
+        predicted = self.boxes
+        if self.motion is not None:
+            timestamp = time.monotonic() if timestamp is None else timestamp
+            if self._last_timestamp is not None:
+                elapsed = max(0.0, timestamp - self._last_timestamp)
+                self.motion.predict(elapsed / (1 + max(0, int(frames_skipped))))
+            self._last_timestamp = timestamp
+            predicted = self.motion.boxes()
+
+        cost = association_cost(predicted, self.classes, det_boxes, det_classes,
+                                self.min_iou, self.max_distance)
+        track_rows, det_rows = linear_assignment(cost)
+
+        events: List[TrackEvent] = []
+        was_confirmed = self.confirmed.copy()
+
+        # Line crossings: confirmed tracks moving from their last matched position
+        moving = was_confirmed[track_rows]
+        if self.lines and moving.any():
+            rows = track_rows[moving]
+            sides = segment_crossings(box_centers(self.boxes[rows]), box_centers(det_boxes[det_rows[moving]]),
+                                      self._line_starts, self._line_ends)
+            for row_index, line_index in zip(*np.nonzero(sides)):
+                direction = 'in' if sides[row_index, line_index] > 0 else 'out'
+                self._emit(events, 'crossed', self.lines[line_index], direction, rows[row_index])
+
+        # Matched tracks take the detection's box
+        self.boxes[track_rows] = det_boxes[det_rows]
+        if self.motion is not None:
+            self.motion.update(track_rows, det_boxes[det_rows])
+        self.hits[track_rows] += 1
+        self.misses[track_rows] = 0
+        missed = np.ones(len(self.ids), dtype=bool)
+        missed[track_rows] = False
+        self.hits[missed] = 0
+        self.misses[missed] += 1
+        for track_row, det_row in zip(track_rows, det_rows):
+            detections[det_row]['track_id'] = int(self.ids[track_row])
+
+        # Zone membership of confirmed tracks that moved (or were just confirmed)
+        self.confirmed |= self.hits >= self.min_hits
+        self.tracks_confirmed += int(np.count_nonzero(self.confirmed & ~was_confirmed))
+        rows = track_rows[self.confirmed[track_rows]]
+        if len(rows):
+            inside = self._zone_membership(box_centers(self.boxes[rows]))
+            for index, zone_index in zip(*np.nonzero(inside != self.inside[rows])):
+                kind, direction = ('entered', 'in') if inside[index, zone_index] else ('exited', 'out')
+                self._emit(events, kind, self.zones[zone_index], direction, rows[index])
+            self.inside[rows] = inside
+
+        # Deaths: tentative tracks on their first miss, confirmed ones after max_disappeared
+        dead = missed & (~self.confirmed | (self.misses > self.max_disappeared))
+        for row in np.flatnonzero(dead & self.confirmed):
+            for zone_index in np.flatnonzero(self.inside[row]):
+                self._emit(events, 'exited', self.zones[zone_index], 'out', row)
+        if dead.any():
+            self._keep(~dead)
+
+        # Births: unmatched detections start tentative tracks
+        unmatched = np.ones(len(detections), dtype=bool)
+        unmatched[det_rows] = False
+        if unmatched.any():
+            self._add_tracks(det_boxes[unmatched], det_classes[unmatched], detections, np.flatnonzero(unmatched))
+            if self.min_hits <= 1:
+                # Confirmed at birth: count the zones they are born in
+                born = np.arange(len(self.ids) - np.count_nonzero(unmatched), len(self.ids))
+                self.confirmed[born] = True
+                self.tracks_confirmed += len(born)
+                self.inside[born] = self._zone_membership(box_centers(self.boxes[born]))
+                for row in born:
+                    for zone_index in np.flatnonzero(self.inside[row]):
+                        self._emit(events, 'entered', self.zones[zone_index], 'in', row)
+
+        self._record((time.perf_counter() - start) * 1000)
+        return events
+
+    def _class_id(self, name: str) -> int:
+        class_id = self._class_ids.get(name)
+        if class_id is None:
+            class_id = self._class_ids[name] = len(self.class_names)
+            self.class_names.append(name)
+        return class_id
+
+    def _zone_membership(self, centers: np.ndarray) -> np.ndarray:
+        """(K, zones) bool: center inside each zone (a zone without polygon covers the frame)"""
+        return self.zone_raster.lookup(centers)
+
+    def _emit(self, events: List[TrackEvent], kind: str, region: Dict, direction: str, row: int):
+        if region.get('direction', 'bidirectional') in (direction, 'bidirectional'):
+            events.append(TrackEvent(kind, region['name'], direction, int(self.ids[row]),
+                                     self.class_names[self.classes[row]]))
+
+    def _keep(self, mask: np.ndarray):
+        self.ids, self.boxes, self.classes = self.ids[mask], self.boxes[mask], self.classes[mask]
+        self.hits, self.misses, self.confirmed = self.hits[mask], self.misses[mask], self.confirmed[mask]
+        self.inside = self.inside[mask]
+        if self.motion is not None:
+            self.motion.keep(mask)
+
+    def _add_tracks(self, boxes: np.ndarray, classes: np.ndarray, detections: List[Dict],
+                    det_rows: np.ndarray):
+        count = len(boxes)
+        ids = np.arange(self.next_id, self.next_id + count, dtype=np.int64)
+        self.next_id += count
+        self.tracks_created += count
+        for track_id, det_row in zip(ids, det_rows):
+            detections[det_row]['track_id'] = int(track_id)
+
+        self.ids = np.concatenate([self.ids, ids])
+        self.boxes = np.concatenate([self.boxes, boxes])
+        self.classes = np.concatenate([self.classes, classes])
+        self.hits = np.concatenate([self.hits, np.ones(count, dtype=np.int64)])
+        self.misses = np.concatenate([self.misses, np.zeros(count, dtype=np.int64)])
+        self.confirmed = np.concatenate([self.confirmed, np.zeros(count, dtype=bool)])
+        self.inside = np.concatenate([self.inside, np.zeros((count, len(self.zones)), dtype=bool)])
+        if self.motion is not None:
+            self.motion.add(boxes)
+
+    def _record(self, update_ms: float):
+        self.updates += 1
+        if self.updates == 1:
+            self.update_ms = update_ms
+        else:
+            self.update_ms += 0.1 * (update_ms - self.update_ms)
+
+    def get_stats(self) -> Dict:
+        return {
+            'active_tracks': len(self.ids),
+            'confirmed_tracks': int(np.count_nonzero(self.confirmed)),
+            'tracks_created': self.tracks_created,
+            'tracks_confirmed': self.tracks_confirmed,
+            'update_ms': round(self.update_ms, 3),
+            'assignment': 'hungarian' if SCIPY_AVAILABLE else 'greedy',
+            'motion_model': 'kalman' if self.motion is not None else 'last_position',
+        }